@@ -8,11 +8,18 @@ from pathlib import Path
 
 import streamlit as st
 
+from batch import run_batch
+from http_cache import cache_stats
 from ticker_lookup import search_ticker
-from earnings import search_transcript_from_quote_page, search_transcript_from_index, download_transcript_page
-from main import get_cik, get_latest_filing, download_primary_document, html_to_markdown
+from earnings import find_transcript, download_transcript_page, save_transcript
+from main import get_cik, get_latest_filing, record_filing, submit_filing
+from manifest import get_manifest
+from sections import load_index, read_section
+from tables import load_table_index, read_table
 from watchlist import load_watchlist, add_to_watchlist, remove_from_watchlist
-from calendar_data import get_calendar_data, group_events_by_month, separate_upcoming_and_past
+from catalog import get_catalog
+from calendar_data import fetch_calendar, group_events_by_month, separate_upcoming_and_past
+import tracing
 
 # 配置
 DOWNLOAD_DIR = Path("downloads")
@@ -26,18 +33,33 @@ def download_sec_filing(ticker: str) -> dict:
         cik = get_cik(ticker)
         ticker_dir = DOWNLOAD_DIR / ticker
         ticker_dir.mkdir(parents=True, exist_ok=True)
+        manifest = get_manifest(DOWNLOAD_DIR)
 
+        pending = []
         for form_type in ["10-K", "10-Q"]:
             filing = get_latest_filing(cik, form_type)
             if not filing:
                 continue
 
-            html_content = download_primary_document(cik, filing)
-            markdown = html_to_markdown(html_content)
+            # 已下载过同一 accession 且文件未变化
+            entry = manifest.lookup("filings", filing["accession"])
+            if entry:
+                output_file = DOWNLOAD_DIR / entry["path"]
+                result["files"].append({
+                    "type": form_type,
+                    "date": filing["filing_date"],
+                    "path": str(output_file),
+                    "filename": output_file.name,
+                    "skipped": True,
+                })
+                continue
 
+            # 流式下载后交给转换进程池，不阻塞下一个下载
             output_file = ticker_dir / f"{ticker}_{form_type}_{filing['filing_date']}.md"
-            output_file.write_text(markdown, encoding="utf-8")
+            pending.append((form_type, filing, output_file, submit_filing(cik, filing, output_file)))
 
+        for form_type, filing, output_file, future in pending:
+            record_filing(DOWNLOAD_DIR, ticker, cik, form_type, filing, output_file, future.result())
             result["files"].append({
                 "type": form_type,
                 "date": filing["filing_date"],
@@ -57,42 +79,37 @@ def download_earnings(ticker: str) -> dict:
     result = {"success": False, "file": None, "error": None}
 
     try:
-        url = search_transcript_from_quote_page(ticker)
-        if not url:
-            url = search_transcript_from_index(ticker)
+        url = find_transcript(ticker)
 
         if not url:
             result["error"] = f"未找到 {ticker} 的 Earnings Call Transcript"
             return result
 
+        # 已下载过同一篇 transcript
+        entry = get_manifest(DOWNLOAD_DIR).lookup("transcripts", url)
+        if entry:
+            output_file = DOWNLOAD_DIR / entry["path"]
+            result["success"] = True
+            result["file"] = {
+                "type": "Earnings Call",
+                "date": entry.get("date", ""),
+                "path": str(output_file),
+                "filename": output_file.name,
+                "skipped": True,
+            }
+            return result
+
         content, metadata = download_transcript_page(url)
         if not content:
             result["error"] = "无法解析 Transcript 内容"
             return result
 
-        ticker_dir = DOWNLOAD_DIR / ticker
-        ticker_dir.mkdir(parents=True, exist_ok=True)
-
-        title = metadata.get("title", f"{ticker} Earnings Call")
-        date_str = metadata.get("date", "unknown")
-
-        markdown = f"""# {title}
-
-**Date**: {date_str}
-**Source**: [Motley Fool]({url})
-
----
-
-{content}
-"""
-        safe_date = date_str.replace("-", "")
-        output_file = ticker_dir / f"{ticker}_earnings_{safe_date}.md"
-        output_file.write_text(markdown, encoding="utf-8")
+        output_file = save_transcript(ticker, url, content, metadata, DOWNLOAD_DIR)
 
         result["success"] = True
         result["file"] = {
             "type": "Earnings Call",
-            "date": date_str,
+            "date": metadata.get("date", "unknown"),
             "path": str(output_file),
             "filename": output_file.name,
         }
@@ -102,18 +119,36 @@ def download_earnings(ticker: str) -> dict:
     return result
 
 
+def _batch_jobs(download_sec: bool, download_ec: bool) -> dict:
+    """批量任务定义: {任务名: (host, 函数)}"""
+    jobs = {}
+    if download_sec:
+        jobs["sec"] = ("sec.gov", download_sec_filing)
+    if download_ec:
+        jobs["earnings"] = ("fool.com", download_earnings)
+    return jobs
+
+
 def download_all_for_ticker(ticker: str, download_sec: bool = True, download_ec: bool = True) -> dict:
-    """下载单个股票的所有资料"""
+    """下载单个股票的所有资料（SEC 和 Earnings Call 并发）"""
     results = {"ticker": ticker, "sec": None, "earnings": None}
 
-    if download_sec:
-        results["sec"] = download_sec_filing(ticker)
-    if download_ec:
-        results["earnings"] = download_earnings(ticker)
+    jobs = _batch_jobs(download_sec, download_ec)
+    if jobs:
+        results.update(run_batch([ticker], jobs)["results"][ticker])
 
     return results
 
 
+def download_watchlist(tickers: list[str], download_sec: bool = True, download_ec: bool = True,
+                       on_progress=None) -> dict:
+    """并发下载多个股票，返回汇总（见 batch.run_batch）"""
+    jobs = _batch_jobs(download_sec, download_ec)
+    if not jobs:
+        return {"total": 0, "succeeded": 0, "failed": 0, "elapsed": 0.0, "results": {}, "errors": {}}
+    return run_batch(tickers, jobs, on_progress=on_progress)
+
+
 # ============== 页面: 单股票查询 ==============
 def page_single_search():
     st.header("🔍 单股票查询")
@@ -163,7 +198,8 @@ def page_single_search():
             if sec_result["success"] and sec_result["files"]:
                 st.success("✅ SEC 财报下载完成")
                 for f in sec_result["files"]:
-                    st.markdown(f"- **{f['type']}** ({f['date']}): `{f['filename']}`")
+                    note = " (已是最新，未重新下载)" if f.get("skipped") else ""
+                    st.markdown(f"- **{f['type']}** ({f['date']}): `{f['filename']}`{note}")
             elif sec_result["error"]:
                 st.error(f"❌ SEC 财报下载失败: {sec_result['error']}")
             else:
@@ -176,7 +212,8 @@ def page_single_search():
             if ec_result["success"] and ec_result["file"]:
                 f = ec_result["file"]
                 st.success("✅ Earnings Call 下载完成")
-                st.markdown(f"- **{f['type']}** ({f['date']}): `{f['filename']}`")
+                note = " (已是最新，未重新下载)" if f.get("skipped") else ""
+                st.markdown(f"- **{f['type']}** ({f['date']}): `{f['filename']}`{note}")
             elif ec_result["error"]:
                 st.error(f"❌ Earnings Call 下载失败: {ec_result['error']}")
 
@@ -201,7 +238,15 @@ def page_calendar():
 
     # 获取日历数据
     with st.spinner("正在获取财报日期（包含未来预定）..."):
-        events = get_calendar_data(watchlist)
+        calendar = fetch_calendar(watchlist)
+    events = calendar["events"]
+
+    if calendar["failed"]:
+        failed = ", ".join(f"{t} ({'/'.join(srcs)})" for t, srcs in calendar["failed"].items())
+        st.warning(f"⚠️ 部分数据源超时或失败，结果可能不完整: {failed}")
+    if calendar["skipped"]:
+        skipped = ", ".join(f"{t} ({'/'.join(srcs)})" for t, srcs in calendar["skipped"].items())
+        st.info(f"到总时限时仍在排队、未获取的数据源: {skipped}")
 
     if not events:
         st.warning("未找到任何财报日期信息")
@@ -256,18 +301,120 @@ def page_calendar():
     if st.button("📥 下载全部 Watchlist", type="primary"):
         progress = st.progress(0)
         status = st.empty()
+        status.write(f"正在并发下载 {len(watchlist)} 只股票...")
+
+        def on_progress(event):
+            mark = "⚠️" if event["errors"] else "✅"
+            status.write(f"{mark} {event['ticker']} 完成 ({event['done']}/{event['total']})")
+            progress.progress(event["done"] / event["total"])
 
-        for i, ticker in enumerate(watchlist):
-            status.write(f"正在下载 {ticker}...")
-            download_all_for_ticker(ticker, batch_sec, batch_ec)
-            progress.progress((i + 1) / len(watchlist))
+        summary = download_watchlist(watchlist, batch_sec, batch_ec, on_progress=on_progress)
 
         status.empty()
         progress.empty()
-        st.success(f"✅ 已下载 {len(watchlist)} 只股票的资料")
+        st.success(f"✅ 已下载 {summary['succeeded']}/{summary['total']} 只股票的资料"
+                   f"（耗时 {summary['elapsed']:.1f}s）")
+        if summary["errors"]:
+            with st.expander(f"❌ {summary['failed']} 只股票有错误", expanded=True):
+                for ticker, messages in summary["errors"].items():
+                    for message in messages:
+                        st.write(f"- **{ticker}** {message}")
         st.info(f"📁 文件保存位置: `{DOWNLOAD_DIR.absolute()}`")
 
 
+# ============== 页面: 已下载文档 ==============
+FORMS = ["10-K", "10-Q", "Earnings Call"]
+
+
+def page_catalog():
+    st.header("🗂️ 已下载文档")
+
+    catalog = get_catalog(DOWNLOAD_DIR)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        tickers = st.multiselect("股票", sorted({r["ticker"] for r in catalog.summary()}), key="catalog_tickers")
+    with col2:
+        forms = st.multiselect("类型", FORMS, key="catalog_forms")
+    with col3:
+        days = st.number_input("最近天数 (0 为不限)", min_value=0, value=0, step=30, key="catalog_days")
+
+    filters = {"tickers": tickers or None, "forms": forms or None}
+    rows = catalog.recent(days, **filters) if days else catalog.query(**filters)
+
+    if not rows:
+        st.info("没有符合条件的文档")
+        return
+
+    st.caption(f"共 {len(rows)} 个文档")
+    st.dataframe([{
+        "日期": r["filing_date"] or "",
+        "股票": r["ticker"],
+        "类型": r["form"],
+        "大小 (KB)": round(r["bytes"] / 1024),
+        "转换耗时 (s)": round(r["convert_seconds"], 2) if r["convert_seconds"] is not None else None,
+        "文件": r["path"],
+        "来源": r["source_url"] or "",
+    } for r in rows], use_container_width=True, hide_index=True)
+
+    # 按节阅读: 只读取选中的一节（按分节索引的字节偏移 seek）
+    filings = [r for r in rows if r["kind"] == "filing"]
+    if not filings:
+        return
+    st.subheader("📖 按节阅读")
+    doc = st.selectbox("文档", filings, key="section_doc",
+                       format_func=lambda r: f"{r['ticker']} {r['form']} ({r['filing_date']})")
+    markdown_file = DOWNLOAD_DIR / doc["path"]
+
+    tables = load_table_index(markdown_file)
+    if tables:
+        with st.expander(f"📊 表格 ({len(tables)})"):
+            table = st.selectbox("表格", tables, key="table_pick",
+                                 format_func=lambda t: f"{t['file']} {t['caption'][:80]}")
+            rows = read_table(markdown_file, table["file"])
+            st.dataframe(rows, use_container_width=True)
+
+    index = load_index(markdown_file)
+    if not index:
+        st.info("未识别到 Item 标题")
+        return
+    section = st.selectbox("章节", index, key="section_key",
+                           format_func=lambda s: f"{s['key']} {s['title']}")
+    st.markdown(read_section(markdown_file, section["key"]))
+
+
+# ============== 页面: 全文搜索 ==============
+def page_search():
+    st.header("🔎 全文搜索")
+
+    catalog = get_catalog(DOWNLOAD_DIR)
+
+    text = st.text_input("关键词", placeholder='例如: guidance cut, tariff, "supply chain"', key="fts_query")
+    col1, col2 = st.columns(2)
+    with col1:
+        tickers = st.multiselect("股票", sorted({r["ticker"] for r in catalog.summary()}), key="fts_tickers")
+    with col2:
+        forms = st.multiselect("类型", FORMS, key="fts_forms")
+
+    if not text.strip():
+        return
+
+    try:
+        hits = catalog.search(text, tickers=tickers or None, forms=forms or None, limit=50)
+    except Exception as e:
+        st.error(f"❌ 查询语法错误: {e}")
+        return
+
+    if not hits:
+        st.info("没有匹配的文档")
+        return
+
+    st.caption(f"{len(hits)} 个结果（按相关度排序）")
+    for hit in hits:
+        st.markdown(f"**{hit['ticker']}** {hit['form']} ({hit['filing_date'] or '-'}) · `{hit['path']}`")
+        st.markdown("> " + " ".join(hit["snippet"].split()))
+
+
 # ============== 侧边栏: Watchlist 管理 ==============
 def sidebar_watchlist():
     st.sidebar.header("📋 Watchlist")
@@ -296,6 +443,41 @@ def sidebar_watchlist():
                 st.sidebar.warning("已在列表中")
 
 
+# ============== 侧边栏: 缓存统计 ==============
+def sidebar_cache_stats():
+    stats = cache_stats()
+    with st.sidebar.expander("🗄️ HTTP 缓存"):
+        col1, col2 = st.columns(2)
+        col1.metric("命中", stats["hits"])
+        col2.metric("未命中", stats["misses"])
+        st.caption(f"重新验证 {stats['revalidated']} 次，"
+                   f"节省 {stats['bytes_saved'] / 1024 / 1024:.1f} MB，"
+                   f"淘汰 {stats['evictions']} 条")
+
+
+# ============== 侧边栏: 诊断 ==============
+def sidebar_diagnostics():
+    rows = tracing.summary()
+    with st.sidebar.expander("🩺 诊断"):
+        if not rows:
+            st.caption("本进程还没有记录")
+            return
+        st.dataframe([{
+            "操作": r["name"],
+            "次数": r["count"],
+            "总耗时 s": round(r["seconds"], 2),
+            "平均 ms": round(r["seconds"] / r["count"] * 1000, 1),
+            "最大 ms": round(r["max"] * 1000, 1),
+            "MB": round(r["bytes"] / 1024 / 1024, 2),
+            "缓存命中": r["cache_hits"],
+            "错误": r["errors"],
+        } for r in rows], use_container_width=True, hide_index=True)
+        st.caption("进程启动以来的累计值；设置 TRACE_FILE 可把每次操作写入 JSON-lines 文件")
+        if st.button("清零", key="reset_diagnostics"):
+            tracing.reset()
+            st.rerun()
+
+
 # ============== 主程序 ==============
 def main():
     st.set_page_config(
@@ -310,7 +492,7 @@ def main():
     sidebar_watchlist()
 
     # 页面导航
-    tab1, tab2 = st.tabs(["🔍 单股票查询", "📅 财报日历"])
+    tab1, tab2, tab3, tab4 = st.tabs(["🔍 单股票查询", "📅 财报日历", "🗂️ 已下载", "🔎 全文搜索"])
 
     with tab1:
         page_single_search()
@@ -318,6 +500,16 @@ def main():
     with tab2:
         page_calendar()
 
+    with tab3:
+        page_catalog()
+
+    with tab4:
+        page_search()
+
+    # 放在最后，显示本次运行后的统计
+    sidebar_cache_stats()
+    sidebar_diagnostics()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+历史回填 - 下载一段日期范围内的所有 10-K / 10-Q
+filing 列表先看 submissions 的 recent 块，不够早时再按需加载分页文件；
+下载在线程池中并发执行（共用 SEC 限速），转换交给 pipeline。
+已记入下载清单的 accession 直接跳过，中断后重新运行即可从断点继续。
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable
+
+from batch import HOST_LIMITS
+from main import get_cik, record_filing, submit_filing
+from manifest import get_manifest
+from submissions import get_submissions
+
+DEFAULT_FORMS = ["10-K", "10-Q"]
+
+
+def plan_backfill(ticker: str, forms: list[str], since: str, until: str) -> tuple[str, list[dict]]:
+    """返回 (CIK, 日期范围内的 filing 列表)，只加载覆盖 since 的分页文件"""
+    cik = get_cik(ticker)
+    subs = get_submissions(cik)
+    subs.load_since(since)
+    return cik, subs.between(since, until, forms)
+
+
+def _fetch_one(ticker: str, cik: str, filing: dict, download_dir: Path) -> dict:
+    """
+    下载并转换一个 filing，完成后记入清单和目录
+    文件名带 accession: 同一天可能有多份同类表单（如同一天提交的两份 10-Q），只用日期会互相覆盖
+    """
+    form_type = filing["form"]
+    ticker_dir = download_dir / ticker
+    ticker_dir.mkdir(parents=True, exist_ok=True)
+    name = f"{ticker}_{form_type.replace('/', '-')}_{filing['filing_date']}_{filing['accession']}.md"
+    output_file = ticker_dir / name
+    result = submit_filing(cik, filing, output_file).result()
+    record_filing(download_dir, ticker, cik, form_type, filing, output_file, result)
+    return {"filename": output_file.name, "bytes_in": result["bytes_in"]}
+
+
+def backfill(
+    tickers: list[str],
+    download_dir: Path,
+    since: str,
+    until: str,
+    forms: list[str] | None = None,
+    force: bool = False,
+    on_progress: Callable[[dict], None] | None = None,
+    workers: int | None = None,
+) -> dict:
+    """
+    回填多个 ticker 在 [since, until] 内的 filing
+
+    Args:
+        since / until: filing_date 范围（YYYY-MM-DD，含边界）
+        forms: 表单类型，默认 10-K / 10-Q
+        force: 忽略下载清单，重新下载
+        on_progress: 每个 filing 完成（或跳过/失败）时回调；submissions 获取失败的 ticker 以 filing="submissions" 回调一次
+        workers: 并发下载数，默认与批量下载的 SEC 并发上限相同
+
+    Returns:
+        {"planned", "downloaded", "skipped", "failed", "elapsed", "errors": [(ticker, 描述, 错误)]}
+        failed 包含 submissions 获取失败的 ticker（每个计 1 次）
+    """
+    forms = forms or DEFAULT_FORMS
+    manifest = get_manifest(download_dir)
+    started = time.monotonic()
+    summary = {"planned": 0, "downloaded": 0, "skipped": 0, "failed": 0, "errors": []}
+    lock = threading.Lock()
+
+    def report(event: dict) -> None:
+        with lock:
+            summary[event["status"]] += 1
+            done = summary["downloaded"] + summary["skipped"] + summary["failed"]
+        if on_progress:
+            on_progress({**event, "done": done, "total": summary["planned"]})
+
+    with ThreadPoolExecutor(max_workers=workers or HOST_LIMITS["sec.gov"]) as pool:
+        # 先规划（每个 ticker 1 个 submissions 请求 + 需要的分页），再并发下载
+        plans = {pool.submit(plan_backfill, ticker, forms, since, until): ticker for ticker in tickers}
+        futures = {}
+        for future in as_completed(plans):
+            ticker = plans[future]
+            try:
+                cik, filings = future.result()
+            except Exception as e:
+                summary["errors"].append((ticker, "submissions", str(e)))
+                report({"ticker": ticker, "filing": "submissions", "status": "failed", "error": str(e)})
+                continue
+            for filing in filings:
+                label = f"{filing['form']} {filing['filing_date']}"
+                summary["planned"] += 1
+                if not force and manifest.lookup("filings", filing["accession"]):
+                    report({"ticker": ticker, "filing": label, "status": "skipped"})
+                    continue
+                futures[pool.submit(_fetch_one, ticker, cik, filing, download_dir)] = (ticker, label)
+
+        for future in as_completed(futures):
+            ticker, label = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                summary["errors"].append((ticker, label, str(e)))
+                report({"ticker": ticker, "filing": label, "status": "failed", "error": str(e)})
+            else:
+                report({"ticker": ticker, "filing": label, "status": "downloaded"})
+
+    summary["elapsed"] = time.monotonic() - started
+    return summary
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+批量下载引擎 - 多个 ticker 并发执行，按 host 分别限制并发数
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable
+
+# 每个 host 的最大并发数（SEC 另有全局 10 req/s 限速）
+HOST_LIMITS = {
+    "sec.gov": 4,
+    "fool.com": 2,
+}
+
+
+def _run_job(fn: Callable[[str], dict], ticker: str, semaphore: threading.Semaphore) -> dict:
+    with semaphore:
+        try:
+            return fn(ticker)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+
+def run_batch(
+    tickers: list[str],
+    jobs: dict[str, tuple[str, Callable[[str], dict]]],
+    on_progress: Callable[[dict], None] | None = None,
+    host_limits: dict[str, int] | None = None,
+) -> dict:
+    """
+    并发执行批量任务
+
+    Args:
+        tickers: 股票代码列表
+        jobs: {任务名: (host, 函数)}，函数接收 ticker，返回含 success/error 的 dict
+        on_progress: 每个 ticker 全部任务完成时回调（在调用线程中执行）
+        host_limits: 每个 host 的并发上限，默认 HOST_LIMITS
+
+    Returns:
+        {"total", "succeeded", "failed", "elapsed", "results": {ticker: {任务名: 结果}},
+         "errors": {ticker: [错误信息]}}
+    """
+    limits = host_limits or HOST_LIMITS
+    semaphores = {host: threading.Semaphore(limits.get(host, 1)) for host, _ in jobs.values()}
+    workers = max(1, sum(limits.get(host, 1) for host in semaphores))
+
+    started = time.monotonic()
+    results = {ticker: {"ticker": ticker} for ticker in tickers}
+    pending = {ticker: len(jobs) for ticker in tickers}
+    errors: dict[str, list[str]] = {}
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for ticker in tickers:
+            for name, (host, fn) in jobs.items():
+                future = pool.submit(_run_job, fn, ticker, semaphores[host])
+                futures[future] = (ticker, name)
+
+        for future in as_completed(futures):
+            ticker, name = futures[future]
+            result = future.result()
+            results[ticker][name] = result
+            if result.get("error"):
+                errors.setdefault(ticker, []).append(f"{name}: {result['error']}")
+
+            pending[ticker] -= 1
+            if pending[ticker] == 0:
+                done += 1
+                if on_progress:
+                    on_progress({
+                        "ticker": ticker,
+                        "done": done,
+                        "total": len(tickers),
+                        "result": results[ticker],
+                        "errors": errors.get(ticker, []),
+                    })
+
+    return {
+        "total": len(tickers),
+        "succeeded": len(tickers) - len(errors),
+        "failed": len(errors),
+        "elapsed": time.monotonic() - started,
+        "results": results,
+        "errors": errors,
+    }
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+并发抓取基准 - 在本地替身上对比逐个 ticker 顺序查询和 batch.run_batch（按 host 限制并发的线程池）
+每个 ticker: CIK → submissions → 最新 10-K / 10-Q，以及 Motley Fool quote 页面上的 transcript
+两种方式的结果必须一致；替身按 --latency 模拟网络往返，不联网
+
+用法: python benchmarks/bench_concurrent_fetch.py [--tickers 50] [--latency 0.05] [--sec-limit 4] [--fool-limit 2]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import earnings  # noqa: E402
+from batch import HOST_LIMITS, run_batch  # noqa: E402
+from main import filing_url, get_cik  # noqa: E402
+from replay_server import ReplayServer, replaying, synthesize_fixtures  # noqa: E402
+from submissions import get_submissions  # noqa: E402
+
+FORMS = ("10-K", "10-Q")
+
+
+def latest_filings(ticker: str) -> dict[str, dict]:
+    """{form: 最新 filing（附 url）}，没有的 form 不出现"""
+    subs = get_submissions(get_cik(ticker))
+    filings = {}
+    for form in FORMS:
+        filing = subs.latest(form)
+        if filing:
+            filings[form] = dict(filing, url=filing_url(subs.cik, filing))
+    return filings
+
+
+def latest_transcript(ticker: str) -> dict | None:
+    url = earnings.find_transcript(ticker)
+    return {"url": url, "date": earnings.transcript_date(url)} if url else None
+
+
+def sequential(tickers: list[str]) -> list[dict]:
+    """逐个 ticker 依次阻塞查询"""
+    return [{"ticker": t, "filings": latest_filings(t), "transcript": latest_transcript(t)} for t in tickers]
+
+
+def batched(tickers: list[str], host_limits: dict[str, int]) -> list[dict]:
+    """批量下载引擎的调用方式: filing 和 transcript 两个任务，按 host 分别限制并发"""
+    jobs = {
+        "filings": ("sec.gov", lambda t: {"success": True, "value": latest_filings(t)}),
+        "transcript": ("fool.com", lambda t: {"success": True, "value": latest_transcript(t)}),
+    }
+    summary = run_batch(tickers, jobs, host_limits=host_limits)
+    for ticker, errors in summary["errors"].items():
+        print(f"  错误 {ticker}: {'; '.join(errors)}", file=sys.stderr)
+    results = summary["results"]
+    return [{"ticker": t, "filings": results[t]["filings"].get("value"),
+             "transcript": results[t]["transcript"].get("value")} for t in tickers]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="顺序查询 vs 按 host 限制并发的批量查询")
+    parser.add_argument("--tickers", type=int, default=50, help="虚构公司数")
+    parser.add_argument("--latency", type=float, default=0.05, help="替身每个请求的延迟秒数")
+    parser.add_argument("--sec-limit", type=int, default=HOST_LIMITS["sec.gov"], help="SEC 并发数")
+    parser.add_argument("--fool-limit", type=int, default=HOST_LIMITS["fool.com"], help="Motley Fool 并发数")
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="replay-"))
+    tickers = synthesize_fixtures(root, args.tickers)
+    limits = {"sec.gov": args.sec_limit, "fool.com": args.fool_limit}
+
+    timings = {}
+    outputs = {}
+    with ReplayServer(root, latency=args.latency) as server:
+        # SEC 限速放宽到不成为瓶颈，只比较并发方式本身
+        for label, run in [("sequential", lambda: sequential(tickers)),
+                           ("batch", lambda: batched(tickers, limits))]:
+            with replaying(server, sec_rate=1000):
+                started = server.requests
+                start = time.perf_counter()
+                outputs[label] = run()
+                timings[label] = (time.perf_counter() - start, server.requests - started)
+
+    print(f"{args.tickers} 个 ticker，替身延迟 {args.latency * 1000:.0f} ms，并发 {limits}")
+    for label, (elapsed, requests) in timings.items():
+        print(f"  {label:<11} {elapsed:>6.2f} s  {requests:>4} 个请求  {args.tickers / elapsed:>6.1f} ticker/s")
+    same = outputs["sequential"] == outputs["batch"]
+    print(f"  结果一致: {'OK' if same else '不一致'}")
+    sys.exit(0 if same else 1)
+
+
+if __name__ == "__main__":
+    main()
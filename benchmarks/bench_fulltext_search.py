@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+全文搜索基准 - 在临时目录中生成 N 个合成 Markdown 文档，写入 catalog，测搜索延迟
+对比: 逐个文件读入后做子串查找（相当于 grep）vs FTS5
+
+用法: python benchmarks/bench_fulltext_search.py [--documents 10000] [--size-kb 20]
+"""
+
+import argparse
+import itertools
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from catalog import Catalog  # noqa: E402
+
+QUERIES = ["guidance cut", "tariff", "supply chain", "gross margin", "share repurchase",
+           '"data center"', "inventory write", "headwinds", "free cash flow", "restructuring",
+           "revenue"]
+# 查询延迟目标（毫秒）
+P99_TARGET_MS = 50.0
+
+# 主题短语及出现在多少比例的文档中（其余是按 Zipf 分布抽样的普通词）
+TOPICS = {
+    "revenue increased": 0.9, "gross margin": 0.6, "free cash flow": 0.4, "share repurchase": 0.3,
+    "supply chain": 0.3, "data center": 0.15, "headwinds": 0.2, "restructuring": 0.1,
+    "tariff": 0.08, "inventory write down": 0.05, "guidance cut": 0.02,
+}
+FORMS = ["10-K", "10-Q", "Earnings Call"]
+
+
+def synthetic_vocabulary(rng: random.Random, size: int = 20000) -> tuple[list[str], list[float]]:
+    """随机拼出的词表和 Zipf 累计权重（近似真实文本的词频分布）"""
+    words = {"".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(size)}
+    words = sorted(words)
+    rng.shuffle(words)
+    return words, list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+
+
+def synthetic_corpus(directory: Path, documents: int, size_kb: int, seed: int = 42) -> Catalog:
+    """生成文档并逐个 record（与下载后保存的路径一致）"""
+    rng = random.Random(seed)
+    words, cum_weights = synthetic_vocabulary(rng)
+    catalog = Catalog(directory)
+    words_per_doc = size_kb * 1024 // 7
+    for n in range(documents):
+        ticker = f"T{n % 500:03d}"
+        form = FORMS[n % 3]
+        path = directory / ticker / f"{ticker}_{form}_{n}.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        paragraphs = [" ".join(rng.choices(words, cum_weights=cum_weights, k=60)) + "." for _ in range(words_per_doc // 60)]
+        for topic, share in TOPICS.items():
+            if rng.random() < share:
+                for _ in range(rng.randint(1, 5)):
+                    paragraphs.insert(rng.randrange(len(paragraphs) + 1), f"We noted {topic} this quarter.")
+        path.write_text("# Synthetic filing\n\n" + "\n\n".join(paragraphs), encoding="utf-8")
+        date = f"20{20 + n % 6}-{1 + n % 12:02d}-{1 + n % 28:02d}"
+        catalog.record("filing", f"acc-{n}", ticker, form, path, "0" * 64, filing_date=date)
+    return catalog
+
+
+def grep(directory: Path, query: str) -> int:
+    """逐个文件读入做子串查找（改造前唯一的办法）"""
+    needle = query.strip('"').lower()
+    return sum(1 for path in directory.rglob("*.md") if needle in path.read_text().lower())
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全文搜索基准")
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--size-kb", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        start = time.perf_counter()
+        catalog = synthetic_corpus(directory, args.documents, args.size_kb)
+        build = time.perf_counter() - start
+        print(f"语料: {args.documents} 个文档 x {args.size_kb} KB, 写入 + 索引 {build:.1f} s "
+              f"({build / args.documents * 1000:.2f} ms/文档)\n")
+
+        start = time.perf_counter()
+        grep(directory, QUERIES[0])
+        print(f"grep     单次 {(time.perf_counter() - start) * 1000:>9.1f} ms")
+
+        samples = []
+        for _ in range(args.rounds):
+            for query in QUERIES:
+                start = time.perf_counter()
+                catalog.search(query, limit=20)
+                samples.append(time.perf_counter() - start)
+        p99 = percentile(samples, 0.99) * 1000
+        status = "OK" if p99 <= P99_TARGET_MS else "超出目标"
+        print(f"fts5     p50 {percentile(samples, 0.5) * 1000:>9.1f} ms  p99 {p99:.1f} ms  "
+              f"(目标 p99 <= {P99_TARGET_MS} ms: {status})")
+
+
+if __name__ == "__main__":
+    main()
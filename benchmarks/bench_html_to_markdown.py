@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+HTML → Markdown 基准 - 对比旧实现 (BeautifulSoup + markdownify) 和 edgar_markdown
+1. 黄金语料: benchmarks/fixtures/edgar/*.htm，比较两者输出的文字序列
+   （含省略 </P> / </FONT> / </TD> 的旧版 EDGAR 文档 legacy_unclosed_10k.htm）
+2. 吞吐量: 把语料正文重复拼接成大文档，报告 MB/s
+3. 线性: 1/4 大小和完整大小的吞吐量之比，转换耗时随文档大小超线性增长时失败
+
+用法: python benchmarks/bench_html_to_markdown.py [--size-mb 10]
+"""
+
+import argparse
+import difflib
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from markdownify import markdownify as md  # noqa: E402
+
+from edgar_markdown import convert_html  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures" / "edgar"
+# 黄金语料的文字相似度下限
+MIN_SIMILARITY = 0.98
+# 完整大小的吞吐量不能低于 1/4 大小时的这个比例（否则认为耗时超线性增长）
+MIN_SCALING = 0.5
+
+
+def legacy_html_to_markdown(html_content: str) -> str:
+    """改造前的 main.html_to_markdown"""
+    soup = BeautifulSoup(html_content, "html.parser")
+    for tag in soup.find_all(["script", "style", "meta", "link", "noscript"]):
+        tag.decompose()
+    for tag in soup.find_all(style=re.compile(r"display:\s*none", re.I)):
+        tag.decompose()
+    markdown = md(str(soup), heading_style="ATX", bullets="-")
+    markdown = re.sub(r"\n{3,}", "\n\n", markdown)
+    return markdown.strip()
+
+
+def words(markdown: str) -> list[str]:
+    """忽略 Markdown 标记和空白，只比较文字"""
+    return re.findall(r"\w+", markdown.replace("\\", ""))
+
+
+def similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, words(a), words(b), autojunk=False).ratio()
+
+
+def synthetic_document(size_mb: float) -> str:
+    """把语料正文重复拼接成约 size_mb 大小的文档（模拟带附件的大 10-K）"""
+    bodies = []
+    for path in sorted(FIXTURES.glob("*.htm")):
+        html = path.read_text(encoding="utf-8")
+        match = re.search(r"<body[^>]*>(.*)</body>", html, re.S | re.I)
+        bodies.append(match.group(1) if match else html)
+    chunk = "\n".join(bodies)
+    repeat = max(1, int(size_mb * 1024 * 1024 / len(chunk.encode())))
+    return "<html><body>" + chunk * repeat + "</body></html>"
+
+
+def timed(fn, html: str) -> tuple[str, float]:
+    start = time.perf_counter()
+    result = fn(html)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML → Markdown 基准")
+    parser.add_argument("--size-mb", type=float, default=5.0, help="吞吐量测试的文档大小")
+    args = parser.parse_args()
+
+    print("黄金语料:")
+    failed = False
+    for path in sorted(FIXTURES.glob("*.htm")):
+        html = path.read_text(encoding="utf-8")
+        ratio = similarity(legacy_html_to_markdown(html), convert_html(html))
+        ok = ratio >= MIN_SIMILARITY
+        failed |= not ok
+        print(f"  {path.name:<24} 文字相似度 {ratio:.4f} {'OK' if ok else '不一致'}")
+
+    html = synthetic_document(args.size_mb)
+    size_mb = len(html.encode()) / 1024 / 1024
+    print(f"\n吞吐量 ({size_mb:.1f} MB):")
+    throughput = {}
+    for label, fn in [("legacy", legacy_html_to_markdown), ("edgar", convert_html)]:
+        try:
+            _, elapsed = timed(fn, html)
+        except RecursionError:
+            # html.parser 把未闭合的 <P> 逐层嵌套，markdownify 递归过深
+            print(f"  {label:<8} 失败 (嵌套过深: RecursionError)")
+            continue
+        throughput[label] = size_mb / elapsed
+        print(f"  {label:<8} {elapsed:>7.2f} s  {throughput[label]:>6.2f} MB/s")
+
+    small = synthetic_document(args.size_mb / 4)
+    small_mb = len(small.encode()) / 1024 / 1024
+    _, elapsed = timed(convert_html, small)
+    scaling = throughput["edgar"] / (small_mb / elapsed)
+    linear = scaling >= MIN_SCALING
+    failed |= not linear
+    print(f"\n线性: {small_mb:.1f} MB → {size_mb:.1f} MB 吞吐量之比 {scaling:.2f} "
+          f"(下限 {MIN_SCALING}) {'OK' if linear else '超线性增长'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+下载 → 转换 → 保存流水线分阶段基准（离线，可复现）
+在本地替身 (replay_server) 上回放 SEC / Motley Fool 响应，逐阶段调用真实函数:
+  get_cik → submissions → download → html_to_markdown / convert_file → transcript_search → transcript_page → save
+每个阶段记录墙钟时间、CPU 时间、峰值内存 (RSS) 和 MB/s，多次运行取中位数，输出 JSON 报告便于跨提交对比。
+替身在子进程中运行 (ReplayProcess)，网络阶段的 CPU / 内存只包含客户端自身。
+
+文档规模: 默认 fixtures/edgar 原样的小 10-Q，以及放大到 --sizes 指定 MB 数的 10-K（模拟带附件的大文档）。
+附件 (EX-*) 不回放: 下载流程只取主文档，没有附件请求。
+也可用 --fixtures 回放 replay_server.py --record 录制的真实语料。
+
+用法:
+    python benchmarks/bench_pipeline.py [--sizes 5,50] [--repeat 3] [--output report.json]
+    python benchmarks/bench_pipeline.py --compare baseline.json --output report.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import earnings  # noqa: E402
+import main as cli  # noqa: E402
+from bench_html_to_markdown import synthetic_document  # noqa: E402
+from pipeline import ConversionPipeline, _peak_rss_mb, _reset_peak_rss  # noqa: E402
+from replay_server import EDGAR_FIXTURES, ReplayProcess, fixture_path, replaying, synthesize_fixtures  # noqa: E402
+from submissions import get_submissions  # noqa: E402
+
+REPORT_VERSION = 1
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+class StageTimer:
+    """逐阶段记录墙钟、CPU、峰值内存和处理字节数"""
+
+    def __init__(self):
+        self.samples: dict[str, list[dict]] = {}
+        # 不能重置峰值 RSS 的平台（非 Linux）上 peak_rss_mb 是进程启动以来的峰值
+        self.peak_rss_scope = "stage"
+
+    @contextlib.contextmanager
+    def stage(self, name: str, nbytes: int = 0):
+        if not _reset_peak_rss():
+            self.peak_rss_scope = "process"
+        rss_before = _rss_mb()
+        cpu, wall = time.process_time(), time.perf_counter()
+        sample = {"bytes": nbytes}
+        yield sample
+        sample["wall"] = time.perf_counter() - wall
+        sample["cpu"] = time.process_time() - cpu
+        sample["peak_rss_mb"] = _peak_rss_mb()
+        sample["rss_growth_mb"] = max(0.0, sample["peak_rss_mb"] - rss_before)
+        self.samples.setdefault(name, []).append(sample)
+
+    def summary(self) -> list[dict]:
+        """各阶段中位数"""
+        rows = []
+        for name, samples in self.samples.items():
+            row = {"stage": name, "runs": len(samples)}
+            for key in ("wall", "cpu", "peak_rss_mb", "rss_growth_mb", "bytes"):
+                row[key] = statistics.median(s[key] for s in samples)
+            row["mb_per_s"] = row["bytes"] / 1024 / 1024 / row["wall"] if row["bytes"] and row["wall"] else None
+            rows.append(row)
+        return rows
+
+
+def run_case(server: ReplayProcess, ticker: str, timer: StageTimer) -> None:
+    """对一个 ticker 跑一遍完整流程（每次使用干净的缓存和下载目录）"""
+    with replaying(server, sec_rate=1000) as state, contextlib.redirect_stdout(io.StringIO()):
+        download_dir = state / "downloads"
+        ticker_dir = download_dir / ticker
+        ticker_dir.mkdir(parents=True)
+
+        with timer.stage("get_cik"):
+            cik = cli.get_cik(ticker)
+        with timer.stage("submissions"):
+            subs = get_submissions(cik)
+
+        for form in ("10-K", "10-Q"):
+            filing = subs.latest(form)
+            if not filing:
+                continue
+            raw_file = state / f"{form}.htm"
+            size = fixture_path(server.root, cli.filing_url(cik, filing)).stat().st_size
+            with timer.stage(f"download {form}", size):
+                info = cli.download_primary_document_to_file(cik, filing, raw_file)
+
+            html = raw_file.read_text(encoding=info["encoding"] or "utf-8", errors="replace")
+            with timer.stage(f"html_to_markdown {form}", size):
+                cli.html_to_markdown(html)
+            del html
+
+            output_file = ticker_dir / f"{ticker}_{form}_{filing['filing_date']}.md"
+            with timer.stage(f"convert_file {form}", size):
+                result = ConversionPipeline(workers=0).submit_file(raw_file, output_file, 0.0, info["encoding"]).result()
+            with timer.stage(f"save {form}"):
+                cli.record_filing(download_dir, ticker, cik, form, filing, output_file, result)
+
+        with timer.stage("transcript_search"):
+            url = earnings.find_transcript(ticker)
+        if url:
+            size = fixture_path(server.root, url).stat().st_size
+            with timer.stage("transcript_page", size):
+                content, metadata = earnings.download_transcript_page(url)
+            with timer.stage("save transcript"):
+                earnings.save_transcript(ticker, url, content, metadata, download_dir)
+
+
+def synthesize_case(root: Path, size_mb: float | None) -> str:
+    """一家虚构公司；size_mb 为 None 时用原样的小语料，否则把 10-K 放大到 size_mb"""
+    documents = {}
+    if size_mb:
+        documents["10-K"] = synthetic_document(size_mb).encode("utf-8")
+    return synthesize_fixtures(root, 1, documents)[0]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def print_report(report: dict, baseline: dict | None) -> None:
+    previous = {}
+    if baseline:
+        previous = {(c["case"], s["stage"]): s for c in baseline["cases"] for s in c["stages"]}
+    for case in report["cases"]:
+        print(f"\n{case['case']}")
+        if case.get("peak_rss_scope") == "process":
+            print("  (本平台无法重置峰值 RSS: 峰值 MB 为进程启动以来的峰值)")
+        print(f"  {'阶段':<24}{'墙钟 ms':>10}{'CPU ms':>10}{'峰值 MB':>9}{'增长 MB':>9}{'MB/s':>9}" +
+              (f"{'对比':>9}" if baseline else ""))
+        for s in case["stages"]:
+            line = (f"  {s['stage']:<24}{s['wall'] * 1000:>10.1f}{s['cpu'] * 1000:>10.1f}"
+                    f"{s['peak_rss_mb']:>9.0f}{s['rss_growth_mb']:>9.1f}"
+                    + (f"{s['mb_per_s']:>9.1f}" if s["mb_per_s"] is not None else f"{'-':>9}"))
+            old = previous.get((case["case"], s["stage"]))
+            if old and old["wall"]:
+                line += f"{s['wall'] / old['wall']:>8.2f}x"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="下载 → 转换 → 保存 分阶段基准")
+    parser.add_argument("--sizes", default="5,50", help="放大后的 10-K 大小（MB，逗号分隔，空字符串表示只测小文档）")
+    parser.add_argument("--repeat", type=int, default=3, help="每个规模运行次数（取中位数）")
+    parser.add_argument("--latency", type=float, default=0.0, help="替身每个请求的延迟秒数")
+    parser.add_argument("--fixtures", type=Path, help="回放录制的语料目录（替代生成的语料）")
+    parser.add_argument("--tickers", nargs="*", default=[], help="与 --fixtures 一起使用: 要回放的 ticker")
+    parser.add_argument("--output", type=Path, help="JSON 报告路径")
+    parser.add_argument("--compare", type=Path, help="与之前的 JSON 报告对比墙钟时间")
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="bench-pipeline-"))
+    cases = []
+    if args.fixtures:
+        cases += [(f"recorded {t.upper()}", args.fixtures, t.upper()) for t in args.tickers]
+    else:
+        small = EDGAR_FIXTURES / "ixbrl_10q.htm"
+        cases.append((f"small ({small.stat().st_size / 1024:.0f} KB 10-Q)", work / "small", None))
+        for size in filter(None, args.sizes.split(",")):
+            cases.append((f"10-K {float(size):g} MB", work / f"{size}mb", float(size)))
+
+    report = {
+        "version": REPORT_VERSION,
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {"repeat": args.repeat, "latency": args.latency},
+        "cases": [],
+    }
+    try:
+        for label, root, spec in cases:
+            ticker = spec if isinstance(spec, str) else synthesize_case(root, spec)
+            timer = StageTimer()
+            with ReplayProcess(root, latency=args.latency) as server:
+                for _ in range(args.repeat):
+                    run_case(server, ticker, timer)
+                misses = server.misses
+                if misses:
+                    print(f"警告: 替身中缺少 {len(misses)} 个响应，如 {misses[0]}", file=sys.stderr)
+            report["cases"].append({"case": label, "ticker": ticker, "stages": timer.summary(),
+                                    "peak_rss_scope": timer.peak_rss_scope})
+            print(f"完成: {label}", file=sys.stderr)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    print_report(report, baseline)
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=1))
+        print(f"\n报告: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+ticker 搜索微基准 - 对比线性扫描（旧实现）和索引实现，并测拼写容错查询的延迟
+数据: .ticker_cache.json（不存在时生成合成数据）
+
+用法: python benchmarks/bench_ticker_search.py [--synthetic N]
+"""
+
+import argparse
+import json
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ticker_lookup  # noqa: E402
+from ticker_lookup import TickerIndex  # noqa: E402
+
+QUERIES = ["AAPL", "apple", "nv", "micro", "soft", "bank of", "corp", "BR", "tesla",
+           "health", "energy", "berkshire", "amaz", "x", "holdings inc", "pharma"]
+# 拼写错误的查询（只有索引实现支持）
+FUZZY_QUERIES = ["Nvida", "Berkshire Hathway", "Microsft", "appel", "Amazn", "Teslla",
+                 "hathway", "Pharmaceutcals", "Goldman Sachss", "Jonson & Johnson"]
+# 每次按键都会搜索，p99 需低于该值（毫秒）
+FUZZY_P99_TARGET_MS = 5.0
+# 拼写容错查询的轮数（每轮 10 个查询）和计时前的预热轮数: 样本太少时 p99 只是第二慢的一次，受偶发抖动影响
+FUZZY_ROUNDS = 100
+WARMUP_ROUNDS = 5
+
+
+def legacy_search(companies: list[dict], query: str, limit: int = 10) -> list[dict]:
+    """改造前的 search_ticker（两次线性扫描）"""
+    query = query.strip().upper()
+    if not query:
+        return []
+
+    for company in companies:
+        if company["ticker"] == query:
+            return [company]
+
+    results = []
+    query_lower = query.lower()
+    for company in companies:
+        ticker = company["ticker"]
+        name = company["name"]
+        name_lower = name.lower()
+        if ticker.startswith(query):
+            results.append((0, len(ticker), company))
+        elif name_lower.startswith(query_lower + " ") or name_lower == query_lower:
+            results.append((1, len(name), company))
+        elif name_lower.startswith(query_lower):
+            results.append((2, len(name), company))
+        elif query_lower in name_lower:
+            results.append((3, len(name), company))
+
+    results.sort(key=lambda x: (x[0], x[1]))
+    return [r[2] for r in results[:limit]]
+
+
+def synthetic_companies(n: int, seed: int = 42) -> list[dict]:
+    """生成形似 SEC 列表的合成数据"""
+    rng = random.Random(seed)
+    words = ["Apple", "Micro", "Soft", "Bank", "of", "America", "Health", "Energy", "Tesla",
+             "Pharma", "Capital", "Global", "Holdings", "Systems", "Nvidia", "Amazon",
+             "Berkshire", "Hathaway", "Trust", "Group", "Technologies", "Motors", "Foods"]
+    suffixes = ["Inc.", "Corp", "Ltd", "Co", "PLC", "LP", ""]
+    companies = []
+    seen = set()
+    while len(companies) < n:
+        ticker = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 5)))
+        if ticker in seen:
+            continue
+        seen.add(ticker)
+        name = " ".join(rng.sample(words, rng.randint(1, 3)) + [rng.choice(suffixes)]).strip()
+        companies.append({"cik": str(rng.randint(1000, 2000000)), "ticker": ticker, "name": name})
+    return companies
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def bench(fn, rounds: int, queries: list[str] = QUERIES) -> list[float]:
+    for _ in range(WARMUP_ROUNDS):
+        for query in queries:
+            fn(query)
+    samples = []
+    for _ in range(rounds):
+        for query in queries:
+            start = time.perf_counter()
+            fn(query)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ticker 搜索微基准")
+    parser.add_argument("--synthetic", type=int, default=0, help="使用 N 条合成数据")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--fuzzy-rounds", type=int, default=FUZZY_ROUNDS)
+    args = parser.parse_args()
+
+    if args.synthetic or not ticker_lookup.CACHE_FILE.exists():
+        companies = synthetic_companies(args.synthetic or 10000)
+        source = "synthetic"
+    else:
+        companies = json.loads(ticker_lookup.CACHE_FILE.read_text())
+        source = str(ticker_lookup.CACHE_FILE)
+
+    start = time.perf_counter()
+    index = TickerIndex(companies)
+    build = time.perf_counter() - start
+
+    # 旧实现能找到结果的查询，结果必须一致（旧实现没有拼写容错，对比时关闭）
+    for query in QUERIES:
+        expected = legacy_search(companies, query)
+        if expected:
+            assert index.search(query, fuzzy=False) == expected, query
+
+    print(f"数据: {source} ({len(companies)} 家公司), 索引构建 {build * 1000:.1f} ms\n")
+    print(f"{'实现':<8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10}")
+    for label, fn in [("legacy", lambda q: legacy_search(companies, q)),
+                      ("indexed", index.search)]:
+        samples = bench(fn, args.rounds)
+        print(f"{label:<8} {percentile(samples, 0.5) * 1000:>10.3f} "
+              f"{percentile(samples, 0.99) * 1000:>10.3f} {max(samples) * 1000:>10.3f}")
+
+    samples = bench(index.search, args.fuzzy_rounds, FUZZY_QUERIES)
+    p99 = percentile(samples, 0.99) * 1000
+    status = "OK" if p99 <= FUZZY_P99_TARGET_MS else "超出目标"
+    print(f"{'fuzzy':<8} {percentile(samples, 0.5) * 1000:>10.3f} {p99:>10.3f} "
+          f"{max(samples) * 1000:>10.3f}  (目标 p99 <= {FUZZY_P99_TARGET_MS} ms: {status})")
+
+
+if __name__ == "__main__":
+    main()
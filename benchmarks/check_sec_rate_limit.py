@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+SEC 限速检查 - 多线程抢令牌，确认任意 1 秒窗口内的请求数不超过 SEC 上限（10 个）
+包括启动时的第一秒（令牌桶初始是满的，突发容量过大时第一秒就会超限）
+
+用法: python benchmarks/check_sec_rate_limit.py [--threads 16] [--seconds 3]
+"""
+
+import argparse
+import sys
+import threading
+import time
+from bisect import bisect_right
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sec_client import RATE_LIMIT, TokenBucket  # noqa: E402
+
+# SEC fair access 上限
+SEC_MAX_PER_SECOND = 10
+WINDOW = 1.0
+
+
+def run(threads: int, seconds: float) -> list[float]:
+    """threads 个线程共用一个限速器持续取令牌 seconds 秒，返回每次放行的时间戳（已排序）"""
+    limiter = TokenBucket(RATE_LIMIT)
+    stamps: list[float] = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker():
+        while True:
+            limiter.acquire()
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            with lock:
+                stamps.append(now)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return sorted(stamps)
+
+
+def max_in_window(stamps: list[float], window: float = WINDOW) -> tuple[int, float]:
+    """任意长度为 window 的滑动窗口内的最大请求数，及该窗口起点（相对第一个请求）"""
+    best, start = 0, 0.0
+    for i, t in enumerate(stamps):
+        count = bisect_right(stamps, t + window) - i
+        if count > best:
+            best, start = count, t - stamps[0]
+    return best, start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SEC 限速检查")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    stamps = run(args.threads, args.seconds)
+    first_second = bisect_right(stamps, stamps[0] + WINDOW) if stamps else 0
+    worst, start = max_in_window(stamps)
+    print(f"限速 {RATE_LIMIT:g} req/s, {args.threads} 线程, {args.seconds:g} 秒, 共 {len(stamps)} 个请求")
+    print(f"  第一秒: {first_second} 个请求")
+    print(f"  任意 1 秒窗口最多: {worst} 个请求 (起点 +{start:.3f}s)")
+    if worst > SEC_MAX_PER_SECOND:
+        print(f"失败: 超过 SEC 上限 {SEC_MAX_PER_SECOND} req/s")
+        sys.exit(1)
+    print("通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+本地 HTTP 替身 - 回放录制的 SEC / Motley Fool 响应，用于不联网的测试和基准
+- 目录布局: <root>/<域名>/<路径>，路径以 "/" 结尾时对应 index.html，查询参数写在 "@" 之后
+  例: www.sec.gov/files/company_tickers_exchange.json
+      www.fool.com/quote/nyse/ko/index.html
+      www.fool.com/earnings-call-transcripts/index.html@page=2
+- 每个请求按 latency (+ 随机 jitter) 延迟后返回，模拟网络往返
+- ReplayServer 在后台线程中运行；ReplayProcess 在子进程中运行，替身的 CPU 不计入调用进程（分阶段基准用）
+- replaying() 把 sec_client / earnings 的连接池指向替身，并把缓存、快照等状态文件隔离到临时目录
+
+用法:
+    python benchmarks/replay_server.py --synthesize 20 --latency 0.05     # 生成语料并启动
+    python benchmarks/replay_server.py --record NVDA KO --root fixtures    # 从线上录制
+"""
+
+import argparse
+import json
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+EDGAR_FIXTURES = Path(__file__).parent / "fixtures" / "edgar"
+CONTENT_TYPES = {".json": "application/json", ".htm": "text/html", ".html": "text/html"}
+# 替身自身的统计（不计入请求数）
+STATS_PATH = "/_stats"
+
+
+def fixture_path(root: Path, url: str) -> Path:
+    """URL → 语料文件路径"""
+    parts = urlsplit(url)
+    path = parts.path
+    if path.endswith("/"):
+        path += "index.html"
+    name = parts.netloc + path
+    if parts.query:
+        name += "@" + parts.query
+    return Path(root) / name
+
+
+class _Server(ThreadingHTTPServer):
+    # 默认 backlog 只有 5，大量并发连接时会被丢弃并在 1 秒后重传
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class ReplayServer:
+    """在后台线程运行的替身服务器，请求路径为 /<域名>/<路径>"""
+
+    def __init__(self, root: Path, latency: float = 0.0, jitter: float = 0.0):
+        self.root = Path(root).resolve()
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self.misses: list[str] = []
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == STATS_PATH:
+                    with server._lock:
+                        self._send(json.dumps({"requests": server.requests, "misses": server.misses}).encode(),
+                                   "application/json")
+                    return
+                delay = server.latency + random.uniform(0, server.jitter)
+                if delay:
+                    time.sleep(delay)
+                path = server.root / self.path.lstrip("/").replace("?", "@", 1)
+                if path.is_dir():
+                    path /= "index.html"
+                with server._lock:
+                    server.requests += 1
+                if not path.is_file() or server.root not in path.resolve().parents:
+                    with server._lock:
+                        server.misses.append(self.path)
+                    self.send_error(404)
+                    return
+                self._send(path.read_bytes(), CONTENT_TYPES.get(path.suffix, "text/html"))
+
+            def _send(self, body: bytes, content_type: str) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type + "; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "ReplayServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "ReplayServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class ReplayProcess:
+    """
+    在子进程中运行的替身，接口同 ReplayServer（root、address、requests、misses、with 语句）
+    替身读文件、发送响应的 CPU 和内存不计入调用进程的 process_time / RSS
+    """
+
+    def __init__(self, root: Path, latency: float = 0.0, jitter: float = 0.0):
+        self.root = Path(root).resolve()
+        self.latency = latency
+        self.jitter = jitter
+        self.address = ""
+        self._process: subprocess.Popen | None = None
+
+    def start(self) -> "ReplayProcess":
+        self._process = subprocess.Popen(
+            [sys.executable, __file__, "--root", str(self.root),
+             "--latency", str(self.latency), "--jitter", str(self.jitter)],
+            stdout=subprocess.PIPE, text=True)
+        line = self._process.stdout.readline()
+        match = re.search(r"http://([\d.]+:\d+)/", line)
+        if not match:
+            self.stop()
+            raise RuntimeError(f"替身启动失败: {line.strip() or '没有输出'}")
+        self.address = match.group(1)
+        return self
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+
+    def _stats(self) -> dict:
+        with urllib.request.urlopen(f"http://{self.address}{STATS_PATH}") as resp:
+            return json.load(resp)
+
+    @property
+    def requests(self) -> int:
+        return self._stats()["requests"]
+
+    @property
+    def misses(self) -> list[str]:
+        return self._stats()["misses"]
+
+    def __enter__(self) -> "ReplayProcess":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class ReplayAdapter(HTTPAdapter):
+    """把 https://<域名>/<路径> 改写为 http://<替身地址>/<域名>/<路径>"""
+
+    def __init__(self, address: str, **kwargs):
+        super().__init__(**kwargs)
+        self.address = address
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = f"http://{self.address}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+        return super().send(request, **kwargs)
+
+
+@contextmanager
+def replaying(server: ReplayServer | ReplayProcess, sec_rate: float | None = None):
+    """
+    在 with 块内所有 SEC / Motley Fool 请求都发给替身
+    HTTP 缓存、ticker 缓存、transcript 索引快照、quote URL 记录和本地 filing 索引都换到临时目录，
+    不读写真实的缓存；sec_rate 可放宽 SEC 限速（测吞吐量时使用）
+    """
+    import earnings
+    import filing_index
+    import http_cache
+    import sec_client
+    import submissions
+    import ticker_lookup
+    import transcript_index
+
+    state = Path(tempfile.mkdtemp(prefix="replay-state-"))
+    sessions = [sec_client.get_client().session, earnings._session]
+    saved = {
+        "cache": http_cache._cache,
+        "ticker_file": ticker_lookup.CACHE_FILE,
+        "ticker_index": ticker_lookup._index,
+        "transcript_index": transcript_index._index,
+        "quote_file": earnings.QUOTE_URLS_FILE,
+        "quote_urls": earnings._quote_urls,
+        "index_file": filing_index.INDEX_FILE,
+        "limiter": sec_client.get_client().limiter,
+        "adapters": [s.get_adapter("https://") for s in sessions],
+    }
+
+    http_cache._cache = http_cache.ResponseCache(state / "http_cache")
+    ticker_lookup.CACHE_FILE, ticker_lookup._index = state / "tickers.json", None
+    transcript_index._index = transcript_index.TranscriptIndex(state / "transcript_index.json")
+    earnings.QUOTE_URLS_FILE, earnings._quote_urls = state / "fool_quote_urls.json", None
+    filing_index.INDEX_FILE = state / "no_index.db"
+    if sec_rate:
+        sec_client.get_client().limiter = sec_client.TokenBucket(sec_rate)
+    for session in sessions:
+        session.mount("https://", ReplayAdapter(server.address, pool_maxsize=sec_client.POOL_SIZE))
+    earnings.clear_lookups()
+    submissions.clear_cache()
+    try:
+        yield state
+    finally:
+        for session, adapter in zip(sessions, saved["adapters"]):
+            session.mount("https://", adapter)
+        http_cache._cache = saved["cache"]
+        ticker_lookup.CACHE_FILE, ticker_lookup._index = saved["ticker_file"], saved["ticker_index"]
+        transcript_index._index = saved["transcript_index"]
+        earnings.QUOTE_URLS_FILE, earnings._quote_urls = saved["quote_file"], saved["quote_urls"]
+        filing_index.INDEX_FILE = saved["index_file"]
+        sec_client.get_client().limiter = saved["limiter"]
+        earnings.clear_lookups()
+        submissions.clear_cache()
+        shutil.rmtree(state, ignore_errors=True)
+
+
+def _write(root: Path, url: str, body: str | bytes) -> None:
+    path = fixture_path(root, url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    path.write_bytes(body)
+
+
+def synthesize_fixtures(root: Path, count: int, documents: dict[str, bytes] | None = None) -> list[str]:
+    """
+    生成 count 家虚构公司的完整语料（ticker 索引、submissions、10-K / 10-Q 主文档、quote 页面、transcript）
+    主文档默认取 fixtures/edgar 的 legacy_10k.htm / ixbrl_10q.htm，documents 可按 form 替换
+    返回 ticker 列表
+    """
+    root = Path(root)
+    documents = dict(documents or {})
+    documents.setdefault("10-K", (EDGAR_FIXTURES / "legacy_10k.htm").read_bytes())
+    documents.setdefault("10-Q", (EDGAR_FIXTURES / "ixbrl_10q.htm").read_bytes())
+
+    tickers, rows, index_links = [], [], []
+    for n in range(count):
+        ticker, cik = f"SYN{n:03d}", 9_000_000 + n
+        exchange = "Nasdaq" if n % 2 == 0 else "NYSE"
+        tickers.append(ticker)
+        rows.append([cik, f"Synthetic Company {n}", ticker, exchange])
+
+        recent = {key: [] for key in ("form", "accessionNumber", "primaryDocument", "filingDate", "reportDate")}
+        for form, filed, period in (("10-Q", "2025-08-01", "2025-06-30"), ("10-K", "2025-02-14", "2024-12-31")):
+            accession = f"{cik:010d}-25-{len(recent['form']) + 1:06d}"
+            document = f"{ticker.lower()}-{period.replace('-', '')}.htm"
+            for key, value in zip(recent, (form, accession, document, filed, period)):
+                recent[key].append(value)
+            _write(root, f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession.replace('-', '')}/{document}",
+                   documents[form])
+        _write(root, f"https://data.sec.gov/submissions/CIK{cik:010d}.json", json.dumps({
+            "cik": str(cik), "name": f"Synthetic Company {n}", "tickers": [ticker],
+            "exchanges": [exchange], "filings": {"recent": recent, "files": []},
+        }))
+
+        slug = f"synthetic-{ticker.lower()}-q2-2025-earnings-call-transcript"
+        href = f"/earnings/call-transcripts/2025/08/0{1 + n % 9}/{slug}/"
+        _write(root, f"https://www.fool.com/quote/{exchange.lower()}/{ticker.lower()}/",
+               f'<html><body><h1>{ticker}</h1><a href="{href}">{ticker} Q2 2025 Earnings Call</a></body></html>')
+        paragraphs = "".join(f"<p>Operator: question {i} about revenue, margins and guidance.</p>" for i in range(40))
+        _write(root, "https://www.fool.com" + href,
+               f"<html><body><h1>Synthetic Company {n} ({ticker}) Q2 2025 Earnings Call Transcript</h1>"
+               f"<article>{paragraphs}</article></body></html>")
+        index_links.append(f'<a href="{href}">Synthetic Company {n} ({ticker}) Q2 2025</a>')
+
+    _write(root, "https://www.sec.gov/files/company_tickers_exchange.json",
+           json.dumps({"fields": ["cik", "name", "ticker", "exchange"], "data": rows}))
+    _write(root, "https://www.fool.com/earnings-call-transcripts/",
+           "<html><body>" + "".join(index_links) + "</body></html>")
+    return tickers
+
+
+def record_fixtures(root: Path, tickers: list[str]) -> int:
+    """从线上录制 ticker 索引、submissions、最新 10-K / 10-Q 主文档和 Motley Fool 页面，返回文件数"""
+    from earnings import fool_get, quote_page_urls, search_transcript_from_quote_page
+    from main import filing_url, get_cik
+    from sec_client import sec_get
+    from submissions import get_submissions
+
+    urls = ["https://www.sec.gov/files/company_tickers_exchange.json"]
+    fool_urls = ["https://www.fool.com/earnings-call-transcripts/"]
+    for ticker in tickers:
+        cik = get_cik(ticker)
+        urls.append(f"https://data.sec.gov/submissions/CIK{cik.zfill(10)}.json")
+        subs = get_submissions(cik)
+        urls += [filing_url(cik, f) for f in filter(None, (subs.latest("10-K"), subs.latest("10-Q")))]
+        fool_urls += quote_page_urls(ticker)[:1]
+        transcript = search_transcript_from_quote_page(ticker)
+        if transcript:
+            fool_urls.append(transcript)
+
+    count = 0
+    for fetch, group in ((sec_get, urls), (fool_get, fool_urls)):
+        for url in group:
+            resp = fetch(url)
+            if resp.status_code == 200:
+                _write(root, url, resp.content)
+                count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 HTTP 替身（回放 SEC / Motley Fool 响应）")
+    parser.add_argument("--root", type=Path, help="语料目录（默认临时目录）")
+    parser.add_argument("--synthesize", type=int, metavar="N", help="生成 N 家虚构公司的语料")
+    parser.add_argument("--record", nargs="+", metavar="TICKER", help="从线上录制这些 ticker 的响应后退出")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的延迟秒数")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外的随机延迟上限（秒）")
+    args = parser.parse_args()
+
+    root = args.root or Path(tempfile.mkdtemp(prefix="replay-"))
+    if args.record:
+        print(f"已录制 {record_fixtures(root, args.record)} 个响应到 {root}")
+        return
+    if args.synthesize:
+        synthesize_fixtures(root, args.synthesize)
+
+    with ReplayServer(root, args.latency, args.jitter) as server:
+        print(f"回放 {root}，地址 http://{server.address}/<域名>/<路径>（Ctrl+C 退出）", flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,14 @@
 日历数据模块 - 获取财报和 Earnings Call 日期（包含未来日期）
 """
 
-import re
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 
-import requests
-from bs4 import BeautifulSoup
-
-from main import get_cik, get_latest_filing, HEADERS
+import tracing
+from earnings import quote_page_transcripts, transcript_date
+from main import get_cik, get_latest_filing
 
 
 def get_sec_filing_dates(ticker: str) -> list[dict]:
@@ -17,21 +18,26 @@ def get_sec_filing_dates(ticker: str) -> list[dict]:
     获取 SEC 财报发布日期（历史）
     返回: [{"type": "10-K", "date": "2024-10-31", "ticker": "AAPL"}, ...]
     """
-    results = []
     try:
-        cik = get_cik(ticker)
-        for form_type in ["10-K", "10-Q"]:
-            filing = get_latest_filing(cik, form_type)
-            if filing:
-                results.append({
-                    "ticker": ticker.upper(),
-                    "type": form_type,
-                    "date": filing["filing_date"],
-                    "category": "SEC Filing",
-                    "status": "past",
-                })
+        return fetch_sec_filing_dates(ticker)
     except Exception:
-        pass
+        return []
+
+
+def fetch_sec_filing_dates(ticker: str) -> list[dict]:
+    """同 get_sec_filing_dates，但出错时抛出异常"""
+    results = []
+    cik = get_cik(ticker)
+    for form_type in ["10-K", "10-Q"]:
+        filing = get_latest_filing(cik, form_type)
+        if filing:
+            results.append({
+                "ticker": ticker.upper(),
+                "type": form_type,
+                "date": filing["filing_date"],
+                "category": "SEC Filing",
+                "status": "past",
+            })
     return results
 
 
@@ -40,50 +46,54 @@ def get_next_earnings_date_yfinance(ticker: str) -> dict | None:
     从 yfinance 获取下一个 Earnings 日期（含精确时间和盘前/盘后）
     """
     try:
-        import yfinance as yf
+        return fetch_next_earnings_date_yfinance(ticker)
+    except Exception:
+        return None
 
-        stock = yf.Ticker(ticker)
-        info = stock.info
 
-        earnings_ts = info.get("earningsTimestamp")
-        if not earnings_ts:
-            return None
-
-        dt = datetime.fromtimestamp(earnings_ts)
-        formatted_date = dt.strftime("%Y-%m-%d")
-        formatted_time = dt.strftime("%H:%M") + " ET"
-
-        # 判断盘前/盘后 (美股开盘 9:30, 收盘 16:00 EST)
-        hour = dt.hour
-        if hour < 9 or (hour == 9 and dt.minute < 30):
-            timing = "BMO (盘前)"
-        elif hour >= 16:
-            timing = "AMC (盘后)"
-        else:
-            timing = "盘中"
-
-        # 是否为预估日期
-        is_estimate = info.get("isEarningsDateEstimate", True)
-        estimate_tag = " (预估)" if is_estimate else ""
-
-        # 判断是未来还是过去
-        today = datetime.now().date()
-        status = "upcoming" if dt.date() >= today else "past"
-
-        return {
-            "ticker": ticker.upper(),
-            "type": f"Earnings {timing}{estimate_tag}",
-            "date": formatted_date,
-            "time": formatted_time,
-            "timing": timing,
-            "is_estimate": is_estimate,
-            "category": "Earnings",
-            "status": status,
-        }
-    except Exception:
-        pass
+def fetch_next_earnings_date_yfinance(ticker: str) -> dict | None:
+    """同 get_next_earnings_date_yfinance，但出错时抛出异常（没有日期时返回 None）"""
+    import yfinance as yf
 
-    return None
+    stock = yf.Ticker(ticker)
+    with tracing.span("yfinance.info", ticker=ticker):
+        info = stock.info
+
+    earnings_ts = info.get("earningsTimestamp")
+    if not earnings_ts:
+        return None
+
+    dt = datetime.fromtimestamp(earnings_ts)
+    formatted_date = dt.strftime("%Y-%m-%d")
+    formatted_time = dt.strftime("%H:%M") + " ET"
+
+    # 判断盘前/盘后 (美股开盘 9:30, 收盘 16:00 EST)
+    hour = dt.hour
+    if hour < 9 or (hour == 9 and dt.minute < 30):
+        timing = "BMO (盘前)"
+    elif hour >= 16:
+        timing = "AMC (盘后)"
+    else:
+        timing = "盘中"
+
+    # 是否为预估日期
+    is_estimate = info.get("isEarningsDateEstimate", True)
+    estimate_tag = " (预估)" if is_estimate else ""
+
+    # 判断是未来还是过去
+    today = datetime.now().date()
+    status = "upcoming" if dt.date() >= today else "past"
+
+    return {
+        "ticker": ticker.upper(),
+        "type": f"Earnings {timing}{estimate_tag}",
+        "date": formatted_date,
+        "time": formatted_time,
+        "timing": timing,
+        "is_estimate": is_estimate,
+        "category": "Earnings",
+        "status": status,
+    }
 
 
 def get_next_earnings_date_calendar(ticker: str) -> dict | None:
@@ -91,98 +101,172 @@ def get_next_earnings_date_calendar(ticker: str) -> dict | None:
     从 yfinance calendar 获取 Earnings 日期（备用）
     """
     try:
-        import yfinance as yf
+        return fetch_next_earnings_date_calendar(ticker)
+    except Exception:
+        return None
 
-        stock = yf.Ticker(ticker)
-        calendar = stock.calendar
 
-        if not calendar:
-            return None
-
-        earnings_dates = calendar.get("Earnings Date", [])
-        if not earnings_dates:
-            return None
-
-        # 取第一个日期
-        earnings_date = earnings_dates[0]
-        formatted_date = earnings_date.strftime("%Y-%m-%d")
-
-        today = datetime.now().date()
-        status = "upcoming" if earnings_date >= today else "past"
-
-        return {
-            "ticker": ticker.upper(),
-            "type": "Earnings (预定)",
-            "date": formatted_date,
-            "time": None,
-            "timing": "TBD",
-            "is_estimate": True,
-            "category": "Earnings",
-            "status": status,
-        }
-    except Exception:
-        pass
+def fetch_next_earnings_date_calendar(ticker: str) -> dict | None:
+    """同 get_next_earnings_date_calendar，但出错时抛出异常（没有日期时返回 None）"""
+    import yfinance as yf
 
-    return None
+    stock = yf.Ticker(ticker)
+    with tracing.span("yfinance.calendar", ticker=ticker):
+        calendar = stock.calendar
+
+    if not calendar:
+        return None
+
+    earnings_dates = calendar.get("Earnings Date", [])
+    if not earnings_dates:
+        return None
+
+    # 取第一个日期
+    earnings_date = earnings_dates[0]
+    formatted_date = earnings_date.strftime("%Y-%m-%d")
+
+    today = datetime.now().date()
+    status = "upcoming" if earnings_date >= today else "past"
+
+    return {
+        "ticker": ticker.upper(),
+        "type": "Earnings (预定)",
+        "date": formatted_date,
+        "time": None,
+        "timing": "TBD",
+        "is_estimate": True,
+        "category": "Earnings",
+        "status": status,
+    }
 
 
 def get_past_earnings_call_date(ticker: str) -> dict | None:
     """
     从 Motley Fool 获取最近的 Earnings Call 日期（历史）
+    quote 页面与下载 transcript 共用同一次查询结果；请求失败时抛出异常，页面上没有 transcript 时返回 None
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
-        "Accept": "text/html,application/xhtml+xml",
-    }
+    for url in quote_page_transcripts(ticker):
+        date_str = transcript_date(url)
+        if date_str:
+            return {
+                "ticker": ticker.upper(),
+                "type": "Earnings Call (已发布)",
+                "date": date_str,
+                "category": "Earnings Call",
+                "status": "past",
+            }
 
-    for exchange in ["nasdaq", "nyse"]:
-        quote_url = f"https://www.fool.com/quote/{exchange}/{ticker.lower()}/"
-        try:
-            resp = requests.get(quote_url, headers=headers, timeout=10)
-            if resp.status_code != 200:
-                continue
+    return None
 
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            for link in soup.find_all("a", href=True):
-                href = link["href"]
-                if "/earnings/call-transcripts/" in href:
-                    date_match = re.search(r"/(\d{4})/(\d{2})/(\d{2})/", href)
-                    if date_match:
-                        date_str = f"{date_match.group(1)}-{date_match.group(2)}-{date_match.group(3)}"
-                        return {
-                            "ticker": ticker.upper(),
-                            "type": "Earnings Call (已发布)",
-                            "date": date_str,
-                            "category": "Earnings Call",
-                            "status": "past",
-                        }
-        except requests.RequestException:
-            continue
 
+def fetch_next_earnings_date(ticker: str) -> dict | None:
+    """
+    未来 Earnings 日期（优先 yfinance info，备用 calendar）
+    区分 "没有日期" (None) 和 "获取失败" (抛出异常): info 失败时改用 calendar，
+    两者都没拿到结果且有一个出错时抛出该错误
+    """
+    error = None
+    for fetch in (fetch_next_earnings_date_yfinance, fetch_next_earnings_date_calendar):
+        try:
+            event = fetch(ticker)
+        except Exception as e:
+            error = error or e
+            continue
+        if event:
+            return event
+    if error:
+        raise error
     return None
 
 
-def get_all_dates_for_ticker(ticker: str) -> list[dict]:
-    """获取单个股票的所有日期事件（历史 + 未来）"""
-    events = []
+# 数据源: 名称 → (函数, 超时预算秒数)
+SOURCES = {
+    "yfinance": (fetch_next_earnings_date, 15),
+    "sec": (fetch_sec_filing_dates, 20),
+    "fool": (get_past_earnings_call_date, 15),
+}
+MAX_WORKERS = 16
+# 每一轮（MAX_WORKERS 个任务）的时限（秒），总时限按任务轮数放大:
+# 超时的线程无法中止，会一直占用工作线程，排在后面的任务可能迟迟不开始
+DEADLINE = 30
+
+
+def _timed(fn, ticker: str, started: dict, key: tuple):
+    started[key] = time.monotonic()
+    with tracing.span(f"calendar.{key[1]}", ticker=ticker):
+        return fn(ticker)
+
+
+def fetch_calendar(tickers: list[str], deadline: float | None = None) -> dict:
+    """
+    并发获取多个股票的所有日期事件（跨 ticker、跨数据源）
+    数据源出错、超过各自预算或到总时限时已开始但还没完成，均记为失败；
+    到总时限时还在排队、没开始的任务取消，单独记为未获取；返回部分结果
+    （数据源正常返回但没有事件的不算失败）
+    总时限 deadline 默认 DEADLINE × 任务轮数（任务数 / MAX_WORKERS 向上取整）
+
+    返回: {"events": [...], "failed": {ticker: [数据源名, ...]}, "skipped": {ticker: [数据源名, ...]}}
+    """
+    events_by_key = {}
+    failed: dict[str, list[str]] = {}
+    skipped: dict[str, list[str]] = {}
+    started: dict[tuple, float] = {}
+    jobs = len(tickers) * len(SOURCES)
+    if deadline is None:
+        deadline = DEADLINE * max(1, math.ceil(jobs / MAX_WORKERS))
+    stop_at = time.monotonic() + deadline
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, jobs)))
+    futures = {}
+    for ticker in tickers:
+        for name, (fn, _) in SOURCES.items():
+            key = (ticker, name)
+            futures[pool.submit(_timed, fn, ticker, started, key)] = key
+
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+        for future in done:
+            key = futures[future]
+            try:
+                events_by_key[key] = future.result()
+            except Exception:
+                failed.setdefault(key[0], []).append(key[1])
+
+        # 超过预算的数据源直接放弃（线程在后台自行结束）；到总时限时放弃所有未完成的，
+        # 还没开始的取消掉，不算超时
+        now = time.monotonic()
+        for future in list(pending):
+            key = futures[future]
+            if now >= stop_at and future.cancel():
+                pending.discard(future)
+                skipped.setdefault(key[0], []).append(key[1])
+                continue
+            begin = started.get(key)
+            over_budget = begin is not None and now - begin > SOURCES[key[1]][1]
+            if over_budget or now >= stop_at:
+                pending.discard(future)
+                failed.setdefault(key[0], []).append(key[1])
+                tracing.record("calendar.timeout", now - begin if begin is not None else 0.0,
+                               ticker=key[0], source=key[1], error="timeout")
 
-    # 1. 未来 Earnings 日期（优先 yfinance info，备用 calendar）
-    next_earnings = get_next_earnings_date_yfinance(ticker)
-    if not next_earnings:
-        next_earnings = get_next_earnings_date_calendar(ticker)
-    if next_earnings:
-        events.append(next_earnings)
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    events = []
+    for ticker in tickers:
+        for name in SOURCES:
+            result = events_by_key.get((ticker, name))
+            if isinstance(result, list):
+                events.extend(result)
+            elif result:
+                events.append(result)
 
-    # 2. SEC 财报（历史）
-    events.extend(get_sec_filing_dates(ticker))
+    return {"events": sort_events(events), "failed": failed, "skipped": skipped}
 
-    # 3. 过去的 Earnings Call（历史）
-    past_ec = get_past_earnings_call_date(ticker)
-    if past_ec:
-        events.append(past_ec)
 
-    return events
+def get_all_dates_for_ticker(ticker: str) -> list[dict]:
+    """获取单个股票的所有日期事件（历史 + 未来）"""
+    return fetch_calendar([ticker])["events"]
 
 
 def get_calendar_data(tickers: list[str]) -> list[dict]:
@@ -190,22 +274,11 @@ def get_calendar_data(tickers: list[str]) -> list[dict]:
     获取多个股票的日历数据
     返回按日期排序的事件列表（未来的在前）
     """
-    all_events = []
-
-    for ticker in tickers:
-        events = get_all_dates_for_ticker(ticker)
-        all_events.extend(events)
-
-    # 按日期排序：未来的在前（降序），同日期按 ticker 排序
-    today = datetime.now().strftime("%Y-%m-%d")
-
-    def sort_key(e):
-        is_future = e["date"] >= today
-        return (not is_future, e["date"] if is_future else "9999" + e["date"], e["ticker"])
+    return fetch_calendar(tickers)["events"]
 
-    all_events.sort(key=lambda x: (x["status"] != "upcoming", x["date"]), reverse=False)
 
-    # 重新排序：upcoming 在前按日期升序，past 在后按日期降序
+def sort_events(all_events: list[dict]) -> list[dict]:
+    """upcoming 在前按日期升序，past 在后按日期降序"""
     upcoming = [e for e in all_events if e.get("status") == "upcoming"]
     past = [e for e in all_events if e.get("status") != "upcoming"]
 
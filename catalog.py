@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+文档目录 - 已下载文档的 SQLite 索引 (downloads/catalog.db)
+每个 filing / transcript 一行: ticker、CIK、表单类型、accession、日期、来源 URL、大小、hash、转换耗时，
+按 ticker / 表单 / 日期建索引，查询不再遍历 downloads/ 目录解析文件名。
+文档保存时同时写入 FTS5 全文索引 (documents_fts，contentless，不另存正文)，search() 按 bm25 排序并返回摘录。
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from manifest import get_manifest
+
+CATALOG_NAME = "catalog.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,              -- filing / transcript
+    key TEXT NOT NULL UNIQUE,        -- filing 为 accession，transcript 为 URL
+    ticker TEXT NOT NULL,
+    cik TEXT,
+    form TEXT NOT NULL,              -- 10-K / 10-Q / Earnings Call
+    accession TEXT,
+    filing_date TEXT,                -- YYYY-MM-DD
+    source_url TEXT,
+    path TEXT NOT NULL,              -- 相对下载目录
+    bytes INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    convert_seconds REAL,
+    saved_at TEXT NOT NULL,
+    fts_rowid INTEGER                -- 在 documents_fts 中的 rowid，未索引时为 NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_ticker ON documents (ticker, filing_date);
+CREATE INDEX IF NOT EXISTS idx_documents_form ON documents (form, filing_date);
+CREATE INDEX IF NOT EXISTS idx_documents_date ON documents (filing_date);
+"""
+
+# contentless: 只存倒排索引，不在数据库里另存一份正文（摘录从 .md 原文件中取）
+# SQLite 3.43+ 支持 contentless_delete：重新索引时按 rowid 删除旧版本，rowid 固定为文档 id；
+# 更早的版本删除需要原文（文件已被覆盖），旧版本留在索引里，孤立行过多时整体重建
+CONTENTLESS_DELETE = sqlite3.sqlite_version_info >= (3, 43, 0)
+FTS_OPTIONS = "content = '', contentless_delete = 1" if CONTENTLESS_DELETE else "content = ''"
+FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5 (body, {FTS_OPTIONS}, tokenize = 'porter unicode61');
+CREATE INDEX IF NOT EXISTS idx_documents_fts ON documents (fts_rowid);
+"""
+# 孤立行（旧版本）超过已索引文档数的该比例时，打开目录时重建全文索引
+ORPHAN_REBUILD_RATIO = 0.1
+
+WHITESPACE = re.compile(r"\s+")
+# FTS5 查询语法字符，出现时按原样作为 FTS5 表达式
+FTS_SYNTAX = re.compile(r'["*()]|\b(?:AND|OR|NOT|NEAR)\b')
+# 摘录长度（字符）、查找摘录时每次读取的字符数和查找原文时去掉的词尾
+SNIPPET_WIDTH = 200
+SNIPPET_CHUNK = 256 * 1024
+SUFFIX = re.compile(r"(?:ing|ed|es|s)$")
+
+COLUMNS = ("kind", "key", "ticker", "cik", "form", "accession", "filing_date", "source_url",
+           "path", "bytes", "sha256", "convert_seconds", "saved_at")
+
+
+class Catalog:
+    """已下载文档目录，所有线程共用一个连接（写入串行化）"""
+
+    def __init__(self, download_dir: Path):
+        self.download_dir = Path(download_dir)
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.download_dir / CATALOG_NAME
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._conn.executescript(FTS_SCHEMA)
+        if not self._conn.execute("SELECT 1 FROM documents LIMIT 1").fetchone():
+            self._import_manifest()
+        if not CONTENTLESS_DELETE and self.orphans() > ORPHAN_REBUILD_RATIO * self._indexed():
+            self.rebuild_index()
+        self._index_missing()
+
+    def _import_manifest(self) -> None:
+        """首次创建时从下载清单导入已有文档（清单里没有的字段留空）"""
+        manifest = get_manifest(self.download_dir)
+        for kind, key, entry in manifest.entries():
+            if not (self.download_dir / entry["path"]).exists():
+                continue
+            is_filing = kind == "filings"
+            self._upsert({
+                "kind": "filing" if is_filing else "transcript",
+                "key": key,
+                "ticker": entry.get("ticker") or Path(entry["path"]).parent.name,
+                "cik": None,
+                "form": entry.get("form") if is_filing else "Earnings Call",
+                "accession": key if is_filing else None,
+                "filing_date": _iso_date(entry.get("filing_date") if is_filing else entry.get("date")),
+                "source_url": None if is_filing else key,
+                "path": entry["path"],
+                "bytes": entry["size"],
+                "sha256": entry["sha256"],
+                "convert_seconds": None,
+                "saved_at": entry.get("saved_at") or time.strftime("%Y-%m-%dT%H:%M:%S"),
+            })
+
+    def _migrate(self) -> None:
+        """
+        旧版目录: documents 补 fts_rowid 列；带正文副本（或 SQLite 支持却没开 contentless_delete）
+        的全文索引删掉，按当前 FTS_SCHEMA 重建
+        """
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        with self._conn:
+            if "fts_rowid" not in columns:
+                self._conn.execute("ALTER TABLE documents ADD COLUMN fts_rowid INTEGER")
+            old = self._conn.execute("SELECT sql FROM sqlite_master WHERE name = 'documents_fts'").fetchone()
+            options = old[0].replace(" ", "") if old else ""
+            if old and ("content=''" not in options
+                        or CONTENTLESS_DELETE and "contentless_delete=1" not in options):
+                self._conn.execute("DROP TABLE documents_fts")
+                self._conn.execute("UPDATE documents SET fts_rowid = NULL")
+
+    def _index_missing(self) -> None:
+        """补建全文索引（升级前已存在的目录，或索引时文件读取失败的文档）"""
+        with self._lock:
+            missing = self._conn.execute(
+                "SELECT id, path FROM documents WHERE fts_rowid IS NULL").fetchall()
+        for doc_id, path in missing:
+            self._index(doc_id, self.download_dir / path)
+
+    def _index(self, doc_id: int, path: Path) -> None:
+        """
+        (重新) 索引一个文档的全文
+        支持 contentless_delete 时先删旧版本，rowid 就用文档 id；否则删除旧版本需要原文
+        （文件已被覆盖），只能用新的 rowid，旧版本成为孤立行，搜索时被 JOIN 过滤掉，
+        下次打开目录时按 ORPHAN_REBUILD_RATIO 重建清理
+        """
+        try:
+            body = path.read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return
+        with self._lock, self._conn:
+            if CONTENTLESS_DELETE:
+                self._conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+                self._conn.execute("INSERT INTO documents_fts (rowid, body) VALUES (?, ?)", (doc_id, body))
+                fts_rowid = doc_id
+            else:
+                fts_rowid = self._conn.execute("INSERT INTO documents_fts (body) VALUES (?)", (body,)).lastrowid
+            self._conn.execute("UPDATE documents SET fts_rowid = ? WHERE id = ?", (fts_rowid, doc_id))
+
+    def _indexed(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM documents WHERE fts_rowid IS NOT NULL").fetchone()[0]
+
+    def orphans(self) -> int:
+        """全文索引中不再被 documents 引用的行数（旧版本）"""
+        with self._lock:
+            total = self._conn.execute("SELECT count(*) FROM documents_fts").fetchone()[0]
+        return total - self._indexed()
+
+    def rebuild_index(self) -> None:
+        """清空全文索引并从 .md 文件重新索引所有文档（清理孤立行）"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('delete-all')")
+            self._conn.execute("UPDATE documents SET fts_rowid = NULL")
+        self._index_missing()
+
+    def _upsert(self, row: dict) -> int:
+        """插入或覆盖一行，返回文档 id"""
+        placeholders = ", ".join(f":{c}" for c in COLUMNS)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in COLUMNS if c != "key")
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO documents ({', '.join(COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT (key) DO UPDATE SET {updates}", row)
+            return self._conn.execute("SELECT id FROM documents WHERE key = ?", (row["key"],)).fetchone()[0]
+
+    def record(self, kind: str, key: str, ticker: str, form: str, path: Path, sha256: str,
+               cik: str | None = None, accession: str | None = None, filing_date: str | None = None,
+               source_url: str | None = None, convert_seconds: float | None = None) -> None:
+        """
+        记录一个已保存的文档并更新全文索引（同一 key 再次保存时覆盖）
+
+        Args:
+            kind: "filing" 或 "transcript"
+            key: filing 的 accession 或 transcript 的 URL
+            path: 已保存的 Markdown 文件
+        """
+        path = Path(path)
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT sha256, fts_rowid FROM documents WHERE key = ?", (key,)).fetchone()
+        doc_id = self._upsert({
+            "kind": kind,
+            "key": key,
+            "ticker": ticker,
+            "cik": cik,
+            "form": form,
+            "accession": accession,
+            "filing_date": _iso_date(filing_date),
+            "source_url": source_url,
+            "path": str(path.relative_to(self.download_dir)),
+            "bytes": path.stat().st_size,
+            "sha256": sha256,
+            "convert_seconds": convert_seconds,
+            "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+        # 内容没变（重新保存同一文档）时沿用已有的索引
+        if not previous or previous["sha256"] != sha256 or previous["fts_rowid"] is None:
+            self._index(doc_id, path)
+
+    def query(self, tickers: list[str] | None = None, forms: list[str] | None = None,
+              since: str | None = None, until: str | None = None, limit: int | None = None) -> list[dict]:
+        """
+        按条件查询，按日期倒序
+
+        Args:
+            tickers: 只看这些 ticker
+            forms: 只看这些表单类型（"10-K"、"10-Q"、"Earnings Call"）
+            since / until: 日期范围（YYYY-MM-DD，含边界）
+        """
+        where, params = [], []
+        if tickers:
+            where.append(f"ticker IN ({', '.join('?' * len(tickers))})")
+            params += [t.upper() for t in tickers]
+        if forms:
+            where.append(f"form IN ({', '.join('?' * len(forms))})")
+            params += forms
+        if since:
+            where.append("filing_date >= ?")
+            params.append(since)
+        if until:
+            where.append("filing_date <= ?")
+            params.append(until)
+        sql = "SELECT * FROM documents"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY filing_date DESC, ticker"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def recent(self, days: int, **filters) -> list[dict]:
+        """最近 days 天内发布的文档"""
+        since = (date.today() - timedelta(days=days)).isoformat()
+        return self.query(since=since, **filters)
+
+    def search(self, text: str, tickers: list[str] | None = None, forms: list[str] | None = None,
+               limit: int = 20, highlight: tuple[str, str] = ("**", "**")) -> list[dict]:
+        """
+        全文搜索，按 bm25 相关度排序
+
+        Args:
+            text: 关键词（空格分隔，全部命中）；含引号 / AND / OR / NEAR / * 时按 FTS5 语法解析
+            tickers / forms: 同 query()
+            highlight: 摘录中命中词前后的标记
+
+        Returns:
+            documents 表的行，附加 snippet（命中位置附近的摘录）和 rank（越小越相关）
+        """
+        match = _fts_query(text)
+        if not match:
+            return []
+        where, params = ["documents_fts MATCH ?"], [match]
+        if tickers:
+            where.append(f"d.ticker IN ({', '.join('?' * len(tickers))})")
+            params += [t.upper() for t in tickers]
+        if forms:
+            where.append(f"d.form IN ({', '.join('?' * len(forms))})")
+            params += forms
+        # 索引是 contentless 的，没有 FTS5 snippet()；只为返回的前 limit 篇在原文件中找摘录
+        sql = ("SELECT d.*, documents_fts.rank AS rank "
+               "FROM documents_fts JOIN documents d ON d.fts_rowid = documents_fts.rowid "
+               f"WHERE {' AND '.join(where)} ORDER BY documents_fts.rank LIMIT {int(limit)}")
+        with self._lock:
+            hits = [dict(row) for row in self._conn.execute(sql, params)]
+        pattern = _snippet_pattern(match)
+        for hit in hits:
+            hit["snippet"] = _snippet(self.download_dir / hit["path"], pattern, highlight)
+        return hits
+
+    def summary(self) -> list[dict]:
+        """每个 ticker / 表单的文档数、总大小和最新日期"""
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(
+                "SELECT ticker, form, COUNT(*) AS documents, SUM(bytes) AS bytes, "
+                "MAX(filing_date) AS latest FROM documents GROUP BY ticker, form ORDER BY ticker, form")]
+
+
+def _iso_date(value: str | None) -> str | None:
+    """空日期和 "unknown" 存为 NULL（transcript 日期取自 URL，可能缺失）"""
+    return value if value and value != "unknown" else None
+
+
+def _fts_query(text: str) -> str:
+    """普通关键词逐个加引号（避免 "-"、":" 等被当成 FTS5 语法），已是 FTS5 表达式的原样返回"""
+    text = text.strip()
+    if FTS_SYNTAX.search(text):
+        return text
+    return " ".join(f'"{token}"' for token in text.split())
+
+
+def _snippet_pattern(match: str) -> re.Pattern | None:
+    """FTS5 表达式中的词 → 原文中的匹配正则（去掉常见词尾，近似 porter 词干）"""
+    terms = [t for t in re.findall(r"\w+", match) if t not in ("AND", "OR", "NOT", "NEAR")]
+    stems = sorted({SUFFIX.sub("", t.lower()) if len(t) > 5 else t.lower() for t in terms}, key=len, reverse=True)
+    if not stems:
+        return None
+    return re.compile(r"\b(?:" + "|".join(map(re.escape, stems)) + r")\w*", re.I)
+
+
+def _snippet(path: Path, pattern: re.Pattern | None, highlight: tuple[str, str], width: int = SNIPPET_WIDTH) -> str:
+    """
+    原文中第一个命中词附近的一段文字，命中词前后加 highlight 标记
+    按 SNIPPET_CHUNK 分块读取，找到第一个命中词就停止，不读入整个文件
+    """
+    try:
+        f = open(path, encoding="utf-8", errors="replace")
+    except OSError:
+        return ""
+    with f:
+        text, offset = "", 0  # offset: text 开头在文件中的字符位置
+        while True:
+            chunk = f.read(SNIPPET_CHUNK)
+            text += chunk
+            found = pattern.search(text) if pattern else None
+            if found or not chunk or not pattern:
+                break
+            # 保留末尾一段，跨块的词下一轮还能匹配，命中位置前也有足够的上文
+            tail = text[-width:]
+            offset += len(text) - len(tail)
+            text = tail
+        start = max(0, found.start() - width // 2) if found else 0
+        text += f.read(max(0, start + width + 1 - len(text)))
+    window = WHITESPACE.sub(" ", text[start:start + width]).strip()
+    if pattern:
+        window = pattern.sub(lambda m: f"{highlight[0]}{m.group(0)}{highlight[1]}", window)
+    return ("…" if offset + start else "") + window + ("…" if start + width < len(text) else "")
+
+
+_catalogs: dict[Path, Catalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(download_dir: Path) -> Catalog:
+    """获取下载目录对应的目录（进程内共享）"""
+    key = Path(download_dir).resolve()
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = Catalog(Path(download_dir))
+        return _catalogs[key]
+
+
+def format_rows(rows: list[dict]) -> str:
+    """格式化查询结果，用于 CLI 输出"""
+    if not rows:
+        return "(无匹配文档)"
+    # 中文表头每字占两列
+    lines = [f"{'日期':<10}{'股票':<6}{'类型':<12}{'大小':>7}  文件"]
+    for row in rows:
+        size = f"{row['bytes'] / 1024:.0f} KB"
+        lines.append(f"{row['filing_date'] or '-':<12}{row['ticker']:<8}{row['form']:<14}{size:>9}  {row['path']}")
+    return "\n".join(lines)
+
+
+def format_hits(hits: list[dict]) -> str:
+    """格式化搜索结果，用于 CLI 输出"""
+    if not hits:
+        return "(无匹配文档)"
+    blocks = []
+    for hit in hits:
+        snippet = WHITESPACE.sub(" ", hit["snippet"]).strip()
+        blocks.append(f"{hit['filing_date'] or '-'}  {hit['ticker']} {hit['form']}  {hit['path']}\n    {snippet}")
+    return "\n\n".join(blocks)
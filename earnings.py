@@ -2,78 +2,224 @@
 """
 Earnings Call Transcript 下载模块
 数据源: The Motley Fool (免费爬取)
+quote 页面、索引页和 transcript 页面的查询按 single-flight 合并，本次运行内每个页面只抓取一次
 """
 
+import hashlib
+import json
 import re
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
 
 import requests
 from bs4 import BeautifulSoup
 from markdownify import markdownify as md
 
+import tracing
+from catalog import get_catalog
+from http_cache import CACHE_DIR, cached_get
+from manifest import get_manifest
+from ticker_lookup import lookup_exchange
+from transcript_index import get_transcript_index
+
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
     "Accept": "text/html,application/xhtml+xml",
 }
 
+_session = requests.Session()
+_session.headers.update(HEADERS)
 
-def search_transcript_from_quote_page(ticker: str) -> str | None:
-    """从 Motley Fool 的公司 quote 页面查找 transcript 链接"""
-    # 尝试 NASDAQ 和 NYSE
-    for exchange in ["nasdaq", "nyse"]:
-        quote_url = f"https://www.fool.com/quote/{exchange}/{ticker.lower()}/"
+
+def _fetch(url: str, **kwargs) -> requests.Response:
+    kwargs.setdefault("timeout", 10)
+    return _session.get(url, **kwargs)
+
+
+def fool_get(url: str, **kwargs) -> requests.Response:
+    """Motley Fool GET 请求（共享连接 + 磁盘缓存）"""
+    return cached_get(_fetch, url, **kwargs)
+
+
+class SingleFlight:
+    """
+    按 key 合并并发的相同查询（single-flight）并在 TTL 内记住结果
+    同一 key 同时只有一个线程真正执行，其余线程等待它的结果；失败不缓存
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._done: dict[tuple, tuple[float, object]] = {}
+        self._inflight: dict[tuple, Future] = {}
+
+    def do(self, key: tuple, fn, *args):
+        with self._lock:
+            cached = self._done.get(key)
+            if cached and time.monotonic() - cached[0] < self.ttl:
+                return cached[1]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
 
         try:
-            resp = requests.get(quote_url, headers=HEADERS, timeout=10)
-            if resp.status_code != 200:
-                continue
+            value = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            with self._lock:
+                self._done[key] = (time.monotonic(), value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._done.clear()
+
+
+# 本次运行内的查询结果（CLI、Web UI、日历共用）：每个 quote 页面 / transcript 页面只抓取、解析一次
+LOOKUP_TTL = 600
+_lookups = SingleFlight(LOOKUP_TTL)
+
+
+def _absolute(href: str) -> str:
+    return f"https://www.fool.com{href}" if href.startswith("/") else href
+
+
+# SEC 交易所名称 → Motley Fool quote URL 中的写法；未知交易所依次尝试
+FOOL_EXCHANGES = {"nasdaq": "nasdaq", "nyse": "nyse"}
+QUOTE_URLS_FILE = CACHE_DIR / "fool_quote_urls.json"
+
+# 学到的 ticker → 可用的 quote 页面 URL（跨运行保存）
+_quote_urls: dict[str, str] | None = None
+_quote_urls_lock = threading.Lock()
 
-            soup = BeautifulSoup(resp.text, "html.parser")
 
-            # 查找 transcript 链接
-            for link in soup.find_all("a", href=True):
-                href = link["href"]
-                if "/earnings/call-transcripts/" in href:
-                    if href.startswith("/"):
-                        return f"https://www.fool.com{href}"
-                    return href
-        except requests.RequestException:
+def _learned_quote_urls() -> dict[str, str]:
+    global _quote_urls
+    if _quote_urls is None:
+        try:
+            _quote_urls = json.loads(QUOTE_URLS_FILE.read_text())
+        except (OSError, ValueError):
+            _quote_urls = {}
+    return _quote_urls
+
+
+def _learn_quote_url(ticker: str, url: str) -> None:
+    with _quote_urls_lock:
+        learned = _learned_quote_urls()
+        if learned.get(ticker) == url:
+            return
+        learned[ticker] = url
+        QUOTE_URLS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        QUOTE_URLS_FILE.write_text(json.dumps(learned, indent=1))
+
+
+def quote_page_urls(ticker: str) -> list[str]:
+    """
+    按优先级排列的 quote 页面 URL：上次成功的 URL → SEC 记录的上市交易所 → 其余交易所
+    """
+    with _quote_urls_lock:
+        learned = _learned_quote_urls().get(ticker.upper())
+    try:
+        listed = FOOL_EXCHANGES.get((lookup_exchange(ticker) or "").lower())
+    except Exception:
+        listed = None
+
+    exchanges = [listed] if listed else []
+    exchanges += [e for e in FOOL_EXCHANGES.values() if e != listed]
+    urls = [f"https://www.fool.com/quote/{e}/{ticker.lower()}/" for e in exchanges]
+    if learned:
+        urls = [learned] + [u for u in urls if u != learned]
+    return urls
+
+
+def _scrape_quote_page(ticker: str) -> list[str]:
+    """
+    依次尝试各 quote 页面 URL；404 表示该交易所下没有这个 ticker
+    只有各候选都明确没有 transcript 链接时才返回 []（会被缓存），有候选请求失败时抛出其错误
+    """
+    error = None
+    for quote_url in quote_page_urls(ticker):
+        try:
+            resp = fool_get(quote_url)
+            if resp.status_code == 404:
+                continue
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            error = e
             continue
 
-    return None
+        soup = BeautifulSoup(resp.text, "html.parser")
+        links = [_absolute(link["href"]) for link in soup.find_all("a", href=True)
+                 if "/earnings/call-transcripts/" in link["href"]]
+        if links:
+            _learn_quote_url(ticker.upper(), quote_url)
+            return links
 
+    if error is not None:
+        raise error
+    return []
 
-def search_transcript_from_index(ticker: str) -> str | None:
-    """从 Motley Fool 的 transcript 索引页面查找"""
-    index_url = "https://www.fool.com/earnings-call-transcripts/"
 
-    resp = requests.get(index_url, headers=HEADERS, timeout=10)
-    resp.raise_for_status()
+def quote_page_transcripts(ticker: str) -> list[str]:
+    """Motley Fool 公司 quote 页面上的 transcript 链接（页面顺序，最新的在前）"""
+    return _lookups.do(("quote", ticker.upper()), _scrape_quote_page, ticker)
+
+
+def search_transcript_from_quote_page(ticker: str) -> str | None:
+    """从 Motley Fool 的公司 quote 页面查找 transcript 链接"""
+    links = quote_page_transcripts(ticker)
+    return links[0] if links else None
 
-    soup = BeautifulSoup(resp.text, "html.parser")
 
-    # 查找包含 ticker 的链接
-    ticker_lower = ticker.lower()
-    for link in soup.find_all("a", href=True):
-        href = link["href"]
-        text = link.get_text().lower()
-        if "/earnings/call-transcripts/" in href:
-            # 检查链接文本或 URL 中是否包含 ticker
-            if f"({ticker_lower})" in text or f"-{ticker_lower}-" in href.lower():
-                if href.startswith("/"):
-                    return f"https://www.fool.com{href}"
-                return href
+def search_transcript_from_index(ticker: str) -> str | None:
+    """从 Motley Fool 的 transcript 索引页面查找（索引页快照，见 transcript_index.py）"""
+    return get_transcript_index().lookup(ticker)
+
+
+def find_transcript(ticker: str) -> str | None:
+    """
+    最新 transcript 的 URL：先查 quote 页面，没有再查索引页
+    quote 页面请求失败且索引页也没有时抛出 quote 页面的错误
+    """
+    try:
+        url = search_transcript_from_quote_page(ticker)
+    except requests.RequestException as e:
+        url = search_transcript_from_index(ticker)
+        if url is None:
+            raise e
+        return url
+    return url or search_transcript_from_index(ticker)
 
-    return None
 
+def transcript_date(url: str) -> str:
+    """从 transcript URL 中取日期 (YYYY-MM-DD)，没有时返回空字符串"""
+    date_match = re.search(r"/(\d{4})/(\d{2})/(\d{2})/", url)
+    return "-".join(date_match.groups()) if date_match else ""
 
-def download_transcript_page(url: str) -> tuple[str, dict]:
-    """下载并解析 transcript 页面"""
-    resp = requests.get(url, headers=HEADERS)
+
+def _parse_transcript_page(url: str) -> tuple[str, dict]:
+    resp = fool_get(url)
     resp.raise_for_status()
 
-    soup = BeautifulSoup(resp.text, "html.parser")
+    with tracing.span("transcript.parse", bytes=len(resp.content), url=url):
+        return parse_transcript_html(resp.text, url)
+
+
+def parse_transcript_html(html: str, url: str) -> tuple[str, dict]:
+    """解析 transcript 页面 HTML，返回 (Markdown 正文, 元数据)"""
+    soup = BeautifulSoup(html, "html.parser")
 
     # 提取标题
     title = ""
@@ -81,12 +227,6 @@ def download_transcript_page(url: str) -> tuple[str, dict]:
     if title_tag:
         title = title_tag.get_text().strip()
 
-    # 提取日期 (从 URL 或页面)
-    date_match = re.search(r"/(\d{4})/(\d{2})/(\d{2})/", url)
-    date_str = ""
-    if date_match:
-        date_str = f"{date_match.group(1)}-{date_match.group(2)}-{date_match.group(3)}"
-
     # 提取 transcript 内容
     # Motley Fool 的 transcript 通常在 article-body 或 content 区域
     content = ""
@@ -105,38 +245,26 @@ def download_transcript_page(url: str) -> tuple[str, dict]:
 
     metadata = {
         "title": title,
-        "date": date_str,
+        "date": transcript_date(url),
         "url": url,
     }
 
     return content.strip(), metadata
 
 
-def download_earnings_transcript(ticker: str, download_dir: Path) -> Path:
-    """下载最新的 Earnings Call Transcript"""
-    print(f"正在获取 {ticker} 的 Earnings Call...")
-
-    # 先从公司 quote 页面找
-    print("  搜索 Motley Fool...")
-    url = search_transcript_from_quote_page(ticker)
-
-    # 如果没找到，尝试索引页
-    if not url:
-        print("  Quote 页面未找到，尝试索引页...")
-        url = search_transcript_from_index(ticker)
-
-    if not url:
-        raise ValueError(f"未找到 {ticker} 的 Earnings Call Transcript")
+def download_transcript_page(url: str) -> tuple[str, dict]:
+    """下载并解析 transcript 页面（本次运行内同一 URL 只下载一次）"""
+    content, metadata = _lookups.do(("page", url), _parse_transcript_page, url)
+    return content, dict(metadata)
 
-    print(f"  找到: {url}")
 
-    # 下载并解析
-    print("  下载 Transcript...")
-    content, metadata = download_transcript_page(url)
+def clear_lookups() -> None:
+    """清空本次运行内记住的查询结果"""
+    _lookups.clear()
 
-    if not content:
-        raise ValueError("无法解析 Transcript 内容")
 
+def save_transcript(ticker: str, url: str, content: str, metadata: dict, download_dir: Path) -> Path:
+    """保存 transcript Markdown 并记入下载清单，返回文件路径"""
     # 创建目录
     ticker_dir = download_dir / ticker
     ticker_dir.mkdir(parents=True, exist_ok=True)
@@ -159,9 +287,45 @@ def download_earnings_transcript(ticker: str, download_dir: Path) -> Path:
     safe_date = date_str.replace("-", "")
     output_file = ticker_dir / f"{ticker}_earnings_{safe_date}.md"
     output_file.write_text(markdown, encoding="utf-8")
+
+    digest = hashlib.sha256(markdown.encode("utf-8")).hexdigest()
+    get_manifest(download_dir).record("transcripts", url, output_file, digest,
+                                      ticker=ticker, title=title, date=date_str)
+    get_catalog(download_dir).record("transcript", url, ticker, "Earnings Call", output_file, digest,
+                                     filing_date=date_str, source_url=url)
+    return output_file
+
+
+def download_earnings_transcript(ticker: str, download_dir: Path, force: bool = False) -> Path:
+    """下载最新的 Earnings Call Transcript（清单中已有的跳过，force 时重新下载）"""
+    print(f"正在获取 {ticker} 的 Earnings Call...")
+
+    # 先从公司 quote 页面找，没找到再查索引页
+    print("  搜索 Motley Fool...")
+    url = find_transcript(ticker)
+
+    if not url:
+        raise ValueError(f"未找到 {ticker} 的 Earnings Call Transcript")
+
+    print(f"  找到: {url}")
+
+    # 已下载过同一篇 transcript
+    entry = None if force else get_manifest(download_dir).lookup("transcripts", url)
+    if entry:
+        print(f"  已是最新，跳过: {entry['path']}")
+        return download_dir / ticker
+
+    # 下载并解析
+    print("  下载 Transcript...")
+    content, metadata = download_transcript_page(url)
+
+    if not content:
+        raise ValueError("无法解析 Transcript 内容")
+
+    output_file = save_transcript(ticker, url, content, metadata, download_dir)
     print(f"  已保存: {output_file.name}")
 
-    return ticker_dir
+    return output_file.parent
 
 
 if __name__ == "__main__":
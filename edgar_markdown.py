@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+EDGAR HTML → Markdown 单遍转换器
+针对 inline XBRL 财报: 丢弃隐藏的 ix:header 和 display:none 元素，ix: 标签只保留文字，
+表格直接输出为 Markdown 表格。基于标准库 HTMLParser 流式解析，不构建 DOM 树。
+"""
+
+import codecs
+import re
+from collections import Counter, deque
+from html.parser import HTMLParser
+from pathlib import Path
+
+# 整个子树丢弃
+SKIP_TAGS = {"script", "style", "noscript", "ix:header", "template"}
+# 没有结束标签的元素
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+             "param", "source", "track", "wbr"}
+# 块级元素: 前后断段
+BLOCK_TAGS = {"p", "div", "section", "article", "header", "footer", "blockquote", "center",
+              "body", "html", "title", "dl", "dt", "dd", "pre", "address"}
+HEADING_TAGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+# 行内强调: 标签 → Markdown 标记
+EMPHASIS_TAGS = {"b": "**", "strong": "**", "i": "*", "em": "*"}
+# 开始时隐式结束打开的 <p>（HTML 规范: 块级元素开始时关闭当前段落）
+P_CLOSERS = (BLOCK_TAGS - {"body", "html", "title"}) | set(HEADING_TAGS) | {
+    "ul", "ol", "li", "table", "hr", "aside", "nav", "main", "figure", "form", "fieldset", "menu"}
+# 结束时有动作的标签；其余（font、span、ix:* 等）结束时什么也不做，块级边界处直接出栈
+ACTIVE_TAGS = BLOCK_TAGS | set(HEADING_TAGS) | set(EMPHASIS_TAGS) | {
+    "a", "li", "ul", "ol", "td", "th", "tr", "table"}
+
+HIDDEN_STYLE = re.compile(r"display\s*:\s*none", re.I)
+WHITESPACE = re.compile(r"[\t\r\n ]+")
+# <br> 在缓冲中的占位符（空白折叠之后再换成 Markdown 换行）
+LINE_BREAK = "\x00"
+LINE_BREAK_RE = re.compile(r" ?\x00 ?")
+# 文档开头声明的编码: <?xml encoding="..."?> 或 <meta charset=...>
+DECLARED_ENCODING = re.compile(rb"""(?:encoding|charset)\s*=\s*["']?([\w-]+)""", re.I)
+CHUNK_SIZE = 1024 * 1024
+BLANK_LINES = re.compile(r"\n{3,}")
+
+
+class MarkdownConverter(HTMLParser):
+    """
+    流式转换: 可以多次 feed() 分块输入，用 pop_output() 取出已完成的 Markdown 段落
+    """
+
+    def __init__(self, on_table=None):
+        """on_table: 每个顶层表格结束时回调 on_table(单元格文字二维列表, 表格前最近几段文字)"""
+        super().__init__(convert_charrefs=True)
+        self.on_table = on_table
+        self._recent: deque[str] = deque(maxlen=3)  # 最近几段正文（表格标题 / 单位说明）
+        self._stack: list[str] = []       # 打开的非 void 标签
+        self._open: Counter[str] = Counter()  # 各标签在 _stack 中的个数（结束标签不用扫描整个栈）
+        self._inert = 0                   # _stack 中不在 ACTIVE_TAGS 里的标签数
+        self._skip_depth = 0              # >0 时处于被丢弃的子树中
+        self._inline: list[list[str]] = [[]]  # 行内缓冲栈（强调 / 链接 / 单元格各压一层）
+        self._inline_meta: list[tuple[str, str]] = []
+        self._blocks: list[str] = []
+        self._list_stack: list[list] = []  # [类型, 计数]
+        self._tables: list[dict] = []
+        self._last_item = False            # 上一个段落是列表项（相邻列表项之间不空行）
+
+    # ---------- 输出 ----------
+
+    def pop_blocks(self) -> list[str]:
+        """取出目前已经完成的段落（表格要等 </table> 后才输出，列表项可能还要并入下一项）"""
+        keep = 1 if self._last_item and self._blocks else 0
+        blocks, self._blocks = self._blocks[:len(self._blocks) - keep], self._blocks[len(self._blocks) - keep:]
+        return blocks
+
+    def pop_output(self) -> str:
+        """取出目前已经完成的 Markdown"""
+        blocks = self.pop_blocks()
+        return "\n\n".join(blocks) + "\n\n" if blocks else ""
+
+    def end_input(self) -> None:
+        """结束输入，关闭所有未闭合的元素"""
+        self.close()
+        while self._stack:
+            self._close(self._pop())
+        while self._tables:
+            self._end_table()
+        self._flush_block()
+        self._last_item = False
+
+    def finish(self) -> str:
+        """结束输入，返回剩余 Markdown"""
+        self.end_input()
+        return self.pop_output()
+
+    # ---------- 内部 ----------
+
+    def _in_cell(self) -> bool:
+        return bool(self._tables) and self._tables[-1]["cell"] is not None
+
+    def _flush_block(self, prefix: str = "", list_item: bool = False) -> None:
+        """把当前行内缓冲输出为一个段落"""
+        if self._inline_meta or self._in_cell():
+            return
+        text = WHITESPACE.sub(" ", "".join(self._inline[0])).strip(" " + LINE_BREAK)
+        self._inline[0].clear()
+        if not text:
+            return
+        text = prefix + LINE_BREAK_RE.sub("  \n", text)
+        if not list_item:
+            self._recent.append(text)
+        if list_item and self._last_item and self._blocks:
+            self._blocks[-1] += "\n" + text
+        else:
+            self._blocks.append(text)
+        self._last_item = list_item
+
+    def _append_block(self, text: str) -> None:
+        self._blocks.append(text)
+        self._last_item = False
+
+    def _break(self) -> None:
+        """块级边界: 单元格内用空格代替"""
+        if self._in_cell() or self._inline_meta:
+            self._inline[-1].append(" ")
+        else:
+            self._flush_block()
+
+    def _push_inline(self, kind: str, value: str = "") -> None:
+        self._inline.append([])
+        self._inline_meta.append((kind, value))
+
+    def _pop_inline(self) -> str | None:
+        """弹出一层行内缓冲: 强调/链接并入上一层；单元格返回其文字"""
+        kind, value = self._inline_meta.pop()
+        raw = WHITESPACE.sub(" ", "".join(self._inline.pop()))
+        text = raw.strip()
+        if kind == "cell":
+            return text
+        if not text:
+            self._inline[-1].append(raw)
+            return None
+        lead = " " if raw.startswith(" ") else ""
+        trail = " " if raw.endswith(" ") else ""
+        if kind == "a":
+            text = f"[{text}]({value})" if value else text
+        else:
+            text = f"{value}{text}{value}"
+        self._inline[-1].append(f"{lead}{text}{trail}")
+        return None
+
+    def _close_inline(self, kind: str) -> str | None:
+        """弹出行内缓冲直到 kind 这一层（未闭合的内层一并结束）"""
+        if not any(k == kind for k, _ in self._inline_meta):
+            return None
+        while self._inline_meta:
+            top = self._inline_meta[-1][0]
+            result = self._pop_inline()
+            if top == kind:
+                return result
+        return None
+
+    def _end_table(self) -> None:
+        table = self._tables.pop()
+        self._end_row(table)
+        rows = table["rows"]
+        if not rows:
+            return
+        width = max(len(r) for r in rows)
+        lines = []
+        if not table["header"]:
+            lines.append("| " + " | ".join([""] * width) + " |")
+            lines.append("| " + " | ".join(["---"] * width) + " |")
+        for n, row in enumerate(rows):
+            row = row + [""] * (width - len(row))
+            lines.append("| " + " | ".join(row) + " |")
+            if n == 0 and table["header"]:
+                lines.append("| " + " | ".join(["---"] * width) + " |")
+        markdown = "\n".join(lines)
+
+        if self._tables:
+            # 嵌套表格: 拍平成外层单元格里的文字
+            self._inline[-1].append(" " + " ".join(" ".join(r) for r in rows) + " ")
+        else:
+            self._flush_block()
+            self._append_block(markdown)
+            if self.on_table:
+                self.on_table(rows, list(self._recent))
+            self._recent.clear()
+
+    def _end_cell(self, table: dict) -> None:
+        if table["cell"] is None:
+            return
+        colspan = table["cell"]
+        text = self._close_inline("cell") or ""
+        table["cell"] = None
+        table["row"].append(text.replace("|", "\\|"))
+        table["row"].extend([""] * (colspan - 1))
+
+    def _end_row(self, table: dict) -> None:
+        self._end_cell(table)
+        if table["row"] is not None:
+            if table["row"]:
+                table["rows"].append(table["row"])
+            table["row"] = None
+
+    # ---------- HTMLParser 回调 ----------
+
+    def _push(self, tag: str) -> None:
+        self._stack.append(tag)
+        self._open[tag] += 1
+        self._inert += tag not in ACTIVE_TAGS
+
+    def _pop(self) -> str:
+        tag = self._stack.pop()
+        self._open[tag] -= 1
+        self._inert -= tag not in ACTIVE_TAGS
+        return tag
+
+    def _close_to(self, targets: set[str], scope: set[str]) -> None:
+        """隐式结束: 从栈顶往下找 targets 中的标签（遇到 scope 中的标签即停止），找到则连同其上的元素一起结束"""
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i] in targets:
+                break
+            if self._stack[i] in scope:
+                return
+        else:
+            return
+        while len(self._stack) > i:
+            self._close(self._pop())
+
+    def _close_implied(self, tag: str) -> None:
+        """
+        旧版 EDGAR HTML 大量省略结束标签（<P>、<FONT>、<TD> 等）；按 HTML 的隐式结束规则出栈，
+        栈深度不随文档长度增长
+        """
+        cell = tag in ("td", "th", "tr")
+        if cell and self._open["table"]:
+            if tag == "tr":
+                self._close_to({"tr"}, {"table"})
+            else:
+                self._close_to({"td", "th"}, {"tr", "table"})
+        elif tag == "li" and self._open["li"]:
+            self._close_to({"li"}, {"ul", "ol", "table", "td", "th"})
+        if tag in P_CLOSERS and self._open["p"]:
+            self._close_to({"p"}, {"table", "td", "th", "caption"})
+        if self._inert and (cell or tag in P_CLOSERS):
+            # 未闭合的 font / span 等结束时没有动作，直接出栈
+            self._stack = [t for t in self._stack if t in ACTIVE_TAGS]
+            self._open = Counter(self._stack)
+            self._inert = 0
+
+    def handle_starttag(self, tag, attrs):
+        if not self._skip_depth:
+            self._close_implied(tag)
+        if tag not in VOID_TAGS:
+            self._push(tag)
+
+        if self._skip_depth:
+            if tag not in VOID_TAGS:
+                self._skip_depth += 1
+            return
+
+        attrs = dict(attrs)
+        if tag in SKIP_TAGS or HIDDEN_STYLE.search(attrs.get("style") or ""):
+            if tag not in VOID_TAGS:
+                self._skip_depth = 1
+            return
+
+        if tag in BLOCK_TAGS or tag in HEADING_TAGS:
+            self._break()
+        elif tag == "br":
+            if self._in_cell() or self._inline_meta:
+                self._inline[-1].append(" ")
+            else:
+                self._inline[0].append(LINE_BREAK)
+        elif tag == "hr":
+            self._flush_block()
+            self._append_block("---")
+        elif tag in EMPHASIS_TAGS:
+            self._push_inline(tag, EMPHASIS_TAGS[tag])
+        elif tag == "a":
+            self._push_inline("a", attrs.get("href") or "")
+        elif tag in ("ul", "ol"):
+            self._break()
+            self._last_item = False
+            self._list_stack.append([tag, 0])
+        elif tag == "li":
+            self._break()
+        elif tag == "table":
+            if not self._tables:
+                self._flush_block()
+            self._tables.append({"rows": [], "row": None, "cell": None, "header": False})
+        elif tag == "tr" and self._tables:
+            table = self._tables[-1]
+            self._end_row(table)
+            table["row"] = []
+        elif tag in ("td", "th") and self._tables:
+            table = self._tables[-1]
+            self._end_cell(table)
+            if table["row"] is None:
+                table["row"] = []
+            if tag == "th" and not table["rows"]:
+                table["header"] = True
+            try:
+                colspan = max(1, min(int(attrs.get("colspan") or 1), 50))
+            except ValueError:
+                colspan = 1
+            table["cell"] = colspan
+            self._push_inline("cell")
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS or not self._open[tag]:
+            return
+        # 容忍未闭合的标签: 一直弹到匹配的开始标签
+        while self._stack:
+            open_tag = self._pop()
+            self._close(open_tag)
+            if open_tag == tag:
+                break
+
+    def _close(self, tag):
+        if self._skip_depth:
+            self._skip_depth -= 1
+            return
+
+        if tag in HEADING_TAGS:
+            self._flush_block("#" * HEADING_TAGS[tag] + " ")
+        elif tag in BLOCK_TAGS:
+            self._break()
+        elif tag in EMPHASIS_TAGS or tag == "a":
+            self._close_inline(tag)
+        elif tag == "li":
+            if self._in_cell() or self._inline_meta:
+                return
+            marker = "- "
+            if self._list_stack:
+                self._list_stack[-1][1] += 1
+                kind, count = self._list_stack[-1]
+                if kind == "ol":
+                    marker = f"{count}. "
+            self._flush_block(marker, list_item=True)
+        elif tag in ("ul", "ol"):
+            self._break()
+            self._last_item = False
+            if self._list_stack:
+                self._list_stack.pop()
+        elif tag in ("td", "th") and self._tables:
+            self._end_cell(self._tables[-1])
+        elif tag == "tr" and self._tables:
+            self._end_row(self._tables[-1])
+        elif tag == "table" and self._tables:
+            self._end_table()
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._inline[-1].append(data)
+
+
+def convert_html(html_content: str) -> str:
+    """HTML 字符串 → Markdown"""
+    converter = MarkdownConverter()
+    converter.feed(html_content)
+    markdown = converter.finish()
+    return BLANK_LINES.sub("\n\n", markdown).strip()
+
+
+def sniff_encoding(head: bytes, default: str = "utf-8") -> str:
+    """从文档开头找声明的编码，找不到或不认识时用 default"""
+    match = DECLARED_ENCODING.search(head)
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    return default
+
+
+def convert_file(source: Path, output: Path, encoding: str | None = None, on_block=None, on_table=None) -> int:
+    """
+    流式转换: 分块读取 source，边解析边把完成的段落写入 output
+    内存占用与文档大小无关（只缓存当前段落/表格），返回写出的字节数
+
+    Args:
+        on_block: 每写出一个段落时回调 on_block(段落文本, 段落在 output 中的字节偏移)
+        on_table: 见 MarkdownConverter（同一遍解析中拿到表格的结构化单元格）
+    """
+    converter = MarkdownConverter(on_table)
+    written = 0
+    with open(source, "rb") as src, open(output, "wb") as out:
+        head = src.read(4096)
+        decoder = codecs.getincrementaldecoder(encoding or sniff_encoding(head))(errors="replace")
+        chunk = head
+        while chunk:
+            converter.feed(decoder.decode(chunk))
+            written = _write_blocks(out, converter.pop_blocks(), written, on_block)
+            chunk = src.read(CHUNK_SIZE)
+        converter.feed(decoder.decode(b"", final=True))
+        converter.end_input()
+        written = _write_blocks(out, converter.pop_blocks(), written, on_block)
+    return written
+
+
+def _write_blocks(out, blocks: list[str], written: int, on_block=None) -> int:
+    """写出一批段落，段落间空一行（与 convert_html 输出一致），返回累计字节数"""
+    for block in blocks:
+        block = BLANK_LINES.sub("\n\n", block).strip("\n")
+        if not block:
+            continue
+        if written:
+            out.write(b"\n\n")
+            written += 2
+        if on_block:
+            on_block(block, written)
+        data = block.encode("utf-8")
+        out.write(data)
+        written += len(data)
+    return written
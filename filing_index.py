@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+本地 filing 索引 - 从 SEC 每晚发布的 submissions.zip 离线导入
+只导入关注的 CIK（主文件 + 分页文件），zip 按成员流式读取，不解压到磁盘。
+get_submissions 优先读这里，per-CIK 的 HTTP 请求只剩实际的文档下载。
+数据源: https://www.sec.gov/Archives/edgar/daily-index/bulkdata/submissions.zip
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+INDEX_FILE = Path(os.environ.get("SEC_INDEX_DB", Path(__file__).parent / ".sec_index.db"))
+# 归档超过该时长（小时）视为过期，回退到 HTTP；SEC_OFFLINE=1 时不论新旧都用本地数据
+MAX_AGE = float(os.environ.get("SEC_INDEX_MAX_AGE_HOURS", "36")) * 3600
+OFFLINE = os.environ.get("SEC_OFFLINE", "") not in ("", "0")
+
+# CIK0000320193.json / CIK0000320193-submissions-001.json
+MEMBER_NAME = re.compile(r"CIK(\d{10})(?:-submissions-\d+)?\.json$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    cik TEXT PRIMARY KEY,            -- 不带前导 0
+    data TEXT NOT NULL,              -- CIK##########.json 原文
+    as_of REAL NOT NULL              -- 归档文件的修改时间
+);
+CREATE TABLE IF NOT EXISTS pages (
+    name TEXT PRIMARY KEY,           -- CIK##########-submissions-001.json
+    cik TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+
+class FilingIndex:
+    """submissions 数据的本地存储，所有线程共用一个连接"""
+
+    def __init__(self, path: Path = INDEX_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def submissions(self, cik: str, max_age: float = MAX_AGE) -> dict | None:
+        """本地的 submissions JSON，没有或已过期时返回 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT data, as_of FROM submissions WHERE cik = ?",
+                                     (str(int(cik)),)).fetchone()
+        if not row or (not OFFLINE and time.time() - row[1] > max_age):
+            return None
+        return json.loads(row[0])
+
+    def page(self, name: str) -> dict | None:
+        """本地的分页文件，没有时返回 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM pages WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ingest(self, archive: Path, ciks: set[str]) -> dict:
+        """
+        从 submissions.zip 导入指定 CIK（主文件和分页文件）
+
+        Args:
+            archive: 本地 zip 文件
+            ciks: 要导入的 CIK（有无前导 0 均可）
+
+        Returns:
+            {"companies": 导入的公司数, "pages": 分页文件数, "missing": 归档中没有的 CIK, "elapsed": 秒}
+        """
+        started = time.monotonic()
+        wanted = {str(int(c)).zfill(10) for c in ciks}
+        as_of = Path(archive).stat().st_mtime
+        found: set[str] = set()
+        pages = 0
+
+        # 只读中央目录，逐个解压需要的成员
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                match = MEMBER_NAME.search(info.filename)
+                if not match or match.group(1) not in wanted:
+                    continue
+                cik = str(int(match.group(1)))
+                with zf.open(info) as member:
+                    data = member.read().decode("utf-8")
+                name = Path(info.filename).name
+                with self._lock, self._conn:
+                    if "-submissions-" in name:
+                        self._conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?)", (name, cik, data))
+                        pages += 1
+                    else:
+                        self._conn.execute("INSERT OR REPLACE INTO submissions VALUES (?, ?, ?)",
+                                           (cik, data, as_of))
+                        found.add(match.group(1))
+
+        return {
+            "companies": len(found),
+            "pages": pages,
+            "missing": sorted(str(int(c)) for c in wanted - found),
+            "elapsed": time.monotonic() - started,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            companies, oldest = self._conn.execute("SELECT COUNT(*), MIN(as_of) FROM submissions").fetchone()
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        return {"companies": companies, "pages": pages, "as_of": oldest}
+
+
+_index: FilingIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_filing_index() -> FilingIndex:
+    """获取进程内共享的本地索引"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FilingIndex()
+    return _index
+
+
+def local_submissions(cik: str) -> dict | None:
+    """本地索引中未过期的 submissions JSON（没有导入过时不创建索引文件）"""
+    return get_filing_index().submissions(cik) if INDEX_FILE.exists() else None
+
+
+def local_page(name: str) -> dict | None:
+    """本地索引中的分页文件"""
+    return get_filing_index().page(name) if INDEX_FILE.exists() else None
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+HTTP 响应磁盘缓存 - 按 URL 缓存，按资源类型设置 TTL
+过期后用 ETag / Last-Modified 做条件请求，总大小超限时按 LRU 淘汰
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import tracing
+
+CACHE_DIR = Path(os.environ.get("HTTP_CACHE_DIR", Path(__file__).parent / ".http_cache"))
+MAX_BYTES = int(float(os.environ.get("HTTP_CACHE_MAX_MB", "500")) * 1024 * 1024)
+
+# 永不过期
+IMMUTABLE = float("inf")
+
+# (URL 正则, TTL 秒)，按顺序匹配，未匹配的不缓存
+TTL_RULES = [
+    (re.compile(r"sec\.gov/Archives/edgar/data/"), IMMUTABLE),
+    # 分页的历史 filing 列表只会追加新页，已有页基本不变
+    (re.compile(r"data\.sec\.gov/submissions/CIK\d+-submissions-\d+\.json"), 7 * 24 * 3600),
+    (re.compile(r"data\.sec\.gov/submissions/"), 10 * 60),
+    (re.compile(r"data\.sec\.gov/api/xbrl/companyfacts/"), 12 * 3600),
+    (re.compile(r"sec\.gov/files/company_tickers"), 24 * 3600),
+    (re.compile(r"sec\.gov/cgi-bin/browse-edgar"), 24 * 3600),
+    (re.compile(r"fool\.com/quote/"), 15 * 60),
+    (re.compile(r"fool\.com/earnings-call-transcripts/"), 30 * 60),
+    (re.compile(r"fool\.com/earnings/call-transcripts/"), 7 * 24 * 3600),
+]
+
+
+def ttl_for(url: str) -> float:
+    """URL 对应的 TTL，0 表示不缓存"""
+    for pattern, ttl in TTL_RULES:
+        if pattern.search(url):
+            return ttl
+    return 0
+
+
+class ResponseCache:
+    """磁盘缓存: <key>.body 存响应体，<key>.json 存元数据"""
+
+    def __init__(self, directory: Path = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: int | None = None
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+
+    def lookup(self, url: str) -> tuple[dict, Path] | None:
+        """读取缓存条目的元数据和响应体路径（不读入响应体），不存在返回 None"""
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return None
+        if meta.get("url") != url or not body_path.exists():
+            return None
+        # 用 mtime 记录最近访问时间（LRU）
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return meta, body_path
+
+    def load(self, url: str) -> tuple[dict, bytes] | None:
+        """读取缓存条目，不存在返回 None"""
+        entry = self.lookup(url)
+        if not entry:
+            return None
+        try:
+            return entry[0], entry[1].read_bytes()
+        except OSError:
+            return None
+
+    def store(self, url: str, resp: requests.Response) -> None:
+        """保存 200 响应"""
+        body = resp.content
+        self._save(url, resp, len(body), lambda path: path.write_bytes(body))
+
+    def store_file(self, url: str, resp: requests.Response, source: Path) -> None:
+        """保存已经流式写入 source 文件的 200 响应"""
+        self._save(url, resp, source.stat().st_size, lambda path: shutil.copyfile(source, path))
+
+    def _save(self, url: str, resp: requests.Response, size: int, write_body) -> None:
+        """
+        响应体先写到临时文件（不占锁），再在锁内替换并调整总大小:
+        被替换条目的大小在锁内读取，并发保存同一 URL 时不会重复计入
+        """
+        meta = {
+            "url": url,
+            "stored_at": time.time(),
+            "size": size,
+            "encoding": resp.encoding,
+            "headers": {k: v for k, v in resp.headers.items()
+                        if k.lower() in ("content-type", "etag", "last-modified")},
+        }
+        meta_path, body_path = self._paths(url)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = _tmp_path(body_path)
+        write_body(tmp)
+        with self._lock:
+            try:
+                old = body_path.stat().st_size
+            except OSError:
+                old = 0
+            os.replace(tmp, body_path)
+            _atomic_write(meta_path, json.dumps(meta).encode())
+            if self._total is not None:
+                self._total += size - old
+        self._evict()
+
+    def touch(self, url: str, meta: dict) -> None:
+        """304 后刷新存储时间"""
+        meta["stored_at"] = time.time()
+        meta_path, _ = self._paths(url)
+        try:
+            _atomic_write(meta_path, json.dumps(meta).encode())
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        """总大小超限时删除最久未访问的条目"""
+        with self._lock:
+            if self._total is None:
+                self._total = sum(p.stat().st_size for p in self.directory.glob("*.body"))
+            if self._total <= self.max_bytes:
+                return
+            entries = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+            for meta_path in entries:
+                if self._total <= self.max_bytes * 0.9:
+                    break
+                body_path = meta_path.with_suffix(".body")
+                try:
+                    size = body_path.stat().st_size
+                    body_path.unlink()
+                    meta_path.unlink()
+                except OSError:
+                    continue
+                self._total -= size
+                self.evictions += 1
+
+    def record(self, hit: bool, saved: int = 0, revalidated: bool = False) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.bytes_saved += saved
+                if revalidated:
+                    self.revalidated += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "bytes_saved": self.bytes_saved,
+                "evictions": self.evictions,
+            }
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = _tmp_path(path)
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _build_response(url: str, meta: dict, body: bytes) -> requests.Response:
+    """用缓存内容构造 Response 对象，调用方无需区分来源"""
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.url = url
+    resp._content = body
+    resp.encoding = meta.get("encoding")
+    resp.headers = CaseInsensitiveDict(meta.get("headers", {}))
+    resp.headers["X-Cache"] = "HIT"
+    return resp
+
+
+_cache: ResponseCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """获取进程内共享的缓存"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+def cached_get(fetch, url: str, params: dict | None = None, **kwargs) -> requests.Response:
+    """
+    带缓存的 GET
+
+    Args:
+        fetch: 实际发请求的函数，签名同 requests.get
+        url: 请求 URL
+        params: 查询参数（计入缓存 key）
+    """
+    if params:
+        url = requests.Request("GET", url, params=params).prepare().url
+    with tracing.span("http", host=urlsplit(url).netloc, url=url) as attrs:
+        resp = _cached_get(fetch, url, attrs, **kwargs)
+        attrs["status"] = resp.status_code
+        if not kwargs.get("stream"):
+            attrs["bytes"] = len(resp.content)
+        return resp
+
+
+def _cached_get(fetch, url: str, attrs: dict, **kwargs) -> requests.Response:
+    ttl = ttl_for(url)
+    if ttl <= 0 or kwargs.get("stream"):
+        attrs["cache"] = "bypass"
+        return fetch(url, **kwargs)
+
+    cache = get_cache()
+    entry = cache.load(url)
+    if entry:
+        meta, body = entry
+        if time.time() - meta["stored_at"] < ttl:
+            cache.record(hit=True, saved=len(body))
+            attrs["cache"] = "hit"
+            return _build_response(url, meta, body)
+
+        # 过期: 条件请求
+        headers = dict(kwargs.pop("headers", None) or {})
+        etag = meta["headers"].get("ETag") or meta["headers"].get("etag")
+        modified = meta["headers"].get("Last-Modified") or meta["headers"].get("last-modified")
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
+        resp = fetch(url, headers=headers, **kwargs)
+        if resp.status_code == 304:
+            cache.touch(url, meta)
+            cache.record(hit=True, saved=len(body), revalidated=True)
+            attrs["cache"] = "revalidated"
+            return _build_response(url, meta, body)
+    else:
+        resp = fetch(url, **kwargs)
+
+    cache.record(hit=False)
+    attrs["cache"] = "miss"
+    if resp.status_code == 200:
+        cache.store(url, resp)
+    return resp
+
+
+def _declared_encoding(headers, encoding: str | None) -> str | None:
+    """只有 Content-Type 明确带 charset 时才返回编码（requests 对 text/* 默认猜 ISO-8859-1）"""
+    content_type = next((v for k, v in headers.items() if k.lower() == "content-type"), "")
+    return encoding if "charset" in content_type.lower() else None
+
+
+def cached_download(fetch, url: str, dest: Path, chunk_size: int = 1024 * 1024) -> dict:
+    """
+    带缓存的流式下载: 响应体分块写入 dest，不整体读入内存
+
+    Args:
+        fetch: 实际发请求的函数，签名同 requests.get（需支持 stream=True）
+        url: 请求 URL
+        dest: 目标文件
+
+    Returns:
+        {"size": 字节数, "encoding": Content-Type 中声明的编码或 None, "cached": 是否命中缓存}
+    """
+    with tracing.span("http.download", host=urlsplit(url).netloc, url=url) as attrs:
+        info = _cached_download(fetch, url, dest, chunk_size)
+        attrs.update(bytes=info["size"], cache="hit" if info["cached"] else "miss")
+        return info
+
+
+def _cached_download(fetch, url: str, dest: Path, chunk_size: int) -> dict:
+    ttl = ttl_for(url)
+    cache = get_cache() if ttl > 0 else None
+
+    if cache:
+        entry = cache.lookup(url)
+        if entry and time.time() - entry[0]["stored_at"] < ttl:
+            meta, body_path = entry
+            shutil.copyfile(body_path, dest)
+            cache.record(hit=True, saved=meta["size"])
+            encoding = _declared_encoding(meta.get("headers", {}), meta.get("encoding"))
+            return {"size": meta["size"], "encoding": encoding, "cached": True}
+
+    resp = fetch(url, stream=True)
+    try:
+        resp.raise_for_status()
+        size = 0
+        with open(dest, "wb") as f:
+            for chunk in resp.iter_content(chunk_size):
+                f.write(chunk)
+                size += len(chunk)
+    finally:
+        resp.close()
+
+    if cache:
+        cache.record(hit=False)
+        cache.store_file(url, resp, Path(dest))
+    encoding = _declared_encoding(resp.headers, resp.encoding)
+    return {"size": size, "encoding": encoding, "cached": False}
+
+
+def cache_stats() -> dict:
+    """缓存命中统计"""
+    return get_cache().stats()
+
+
+def format_stats() -> str:
+    """格式化统计信息，用于 CLI 输出"""
+    s = cache_stats()
+    total = s["hits"] + s["misses"]
+    rate = s["hits"] / total * 100 if total else 0.0
+    return (f"HTTP 缓存: 命中 {s['hits']} / 未命中 {s['misses']} ({rate:.0f}%), "
+            f"重新验证 {s['revalidated']}, 节省 {s['bytes_saved'] / 1024 / 1024:.1f} MB")
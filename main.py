@@ -6,24 +6,38 @@
 import argparse
 import os
 import re
+import sqlite3
 import subprocess
 import sys
+import tempfile
+import time
+from concurrent.futures import Future
 from pathlib import Path
 
-import requests
-from bs4 import BeautifulSoup
-from markdownify import markdownify as md
+import http_cache
+import pipeline
+import tracing
+from catalog import format_hits, format_rows, get_catalog
+from edgar_markdown import convert_html
+from manifest import get_manifest
+from sec_client import format_stats, sec_download, sec_get
+from submissions import get_submissions
+from ticker_lookup import lookup_cik
 
 
-# SEC API 要求设置 User-Agent
-HEADERS = {
-    "User-Agent": os.environ.get("SEC_USER_AGENT", "MyApp contact@example.com"),
-    "Accept-Encoding": "gzip, deflate",
-}
+def get_cik(ticker: str) -> str:
+    """通过 ticker 获取公司 CIK（优先本地 company_tickers 索引）"""
+    try:
+        cik = lookup_cik(ticker)
+    except Exception:
+        cik = None
+    if cik:
+        return cik
+    return get_cik_from_edgar(ticker)
 
 
-def get_cik(ticker: str) -> str:
-    """通过 ticker 获取公司 CIK"""
+def get_cik_from_edgar(ticker: str) -> str:
+    """通过 browse-edgar Atom feed 获取 CIK（索引中没有的 ticker 使用）"""
     url = "https://www.sec.gov/cgi-bin/browse-edgar"
     params = {
         "action": "getcompany",
@@ -34,7 +48,7 @@ def get_cik(ticker: str) -> str:
         "count": 1,
         "output": "atom",
     }
-    resp = requests.get(url, params=params, headers=HEADERS)
+    resp = sec_get(url, params=params)
     resp.raise_for_status()
 
     # 从 Atom feed 中提取 CIK
@@ -45,67 +59,58 @@ def get_cik(ticker: str) -> str:
 
 
 def get_latest_filing(cik: str, form_type: str) -> dict | None:
-    """获取最新的指定类型 filing 信息"""
-    cik_padded = cik.zfill(10)
-    url = f"https://data.sec.gov/submissions/CIK{cik_padded}.json"
+    """获取最新的指定类型 filing 信息（submissions JSON 每个 CIK 只拉一次）"""
+    return get_submissions(cik).latest(form_type)
 
-    resp = requests.get(url, headers=HEADERS)
-    resp.raise_for_status()
-    data = resp.json()
-
-    filings = data.get("filings", {}).get("recent", {})
-    forms = filings.get("form", [])
-    accessions = filings.get("accessionNumber", [])
-    primary_docs = filings.get("primaryDocument", [])
-    filing_dates = filings.get("filingDate", [])
-
-    for i, form in enumerate(forms):
-        if form == form_type:
-            return {
-                "accession": accessions[i].replace("-", ""),
-                "accession_display": accessions[i],
-                "primary_document": primary_docs[i],
-                "filing_date": filing_dates[i],
-            }
-    return None
-
-
-def download_primary_document(cik: str, filing: dict) -> str:
-    """下载主文档 HTML 内容"""
-    accession = filing["accession"]
-    primary_doc = filing["primary_document"]
-
-    url = f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession}/{primary_doc}"
-    print(f"  下载: {url}")
 
-    resp = requests.get(url, headers=HEADERS)
-    resp.raise_for_status()
-    return resp.text
+def filing_url(cik: str, filing: dict) -> str:
+    """主文档的 EDGAR URL"""
+    return f"https://www.sec.gov/Archives/edgar/data/{cik}/{filing['accession']}/{filing['primary_document']}"
 
 
-def html_to_markdown(html_content: str) -> str:
-    """将 HTML 转换为干净的 Markdown"""
-    soup = BeautifulSoup(html_content, "html.parser")
+def download_primary_document_to_file(cik: str, filing: dict, dest: Path) -> dict:
+    """流式下载主文档到文件（不整体读入内存），返回 {"size", "encoding", "cached"}"""
+    url = filing_url(cik, filing)
+    print(f"  下载: {url}")
+    return sec_download(url, dest)
+
 
-    # 移除不需要的元素
-    for tag in soup.find_all(["script", "style", "meta", "link", "noscript"]):
-        tag.decompose()
+def submit_filing(cik: str, filing: dict, output_file: Path) -> Future:
+    """
+    流式下载主文档到临时文件，交给转换流水线（分块转换，边转边写 output_file）
+    返回的 Future 结果见 pipeline.ConversionPipeline.submit_file
+    """
+    fd, raw_file = tempfile.mkstemp(suffix=".htm.part", dir=output_file.parent)
+    os.close(fd)
+    started = time.monotonic()
+    try:
+        info = download_primary_document_to_file(cik, filing, Path(raw_file))
+    except Exception:
+        Path(raw_file).unlink(missing_ok=True)
+        raise
+    return pipeline.get_pipeline().submit_file(
+        Path(raw_file), output_file, time.monotonic() - started, info["encoding"])
 
-    # 移除隐藏元素
-    for tag in soup.find_all(style=re.compile(r"display:\s*none", re.I)):
-        tag.decompose()
 
-    # 转换为 Markdown
-    markdown = md(str(soup), heading_style="ATX", bullets="-")
+def record_filing(download_dir: Path, ticker: str, cik: str, form_type: str, filing: dict,
+                  output_file: Path, result: dict) -> None:
+    """转换完成后记入下载清单和文档目录（result 为流水线返回的结果）"""
+    get_manifest(download_dir).record("filings", filing["accession"], output_file, result["sha256"],
+                                      ticker=ticker, form=form_type, filing_date=filing["filing_date"])
+    get_catalog(download_dir).record(
+        "filing", filing["accession"], ticker, form_type, output_file, result["sha256"],
+        cik=cik, accession=filing["accession"], filing_date=filing["filing_date"],
+        source_url=filing_url(cik, filing), convert_seconds=result["convert"])
 
-    # 清理多余空行
-    markdown = re.sub(r"\n{3,}", "\n\n", markdown)
 
-    return markdown.strip()
+def html_to_markdown(html_content: str) -> str:
+    """将 HTML 转换为干净的 Markdown（单遍解析，见 edgar_markdown）"""
+    with tracing.span("html_to_markdown", bytes=len(html_content)):
+        return convert_html(html_content)
 
 
-def download_and_convert(ticker: str, download_dir: Path) -> tuple[Path, list[dict]]:
-    """下载并转换财报，返回 (目录路径, 文件信息列表)"""
+def download_and_convert(ticker: str, download_dir: Path, force: bool = False) -> tuple[Path, list[dict]]:
+    """下载并转换财报，返回 (目录路径, 文件信息列表)；清单中已有的 filing 跳过（force 时重新下载）"""
     print(f"正在处理 {ticker}...")
 
     # 获取 CIK
@@ -117,9 +122,11 @@ def download_and_convert(ticker: str, download_dir: Path) -> tuple[Path, list[di
     ticker_dir = download_dir / ticker
     ticker_dir.mkdir(parents=True, exist_ok=True)
 
+    manifest = get_manifest(download_dir)
     downloaded_files = []
+    pending = []
 
-    # 尝试获取 10-K 和 10-Q
+    # 尝试获取 10-K 和 10-Q（下载完立即交给转换进程池，继续下一个下载）
     for form_type in ["10-K", "10-Q"]:
         print(f"  查找最新 {form_type}...")
         filing = get_latest_filing(cik, form_type)
@@ -130,17 +137,30 @@ def download_and_convert(ticker: str, download_dir: Path) -> tuple[Path, list[di
 
         print(f"  找到 {form_type} ({filing['filing_date']})")
 
-        # 下载主文档
-        html_content = download_primary_document(cik, filing)
-
-        # 转换为 Markdown
-        print("  转换为 Markdown...")
-        markdown = html_to_markdown(html_content)
+        # 已下载过同一 accession 且文件未变化
+        entry = None if force else manifest.lookup("filings", filing["accession"])
+        if entry:
+            print(f"  已是最新，跳过: {entry['path']}")
+            downloaded_files.append({
+                "type": form_type,
+                "date": filing["filing_date"],
+                "filename": Path(entry["path"]).name,
+                "skipped": True,
+            })
+            continue
 
-        # 保存文件
+        # 流式下载主文档，转换为 Markdown 并保存
         output_file = ticker_dir / f"{ticker}_{form_type}_{filing['filing_date']}.md"
-        output_file.write_text(markdown, encoding="utf-8")
-        print(f"  已保存: {output_file.name}")
+        pending.append((form_type, filing, output_file, submit_filing(cik, filing, output_file)))
+
+    if pending:
+        print("  转换为 Markdown...")
+    for form_type, filing, output_file, future in pending:
+        result = future.result()
+        record_filing(download_dir, ticker, cik, form_type, filing, output_file, result)
+        print(f"  已保存: {output_file.name} "
+              f"({result['bytes_in'] / 1024 / 1024:.1f} MB, "
+              f"{pipeline.format_peak_rss(result['peak_rss_mb'], result['peak_rss_scope'])})")
 
         downloaded_files.append({
             "type": form_type,
@@ -191,14 +211,243 @@ def print_report_summary(sec_files: list[dict], earnings_date: str | None):
     print("=" * 50)
 
 
+def catalog_main(argv: list[str]) -> None:
+    """子命令: python main.py catalog [--ticker NVDA] [--form 10-Q] [--days 30]"""
+    parser = argparse.ArgumentParser(prog="main.py catalog", description="查询已下载文档目录")
+    parser.add_argument("--ticker", "-t", action="append", help="股票代码，可重复")
+    parser.add_argument("--form", "-f", action="append", help="表单类型 (10-K / 10-Q / \"Earnings Call\")，可重复")
+    parser.add_argument("--days", "-d", type=int, help="只看最近 N 天发布的文档")
+    parser.add_argument("--since", help="起始日期 YYYY-MM-DD")
+    parser.add_argument("--until", help="截止日期 YYYY-MM-DD")
+    parser.add_argument("--limit", "-n", type=int, help="最多显示条数")
+    args = parser.parse_args(argv)
+
+    catalog = get_catalog(Path("downloads"))
+    filters = {"tickers": args.ticker, "forms": args.form, "until": args.until, "limit": args.limit}
+    if args.days is not None:
+        rows = catalog.recent(args.days, **filters)
+    else:
+        rows = catalog.query(since=args.since, **filters)
+    print(format_rows(rows))
+    print(f"\n共 {len(rows)} 个文档")
+
+
+def search_main(argv: list[str]) -> None:
+    """子命令: python main.py search "guidance cut" [--ticker NVDA] [--form 10-Q]"""
+    parser = argparse.ArgumentParser(prog="main.py search", description="全文搜索已下载文档")
+    parser.add_argument("query", help='关键词（全部命中），或 FTS5 表达式如 \'"guidance cut" OR tariff*\'')
+    parser.add_argument("--ticker", "-t", action="append", help="股票代码，可重复")
+    parser.add_argument("--form", "-f", action="append", help="表单类型，可重复")
+    parser.add_argument("--limit", "-n", type=int, default=10, help="最多显示条数")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        hits = get_catalog(Path("downloads")).search(args.query, tickers=args.ticker, forms=args.form,
+                                                     limit=args.limit, highlight=("[", "]"))
+    except sqlite3.OperationalError as e:
+        print(f"查询语法错误: {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(format_hits(hits))
+    print(f"\n{len(hits)} 个结果 ({elapsed:.0f} ms)")
+
+
+def backfill_main(argv: list[str]) -> None:
+    """子命令: python main.py backfill NVDA AAPL --years 5 [--form 10-Q]"""
+    from datetime import date
+
+    from backfill import DEFAULT_FORMS, backfill
+    from watchlist import load_watchlist
+
+    parser = argparse.ArgumentParser(prog="main.py backfill", description="回填历史 10-K / 10-Q",
+                                     epilog="中断后重新运行同一命令即可继续（已下载的跳过）")
+    parser.add_argument("tickers", nargs="*", help="股票代码，省略时使用 Watchlist")
+    parser.add_argument("--form", "-f", action="append", help=f"表单类型，可重复（默认 {' '.join(DEFAULT_FORMS)}）")
+    parser.add_argument("--years", "-y", type=float, default=3, help="回填最近 N 年（默认 3）")
+    parser.add_argument("--since", help="起始日期 YYYY-MM-DD（优先于 --years）")
+    parser.add_argument("--until", default=date.today().isoformat(), help="截止日期 YYYY-MM-DD（默认今天）")
+    parser.add_argument("--force", action="store_true", help="忽略下载清单，重新下载已有文件")
+    args = parser.parse_args(argv)
+
+    tickers = [t.upper() for t in args.tickers] or load_watchlist()
+    if not tickers:
+        parser.error("请指定股票代码，或先在 Watchlist 中添加")
+    since = args.since or date.fromordinal(date.today().toordinal() - int(args.years * 365)).isoformat()
+
+    print(f"回填 {', '.join(tickers)}: {since} ~ {args.until}")
+
+    def on_progress(event):
+        mark = {"downloaded": "已保存", "skipped": "已有，跳过", "failed": "失败"}[event["status"]]
+        error = f": {event['error']}" if event.get("error") else ""
+        print(f"  [{event['done']}] {event['ticker']} {event['filing']} {mark}{error}")
+
+    summary = backfill(tickers, Path("downloads"), since, args.until, forms=args.form,
+                       force=args.force, on_progress=on_progress)
+    print(f"\n共 {summary['planned']} 个 filing: 下载 {summary['downloaded']}, "
+          f"跳过 {summary['skipped']}, 失败 {summary['failed']} ({summary['elapsed']:.1f}s)")
+    for ticker, label, error in summary["errors"]:
+        print(f"  错误 {ticker} {label}: {error}", file=sys.stderr)
+    print(format_stats())
+    print(pipeline.format_stats())
+
+
+def ingest_main(argv: list[str]) -> None:
+    """子命令: python main.py ingest submissions.zip [NVDA AAPL] [--cik 320193]"""
+    from filing_index import get_filing_index
+    from watchlist import load_watchlist
+
+    parser = argparse.ArgumentParser(prog="main.py ingest",
+                                     description="从本地 submissions.zip 导入关注公司的 filing 列表（离线）")
+    parser.add_argument("archive", type=Path, help="submissions.zip 路径")
+    parser.add_argument("tickers", nargs="*", help="股票代码，省略时使用 Watchlist")
+    parser.add_argument("--cik", action="append", default=[], help="直接指定 CIK，可重复")
+    args = parser.parse_args(argv)
+
+    ciks = set(args.cik)
+    for ticker in [t.upper() for t in args.tickers] or ([] if args.cik else load_watchlist()):
+        cik = lookup_cik(ticker)
+        if cik:
+            ciks.add(cik)
+        else:
+            print(f"  跳过 {ticker}: 本地 ticker 索引中没有 CIK（可用 --cik 指定）", file=sys.stderr)
+    if not ciks:
+        parser.error("没有要导入的公司")
+
+    index = get_filing_index()
+    result = index.ingest(args.archive, ciks)
+    print(f"已导入 {result['companies']} 家公司, {result['pages']} 个分页文件 ({result['elapsed']:.1f}s)")
+    print(f"本地索引共 {index.stats()['companies']} 家公司: {index.path}")
+    if result["missing"]:
+        print(f"归档中没有: {', '.join(result['missing'])}", file=sys.stderr)
+
+
+def facts_main(argv: list[str]) -> None:
+    """子命令: python main.py facts NVDA AMD [--metric revenue] [--update]"""
+    from watchlist import load_watchlist
+    from xbrl_facts import CONCEPT_ALIASES, format_compare, get_fact_store, update_facts
+
+    parser = argparse.ArgumentParser(prog="main.py facts", description="XBRL 财务数据季度对比")
+    parser.add_argument("tickers", nargs="*", help="股票代码，省略时使用 Watchlist")
+    parser.add_argument("--metric", "-m", default="revenue",
+                        help=f"指标别名 ({', '.join(CONCEPT_ALIASES)}) 或概念名 (us-gaap:Revenues)")
+    parser.add_argument("--quarters", "-q", type=int, default=4, help="显示最近 N 个季度")
+    parser.add_argument("--update", "-u", action="store_true", help="重新拉取 companyfacts")
+    parser.add_argument("--archive", type=Path, help="从本地 companyfacts.zip 读取（离线）")
+    args = parser.parse_args(argv)
+
+    tickers = [t.upper() for t in args.tickers] or load_watchlist()
+    if not tickers:
+        parser.error("请指定股票代码，或先在 Watchlist 中添加")
+
+    download_dir = Path("downloads")
+    store = get_fact_store(download_dir)
+    for ticker in tickers:
+        if args.update or args.archive or store.get(ticker) is None:
+            try:
+                table = update_facts(ticker, get_cik(ticker), download_dir, args.archive)
+                print(f"  {ticker}: {len(table)} 条事实")
+            except Exception as e:
+                print(f"  {ticker}: 获取 companyfacts 失败: {e}", file=sys.stderr)
+
+    started = time.perf_counter()
+    result = store.compare(args.metric, tickers, args.quarters)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(format_compare(result, args.metric))
+    print(f"\n({elapsed:.1f} ms)")
+
+
+def section_main(argv: list[str]) -> None:
+    """子命令: python main.py section NVDA 1A [--form 10-Q] [--list]"""
+    from sections import load_index, read_section
+
+    parser = argparse.ArgumentParser(prog="main.py section", description="只读取已下载财报中的一节")
+    parser.add_argument("ticker", help="股票代码")
+    parser.add_argument("item", nargs="?", help='Item 号，如 1A、7、"II-1A"（10-Q 的 Part II）')
+    parser.add_argument("--form", "-f", default="10-K", help="表单类型（默认 10-K）")
+    parser.add_argument("--list", "-l", action="store_true", help="列出所有节")
+    args = parser.parse_args(argv)
+
+    download_dir = Path("downloads")
+    rows = get_catalog(download_dir).query(tickers=[args.ticker], forms=[args.form], limit=1)
+    if not rows:
+        parser.error(f"没有已下载的 {args.ticker.upper()} {args.form}")
+    markdown_file = download_dir / rows[0]["path"]
+
+    if args.list or not args.item:
+        print(f"{markdown_file}:")
+        for section in load_index(markdown_file):
+            size = (section["end"] - section["start"]) / 1024
+            print(f"  {section['key']:<8} {section['title'][:60]:<60} {size:>8.0f} KB")
+        return
+
+    text = read_section(markdown_file, args.item)
+    if text is None:
+        parser.error(f"{markdown_file.name} 中没有 Item {args.item}（用 --list 查看）")
+    print(text)
+
+
+def tables_main(argv: list[str]) -> None:
+    """子命令: python main.py tables NVDA [--form 10-Q] [--caption operations] [--show 3]"""
+    import csv
+
+    from tables import find_tables, load_table_index, read_table, tables_dir
+
+    parser = argparse.ArgumentParser(prog="main.py tables", description="查看已下载财报中抽取出的表格")
+    parser.add_argument("ticker", help="股票代码")
+    parser.add_argument("--form", "-f", default="10-Q", help="表单类型（默认 10-Q）")
+    parser.add_argument("--caption", "-c", help="按标题关键词过滤，如 operations、balance sheets")
+    parser.add_argument("--show", "-s", type=int, default=0, help="输出前 N 个表格的 CSV 内容")
+    args = parser.parse_args(argv)
+
+    download_dir = Path("downloads")
+    rows = get_catalog(download_dir).query(tickers=[args.ticker], forms=[args.form], limit=1)
+    if not rows:
+        parser.error(f"没有已下载的 {args.ticker.upper()} {args.form}")
+    markdown_file = download_dir / rows[0]["path"]
+
+    found = find_tables(markdown_file, args.caption) if args.caption else load_table_index(markdown_file)
+    print(f"{tables_dir(markdown_file)}: {len(found)} 个表格")
+    for n, table in enumerate(found):
+        print(f"  {table['file']}  {table['rows']}x{table['columns']}  {table['caption'][:90]}")
+        if n < args.show:
+            csv.writer(sys.stdout).writerows(read_table(markdown_file, table["file"]))
+            print()
+
+
+# 子命令: python main.py <子命令> ...（其余参数按 ticker 处理）
+SUBCOMMANDS = {
+    "catalog": catalog_main,
+    "search": search_main,
+    "backfill": backfill_main,
+    "ingest": ingest_main,
+    "facts": facts_main,
+    "section": section_main,
+    "tables": tables_main,
+}
+
+
 def main():
-    parser = argparse.ArgumentParser(description="下载SEC财报和Earnings Call")
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="下载SEC财报和Earnings Call",
+                                     epilog="子命令: " + ", ".join(SUBCOMMANDS))
     parser.add_argument("ticker", help="股票代码 (如 NVDA, AAPL)")
     parser.add_argument("--earnings", "-e", action="store_true",
                         help="下载 Earnings Call Transcript")
     parser.add_argument("--no-sec", action="store_true",
                         help="跳过 SEC 财报下载")
+    parser.add_argument("--force", action="store_true",
+                        help="忽略下载清单，重新下载已有文件")
+    parser.add_argument("--profile", action="store_true",
+                        help="结束时输出各操作的耗时、次数、字节数和缓存命中统计")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="把每个操作的埋点追加写入 JSON-lines 文件（也可用环境变量 TRACE_FILE）")
     args = parser.parse_args()
+    if args.trace:
+        tracing.enable_trace(args.trace)
 
     ticker = args.ticker.upper()
     download_dir = Path("downloads")
@@ -210,30 +459,34 @@ def main():
     try:
         # 下载 SEC 财报 (10-K, 10-Q)
         if not args.no_sec:
-            ticker_folder, sec_files = download_and_convert(ticker, download_dir)
+            ticker_folder, sec_files = download_and_convert(ticker, download_dir, force=args.force)
 
         # 下载 Earnings Call Transcript
         if args.earnings:
-            from earnings import download_earnings_transcript, search_transcript_from_quote_page, search_transcript_from_index, download_transcript_page
+            from earnings import download_earnings_transcript, find_transcript, transcript_date
 
-            # 获取日期信息
-            url = search_transcript_from_quote_page(ticker)
-            if not url:
-                url = search_transcript_from_index(ticker)
+            # 获取日期信息（查询结果在本次运行内复用，下载时不再重复抓取）
+            url = find_transcript(ticker)
             if url:
-                _, metadata = download_transcript_page(url)
-                earnings_date = metadata.get("date")
+                earnings_date = transcript_date(url)
 
-            ticker_folder = download_earnings_transcript(ticker, download_dir)
+            ticker_folder = download_earnings_transcript(ticker, download_dir, force=args.force)
 
         # 打印报告时间摘要
         print_report_summary(sec_files, earnings_date)
+        if not args.no_sec:
+            print(format_stats())
+            print(pipeline.format_stats())
+        print(http_cache.format_stats())
 
         open_folder(ticker_folder)
         show_prompt()
     except Exception as e:
         print(f"错误: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if args.profile:
+            print("\n" + tracing.format_summary())
 
 
 if __name__ == "__main__":
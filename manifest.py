@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+下载清单 - 记录已保存的 filing（按 accession）和 transcript（按 URL）
+再次同步时已存在且未变化的文档直接跳过，不再下载和转换
+文件位置: downloads/.manifest.json
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+MANIFEST_NAME = ".manifest.json"
+
+
+def file_sha256(path: Path) -> str:
+    """分块计算文件 sha256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """{"filings": {accession: 条目}, "transcripts": {url: 条目}}"""
+
+    def __init__(self, download_dir: Path):
+        self.download_dir = Path(download_dir)
+        self.path = self.download_dir / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self._data = {"filings": {}, "transcripts": {}}
+        if self.path.exists():
+            try:
+                self._data.update(json.loads(self.path.read_text()))
+            except (OSError, json.JSONDecodeError):
+                pass
+
+    def lookup(self, kind: str, key: str, verify: bool = False) -> dict | None:
+        """
+        已保存且文件未变化时返回条目，否则返回 None
+
+        Args:
+            kind: "filings" 或 "transcripts"
+            key: accession 或 transcript URL
+            verify: 是否重新计算 sha256（默认只比较文件大小）
+        """
+        with self._lock:
+            entry = self._data[kind].get(key)
+        if not entry:
+            return None
+        path = self.download_dir / entry["path"]
+        try:
+            if path.stat().st_size != entry["size"]:
+                return None
+        except OSError:
+            return None
+        if verify and file_sha256(path) != entry["sha256"]:
+            return None
+        return entry
+
+    def entries(self):
+        """遍历所有条目: (kind, key, 条目)"""
+        with self._lock:
+            items = [(kind, key, dict(entry)) for kind, section in self._data.items()
+                     for key, entry in section.items()]
+        return items
+
+    def record(self, kind: str, key: str, path: Path, sha256: str | None = None, **fields) -> dict:
+        """记录一个已保存的文档并写盘"""
+        path = Path(path)
+        entry = {
+            **fields,
+            "path": str(path.relative_to(self.download_dir)),
+            "size": path.stat().st_size,
+            "sha256": sha256 or file_sha256(path),
+            "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with self._lock:
+            self._data[kind][key] = entry
+            self._save()
+        return entry
+
+    def _save(self) -> None:
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(self._data, ensure_ascii=False, indent=1))
+        os.replace(tmp, self.path)
+
+
+_manifests: dict[Path, Manifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(download_dir: Path) -> Manifest:
+    """获取下载目录对应的清单（进程内共享）"""
+    key = Path(download_dir).resolve()
+    with _manifests_lock:
+        if key not in _manifests:
+            _manifests[key] = Manifest(Path(download_dir))
+        return _manifests[key]
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+转换流水线 - 网络抓取和 HTML → Markdown 转换解耦
+抓取线程把流式下载到临时文件的原始 HTML 提交到有界队列，进程池（默认 CPU 核数）负责流式转换并写盘，
+队列满时提交方阻塞（背压），避免大量文档堆积。
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+import tracing
+from edgar_markdown import convert_file
+from manifest import file_sha256
+from sections import SectionIndexer, save_index
+from tables import TableExtractor
+
+# 进程数，0 表示在当前线程内直接转换
+WORKERS = int(os.environ.get("CONVERT_WORKERS", os.cpu_count() or 1))
+# 最多允许多少个文档在排队/转换中
+MAX_PENDING = WORKERS * 2 if WORKERS else 1
+
+STAGES = ("fetch", "queue", "convert", "write")
+
+
+def _reset_peak_rss() -> bool:
+    """
+    重置本进程的峰值 RSS；只有 Linux 支持（/proc/self/clear_refs），
+    其他平台返回 False，之后读到的是进程启动以来的峰值
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    """本进程的峰值 RSS（MB）"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位是字节，Linux 是 KB
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _convert_file(raw_file: str, output_file: str, encoding: str | None, submitted: float) -> dict:
+    """
+    在工作进程中执行: 从临时文件流式转换，同一遍解析中建分节索引、抽取表格，完成后删除临时文件
+    """
+    started = time.time()
+    reset = _reset_peak_rss()
+    indexer = SectionIndexer()
+    extractor = TableExtractor(Path(output_file))
+
+    def on_block(block: str, offset: int) -> None:
+        indexer.add(block, offset)
+        extractor.on_block(block, offset)
+
+    try:
+        bytes_in = os.path.getsize(raw_file)
+        bytes_out = convert_file(Path(raw_file), Path(output_file), encoding,
+                                 on_block=on_block, on_table=extractor.on_table)
+    finally:
+        Path(raw_file).unlink(missing_ok=True)
+    sections = indexer.sections(bytes_out)
+    save_index(Path(output_file), sections)
+    tables = extractor.finish()
+    return {
+        "queue": started - submitted,
+        "convert": time.time() - started,
+        "write": 0.0,  # 边转换边写，计入 convert
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "sha256": file_sha256(Path(output_file)),
+        "sections": len(sections),
+        "tables": tables,
+        "peak_rss_mb": _peak_rss_mb(),
+        "peak_rss_scope": "document" if reset else "process",
+    }
+
+
+class ConversionPipeline:
+    """进程池转换 + 有界提交 + 分阶段计时"""
+
+    def __init__(self, workers: int = WORKERS, max_pending: int = MAX_PENDING):
+        self.workers = workers
+        self._pool = ProcessPoolExecutor(max_workers=workers) if workers else None
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._lock = threading.Lock()
+        self._totals = {stage: 0.0 for stage in STAGES}
+        self._documents = 0
+        self._bytes_in = 0
+        self._peak_rss_mb = 0.0
+        self._peak_rss_scope = "document"
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._totals[stage] += seconds
+
+    def submit_file(self, raw_file: Path, output_file: Path, fetch_seconds: float = 0.0,
+                    encoding: str | None = None) -> Future:
+        """
+        提交一个已下载到磁盘的文档（流式转换，转换后删除 raw_file），队列满时阻塞
+        结果额外包含 peak_rss_mb: 转换该文档时工作进程的峰值内存
+        """
+        return self._submit(_convert_file, fetch_seconds, str(raw_file), str(output_file), encoding)
+
+    def _submit(self, fn, fetch_seconds: float, *args) -> Future:
+        waited = time.monotonic()
+        self._slots.acquire()
+        self.record("queue", time.monotonic() - waited)
+        self.record("fetch", fetch_seconds)
+
+        if self._pool is None:
+            future = Future()
+            try:
+                future.set_result(fn(*args, time.time()))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            future = self._pool.submit(fn, *args, time.time())
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future) -> None:
+        self._slots.release()
+        if future.exception() is not None:
+            return
+        result = future.result()
+        tracing.record("convert", result["convert"], bytes=result["bytes_in"],
+                       queue=round(result["queue"], 6), peak_rss_mb=result.get("peak_rss_mb"))
+        with self._lock:
+            for stage in ("queue", "convert", "write"):
+                self._totals[stage] += result[stage]
+            self._documents += 1
+            self._bytes_in += result["bytes_in"]
+            self._peak_rss_mb = max(self._peak_rss_mb, result.get("peak_rss_mb", 0.0))
+            if result.get("peak_rss_scope") == "process":
+                self._peak_rss_scope = "process"
+
+    def stats(self) -> dict:
+        """各阶段累计耗时（秒）、文档数、输入字节数和单文档最大峰值内存（peak_rss_scope 见 format_peak_rss）"""
+        with self._lock:
+            return {**self._totals, "documents": self._documents, "bytes_in": self._bytes_in,
+                    "peak_rss_mb": self._peak_rss_mb, "peak_rss_scope": self._peak_rss_scope}
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+
+
+_pipeline: ConversionPipeline | None = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline() -> ConversionPipeline:
+    """获取进程内共享的流水线"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = ConversionPipeline()
+    return _pipeline
+
+
+def format_peak_rss(mb: float, scope: str) -> str:
+    """scope: "document" 为转换该文档期间的峰值；"process" 为无法重置的平台上工作进程启动以来的峰值"""
+    if scope == "document":
+        return f"峰值内存 {mb:.0f} MB"
+    return f"进程峰值内存 {mb:.0f} MB (本平台无法按文档重置)"
+
+
+def format_stats() -> str:
+    """格式化统计信息，用于 CLI 输出"""
+    s = get_pipeline().stats()
+    mb = s["bytes_in"] / 1024 / 1024
+    return (f"转换流水线: {s['documents']} 个文档 ({mb:.1f} MB), "
+            f"抓取 {s['fetch']:.2f}s / 排队 {s['queue']:.2f}s / "
+            f"转换 {s['convert']:.2f}s / 写入 {s['write']:.2f}s, "
+            + ("单文档" if s["peak_rss_scope"] == "document" else "")
+            + format_peak_rss(s["peak_rss_mb"], s["peak_rss_scope"]))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+SEC HTTP 客户端 - 共享连接池 + 限速 + 重试
+SEC fair access 规定: 每秒不超过 10 个请求，必须带 User-Agent
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import tracing
+from http_cache import cached_download, cached_get
+
+# SEC API 要求设置 User-Agent
+HEADERS = {
+    "User-Agent": os.environ.get("SEC_USER_AGENT", "MyApp contact@example.com"),
+    "Accept-Encoding": "gzip, deflate",
+}
+
+# SEC fair access 上限 10 req/s，留一点余量
+RATE_LIMIT = float(os.environ.get("SEC_RATE_LIMIT", "9"))
+# (connect, read) 超时秒数
+DEFAULT_TIMEOUT = (5, 30)
+# 可重试的状态码
+RETRY_STATUS = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+POOL_SIZE = 16
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限速器
+    capacity 默认 1（不允许突发）：任意 1 秒窗口内最多 capacity + rate 个请求，
+    rate=9 时为 10，正好不超过 SEC 的上限
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """取一个令牌，必要时阻塞等待，返回等待秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class SecClient:
+    """带连接池、限速和重试的 SEC 客户端（多线程共享一个实例）"""
+
+    def __init__(self, rate: float = RATE_LIMIT, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate)
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._requests = 0
+        self._retries = 0
+        self._wait = 0.0
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET 请求；429/5xx 和连接错误按指数退避重试"""
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(MAX_RETRIES + 1):
+            waited = self.limiter.acquire()
+            with self._lock:
+                self._requests += 1
+                self._wait += waited
+                if attempt:
+                    self._retries += 1
+            if waited:
+                tracing.record("sec.throttle", waited)
+
+            try:
+                resp = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                delay = BACKOFF_BASE * 2 ** attempt
+                tracing.record("sec.retry", delay, error=type(e).__name__, url=url)
+                time.sleep(delay)
+                continue
+
+            if resp.status_code not in RETRY_STATUS or attempt == MAX_RETRIES:
+                return resp
+
+            # 优先遵守 Retry-After
+            retry_after = resp.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else BACKOFF_BASE * 2 ** attempt
+            tracing.record("sec.retry", delay, status=resp.status_code, url=url)
+            resp.close()
+            time.sleep(delay)
+
+        return resp
+
+    def stats(self) -> dict:
+        """请求统计: 总数、重试数、req/s、限速等待时间"""
+        with self._lock:
+            elapsed = time.monotonic() - self._started
+            return {
+                "requests": self._requests,
+                "retries": self._retries,
+                "elapsed": elapsed,
+                "rps": self._requests / elapsed if elapsed > 0 else 0.0,
+                "throttle_wait": self._wait,
+            }
+
+
+_client: SecClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> SecClient:
+    """获取进程内共享的客户端"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SecClient()
+    return _client
+
+
+def sec_get(url: str, **kwargs) -> requests.Response:
+    """通过共享客户端发 GET 请求（经过磁盘缓存）"""
+    return cached_get(get_client().get, url, **kwargs)
+
+
+def sec_download(url: str, dest) -> dict:
+    """流式下载到文件（经过磁盘缓存），返回值见 http_cache.cached_download"""
+    return cached_download(get_client().get, url, dest)
+
+
+def format_stats() -> str:
+    """格式化统计信息，用于 CLI 输出"""
+    s = get_client().stats()
+    return (f"SEC 请求: {s['requests']} 次 (重试 {s['retries']}), "
+            f"{s['rps']:.1f} req/s, 限速等待 {s['throttle_wait']:.2f}s")
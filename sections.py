@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+10-K / 10-Q 分节索引 - 识别 Part / Item 标题，记录每节在 Markdown 文件中的字节偏移
+索引存在 .md 旁边的 .sections.json，读取单节时 seek 到偏移处，不读整个文件。
+"""
+
+import json
+import mmap
+import re
+from pathlib import Path
+
+INDEX_SUFFIX = ".sections.json"
+# 标题段落最长字符数（更长的是正文里的引用，如 "see Item 7"）
+MAX_HEADING_LENGTH = 200
+
+# 标题前后可能有 Markdown 标记: "## Item 1A.", "**Item 1A. Risk Factors**"
+ITEM_HEADING = re.compile(r"^[#*_\s]*item\s+(\d{1,2}[a-c]?)\s*[.:\-—–]?\s*(.*?)[*_\s]*$", re.I | re.S)
+PART_HEADING = re.compile(r"^[#*_\s]*part\s+(iv|i{1,3})\b", re.I)
+
+# 标题和名称分成两个段落时用的标准名称
+ITEM_TITLES = {
+    "1": "Business", "1A": "Risk Factors", "1B": "Unresolved Staff Comments", "1C": "Cybersecurity",
+    "2": "Properties", "3": "Legal Proceedings", "4": "Mine Safety Disclosures",
+    "5": "Market for Registrant's Common Equity", "6": "[Reserved]",
+    "7": "Management's Discussion and Analysis", "7A": "Quantitative and Qualitative Disclosures About Market Risk",
+    "8": "Financial Statements and Supplementary Data", "9": "Changes in and Disagreements with Accountants",
+    "9A": "Controls and Procedures", "9B": "Other Information", "9C": "Foreign Jurisdictions that Prevent Inspections",
+    "10": "Directors, Executive Officers and Corporate Governance", "11": "Executive Compensation",
+    "12": "Security Ownership", "13": "Certain Relationships and Related Transactions", "14": "Principal Accountant Fees",
+    "15": "Exhibits and Financial Statement Schedules", "16": "Form 10-K Summary",
+}
+
+
+class SectionIndexer:
+    """逐段落接收已写出的 Markdown（文本 + 字节偏移），记录 Part / Item 标题位置"""
+
+    def __init__(self):
+        self._part = ""
+        self._headings: list[dict] = []
+
+    def add(self, block: str, offset: int) -> None:
+        if len(block) > MAX_HEADING_LENGTH or block.startswith("|"):
+            return
+        part = PART_HEADING.match(block)
+        if part:
+            self._part = part.group(1).upper()
+            return
+        item = ITEM_HEADING.match(block)
+        if item:
+            number = item.group(1).upper()
+            title = item.group(2).strip(" *_#.") or ITEM_TITLES.get(number, "")
+            self._headings.append({
+                "key": f"{self._part}-{number}" if self._part else number,
+                "part": self._part,
+                "item": number,
+                "title": title,
+                "start": offset,
+            })
+
+    def sections(self, total: int) -> list[dict]:
+        """
+        各节 [start, end) 字节范围；同一节出现多次时取最后一次（前面的是目录）
+        """
+        last = {}
+        for heading in self._headings:
+            last[heading["key"]] = heading
+        ordered = sorted(last.values(), key=lambda h: h["start"])
+        for heading, following in zip(ordered, ordered[1:] + [None]):
+            heading["end"] = following["start"] if following else total
+        return ordered
+
+
+def index_path(markdown_file: Path) -> Path:
+    return Path(markdown_file).with_suffix(INDEX_SUFFIX)
+
+
+def save_index(markdown_file: Path, sections: list[dict]) -> None:
+    index_path(markdown_file).write_text(json.dumps({"sections": sections}, ensure_ascii=False, indent=1))
+
+
+def build_index(markdown_file: Path) -> list[dict]:
+    """扫描已有的 Markdown 文件建索引（旧文件没有索引时使用），按行读取不整体载入"""
+    indexer = SectionIndexer()
+    offset = 0
+    block_start, block = 0, []
+    with open(markdown_file, "rb") as f:
+        for line in f:
+            if line.strip():
+                if not block:
+                    block_start = offset
+                block.append(line)
+            elif block:
+                indexer.add(b"".join(block).decode("utf-8", errors="replace").strip(), block_start)
+                block = []
+            offset += len(line)
+    if block:
+        indexer.add(b"".join(block).decode("utf-8", errors="replace").strip(), block_start)
+    sections = indexer.sections(offset)
+    save_index(markdown_file, sections)
+    return sections
+
+
+def load_index(markdown_file: Path) -> list[dict]:
+    """读取分节索引；没有索引或索引比文件旧时重建"""
+    path = index_path(markdown_file)
+    try:
+        if path.stat().st_mtime >= Path(markdown_file).stat().st_mtime:
+            return json.loads(path.read_text())["sections"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return build_index(markdown_file)
+
+
+def find_section(sections: list[dict], key: str) -> dict | None:
+    """
+    按 "1A"、"Item 7"、"II-1A" 查找；只给 Item 号时取第一个匹配（10-Q 的 Part I Item 1 在前）
+    """
+    key = re.sub(r"(?i)^item\s*", "", key.strip()).upper()
+    for section in sections:
+        if key in (section["key"], section["item"]):
+            return section
+    return None
+
+
+def read_section(markdown_file: Path, key: str) -> str | None:
+    """只读取一节的内容（seek 到字节偏移），找不到返回 None"""
+    section = find_section(load_index(markdown_file), key)
+    if not section:
+        return None
+    with open(markdown_file, "rb") as f:
+        f.seek(section["start"])
+        return f.read(section["end"] - section["start"]).decode("utf-8", errors="replace")
+
+
+def map_section(markdown_file: Path, key: str) -> memoryview | None:
+    """
+    把一节映射为只读 memoryview（零拷贝，适合大节交给下游逐块处理）
+    调用方用完后需 release()；找不到返回 None
+    """
+    section = find_section(load_index(markdown_file), key)
+    if not section or section["end"] <= section["start"]:
+        return None
+    with open(markdown_file, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapped)[section["start"]:section["end"]]
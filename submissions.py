@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+SEC submissions 数据 - 每个 CIK 只拉取一次，所有 form 查询都从内存回答
+数据源: https://data.sec.gov/submissions/CIK##########.json
+更早的 filing 在 filings.files 分页文件中，按需要的日期范围懒加载 (load_since)
+导入过 submissions.zip 时优先用本地索引 (filing_index)，不发 HTTP 请求
+"""
+
+import threading
+import time
+
+from filing_index import local_page, local_submissions
+from sec_client import sec_get
+
+# 内存缓存有效期（秒）
+SUBMISSIONS_TTL = 600
+
+
+class Submissions:
+    """一家公司的 filing 列表，按 form 类型建索引（日期降序）"""
+
+    def __init__(self, cik: str, data: dict):
+        self.cik = cik
+        self.name = data.get("name", "")
+        self.tickers = data.get("tickers", [])
+        self.exchanges = data.get("exchanges", [])
+        self.files = data.get("filings", {}).get("files", [])
+        self.by_form: dict[str, list[dict]] = {}
+        self._loaded_files: set[str] = set()
+        self._lock = threading.Lock()
+        self.add_block(data.get("filings", {}).get("recent", {}))
+
+    def add_block(self, block: dict) -> None:
+        """
+        把一个 filings 块（并行数组格式）并入索引，单次遍历
+        在副本上合并后整体替换 by_form，读取方（latest / all / between）不加锁也不会看到半更新的列表
+        """
+        forms = block.get("form", [])
+        accessions = block.get("accessionNumber", [])
+        primary_docs = block.get("primaryDocument", [])
+        filing_dates = block.get("filingDate", [])
+        report_dates = block.get("reportDate", [""] * len(forms))
+
+        by_form = {form: list(filings) for form, filings in self.by_form.items()}
+        for form, accession, doc, filed, period in zip(
+                forms, accessions, primary_docs, filing_dates, report_dates):
+            by_form.setdefault(form, []).append({
+                "form": form,
+                "accession": accession.replace("-", ""),
+                "accession_display": accession,
+                "primary_document": doc,
+                "filing_date": filed,
+                "report_date": period,
+            })
+
+        for filings in by_form.values():
+            filings.sort(key=lambda f: f["filing_date"], reverse=True)
+        self.by_form = by_form
+
+    def load_since(self, start: str) -> int:
+        """
+        加载覆盖 start 之后日期的分页文件（filingTo >= start），已加载过的跳过
+        分页文件按日期从新到旧排列，只拉取需要的部分；返回本次新加载的文件数
+        """
+        with self._lock:
+            needed = [f["name"] for f in self.files
+                      if f.get("filingTo", "") >= start and f["name"] not in self._loaded_files]
+            for name in needed:
+                self.add_block(fetch_submissions_file(name))
+                self._loaded_files.add(name)
+        return len(needed)
+
+    def latest(self, form_type: str) -> dict | None:
+        """最新的指定类型 filing"""
+        filings = self.by_form.get(form_type)
+        return filings[0] if filings else None
+
+    def all(self, form_type: str) -> list[dict]:
+        """指定类型的所有 filing（日期降序）"""
+        return list(self.by_form.get(form_type, []))
+
+    def between(self, start: str, end: str, forms: list[str] | None = None) -> list[dict]:
+        """filing_date 在 [start, end] 之间的 filing（日期格式 YYYY-MM-DD）"""
+        by_form = self.by_form
+        results = []
+        for form in forms if forms is not None else by_form:
+            for filing in by_form.get(form, []):
+                if start <= filing["filing_date"] <= end:
+                    results.append(filing)
+        results.sort(key=lambda f: f["filing_date"], reverse=True)
+        return results
+
+
+_cache: dict[str, tuple[float, Submissions]] = {}
+_cache_lock = threading.Lock()
+
+
+def fetch_submissions_json(cik: str) -> dict:
+    """下载 submissions JSON"""
+    url = f"https://data.sec.gov/submissions/CIK{cik.zfill(10)}.json"
+    resp = sec_get(url)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def fetch_submissions_file(name: str) -> dict:
+    """获取 filings.files 中的一个分页文件（格式与 filings.recent 相同），本地索引中有时不下载"""
+    local = local_page(name)
+    if local is not None:
+        return local
+    resp = sec_get(f"https://data.sec.gov/submissions/{name}")
+    resp.raise_for_status()
+    return resp.json()
+
+
+def get_submissions(cik: str, ttl: float = SUBMISSIONS_TTL) -> Submissions:
+    """获取公司的 Submissions（TTL 内复用内存中的结果；本地索引未过期时不发请求）"""
+    cik = str(int(cik))
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(cik)
+        if cached and now - cached[0] < ttl:
+            return cached[1]
+
+    data = local_submissions(cik)
+    subs = Submissions(cik, data if data is not None else fetch_submissions_json(cik))
+    with _cache_lock:
+        _cache[cik] = (time.monotonic(), subs)
+    return subs
+
+
+def clear_cache() -> None:
+    """清空内存缓存"""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+财报表格抽取 - 在 HTML → Markdown 的同一遍解析中拿到表格单元格，规整数字后写成 CSV
+- "$"、")"、"%" 单独成列的 EDGAR 排版合并回数字，括号为负数，"—" 为 0
+- 按表格上方的 "(in millions)" / "(in thousands)" 换算成实际数值（每股数据、百分比不换算）
+- 没有数字的表格（目录、签名栏等排版用表格）不输出
+输出: <文件名>.tables/table_001.csv ... 和 index.json（标题、单位、行列数、在 .md 中的字节偏移）
+"""
+
+import csv
+import json
+import re
+from pathlib import Path
+
+from sections import ITEM_HEADING, MAX_HEADING_LENGTH, PART_HEADING
+
+TABLES_SUFFIX = ".tables"
+INDEX_NAME = "index.json"
+
+NUMBER = re.compile(r"^\(?-?\d[\d,]*(?:\.\d+)?\)?%?$|^\(?-?\.\d+\)?%?$")
+DASH_CHARS = set("—–-−")
+SCALE = re.compile(r"\bin\s+(thousands|millions|billions)\b", re.I)
+SCALES = {"thousands": 1e3, "millions": 1e6, "billions": 1e9}
+# 这些行的数字不按表格单位换算
+UNSCALED_LABEL = re.compile(r"per\s+(?:basic\s+|diluted\s+)?share|percent|%|ratio|\bdays?\b|\bemployees\b", re.I)
+MAX_CAPTION = 300
+
+
+def parse_number(cell: str) -> tuple[float, bool] | None:
+    """单元格文字 → (数值, 是否百分比)，不是数字返回 None"""
+    text = cell.replace("$", "").replace(" ", "").replace("\xa0", "")
+    if text and set(text) <= DASH_CHARS:
+        return 0.0, False
+    if not NUMBER.match(text):
+        return None
+    percent = text.endswith("%")
+    negative = text.startswith("(") or text.startswith("-")
+    value = float(text.strip("()%-").replace(",", ""))
+    return (-value if negative else value), percent
+
+
+def _merge_markers(row: list[str]) -> list[str]:
+    """把单独成列的 "$" 去掉，")" / "%" 并回左边的数字"""
+    row = [c.replace("\\|", "|").strip() for c in row]
+    for j, cell in enumerate(row):
+        if cell in ("$", "US$"):
+            row[j] = ""
+        elif cell in (")", "%", ")%", "%)") and j > 0:
+            k = j - 1
+            while k > 0 and not row[k]:
+                k -= 1
+            row[k] += cell
+            row[j] = ""
+    return row
+
+
+def _is_year_header(values: list) -> bool:
+    return all(isinstance(v, float) and v.is_integer() and 1990 <= v <= 2100 for v in values if v is not None)
+
+
+def normalize_table(rows: list[list[str]], scale: float = 1.0) -> list[list]:
+    """
+    EDGAR 表格 → 规整的二维表: 第一列是行名，其余每列一个数字列
+    行名列: 数据行行名所在的列（都在第一个数字列左边）；表头行（没有数字的行、年份行）中
+    行名列的文字作为行名，其余文字按列位置放到右侧最近的数字列
+    """
+    width = max(len(r) for r in rows)
+    rows = [_merge_markers(r + [""] * (width - len(r))) for r in rows]
+    parsed = [[parse_number(c) if j and c else None for j, c in enumerate(r)] for r in rows]
+    numeric_cols = [j for j in range(1, width) if any(p[j] is not None for p in parsed)]
+    if not numeric_cols:
+        return []
+
+    def label_col(row: list[str]) -> int | None:
+        return next((j for j, c in enumerate(row) if c and j not in numeric_cols), None)
+
+    def is_header(row: list[str], values: list) -> bool:
+        numbers = [values[j] for j in numeric_cols]
+        if all(v is None for v in numbers):
+            return True
+        return label_col(row) is None and _is_year_header([v and v[0] for v in numbers])
+
+    # 行名列的右边界: 数据行行名最靠右的列，且不超过第一个数字列
+    data_labels = [label_col(r) for r, v in zip(rows, parsed) if not is_header(r, v)]
+    label_end = min(max((j for j in data_labels if j is not None), default=0) + 1, numeric_cols[0])
+
+    table = []
+    for row, values in zip(rows, parsed):
+        if is_header(row, values):
+            out = [" ".join(c for c in row[:label_end] if c)] + [""] * len(numeric_cols)
+            for j in range(label_end, width):
+                if not row[j]:
+                    continue
+                target = next((n for n, col in enumerate(numeric_cols) if col >= j), len(numeric_cols) - 1)
+                out[target + 1] = (out[target + 1] + " " + row[j]).strip()
+            if any(out):
+                table.append(out)
+            continue
+        k = label_col(row)
+        label = row[k] if k is not None else ""
+        factor = 1.0 if UNSCALED_LABEL.search(label) else scale
+        table.append([label] + [
+            "" if values[j] is None else _format_number(values[j][0] if values[j][1] else values[j][0] * factor)
+            for j in numeric_cols])
+    return table
+
+
+def _format_number(value: float) -> str:
+    if value.is_integer() and abs(value) < 1e18:
+        return str(int(value))
+    return f"{value:.10g}"
+
+
+def detect_scale(context: list[str], rows: list[list[str]]) -> float:
+    """表格上方几段或表头中的 "in millions" 等"""
+    text = " ".join(context) + " " + " ".join(" ".join(r) for r in rows[:3])
+    match = SCALE.search(text)
+    return SCALES[match.group(1).lower()] if match else 1.0
+
+
+def table_caption(context: list[str]) -> str:
+    """
+    表格标题: 表格上方通常是 "报表名称" + "(单位说明)" 两段
+    不越过最近的 Part / Item 标题（更早的段落属于别的章节）；Item 标题本身只取名称
+    """
+    parts = []
+    for block in reversed(context):
+        if len(parts) == 2:
+            break
+        if len(block) <= MAX_HEADING_LENGTH:
+            if PART_HEADING.match(block):
+                break
+            item = ITEM_HEADING.match(block)
+            if item:
+                title = item.group(2).strip(" *_#.")
+                if title:
+                    parts.append(title)
+                break
+        parts.append(block.strip("*_# "))
+    return " ".join(reversed(parts))
+
+
+class TableExtractor:
+    """
+    接收 MarkdownConverter 的 on_table 和 convert_file 的 on_block 回调，
+    每个表格立即写成 CSV（不在内存中累积），finish() 写索引
+    """
+
+    def __init__(self, markdown_file: Path):
+        self.directory = tables_dir(markdown_file)
+        self.entries: list[dict] = []
+        self._pending: list[dict | None] = []  # 已抽取、还没写进 .md 的表格（按顺序对应表格段落）
+        self._count = 0
+        # 重新转换时清掉上次的结果
+        if self.directory.exists():
+            for old in self.directory.iterdir():
+                old.unlink()
+
+    def on_table(self, rows: list[list[str]], context: list[str]) -> None:
+        scale = detect_scale(context, rows)
+        table = normalize_table(rows, scale)
+        if not table:
+            self._pending.append(None)
+            return
+        self._count += 1
+        name = f"table_{self._count:03d}.csv"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / name, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(table)
+        caption = table_caption(context)
+        entry = {
+            "file": name,
+            "caption": caption[:MAX_CAPTION],
+            "scale": scale,
+            "rows": len(table),
+            "columns": len(table[0]),
+            "offset": None,
+        }
+        self.entries.append(entry)
+        self._pending.append(entry)
+
+    def on_block(self, block: str, offset: int) -> None:
+        """表格段落写出时记下它在 .md 中的字节偏移"""
+        if block.startswith("| ") and self._pending:
+            entry = self._pending.pop(0)
+            if entry is not None:
+                entry["offset"] = offset
+
+    def finish(self) -> int:
+        """写索引，返回表格数"""
+        if self.entries:
+            (self.directory / INDEX_NAME).write_text(
+                json.dumps({"tables": self.entries}, ensure_ascii=False, indent=1))
+        return len(self.entries)
+
+
+def tables_dir(markdown_file: Path) -> Path:
+    return Path(markdown_file).with_suffix(TABLES_SUFFIX)
+
+
+def load_table_index(markdown_file: Path) -> list[dict]:
+    """文档的表格索引，没有抽取过时返回空列表"""
+    try:
+        return json.loads((tables_dir(markdown_file) / INDEX_NAME).read_text())["tables"]
+    except (OSError, ValueError, KeyError):
+        return []
+
+
+def read_table(markdown_file: Path, name: str) -> list[list[str]]:
+    """读取一个表格 CSV"""
+    with open(tables_dir(markdown_file) / name, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def find_tables(markdown_file: Path, caption: str) -> list[dict]:
+    """按标题关键词查找表格（不区分大小写）"""
+    caption = caption.lower()
+    return [t for t in load_table_index(markdown_file) if caption in t["caption"].lower()]
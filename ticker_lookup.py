@@ -1,53 +1,69 @@
 #!/usr/bin/env python3
 """
 公司名称 → Ticker 模糊匹配
-数据源: SEC EDGAR company tickers
+数据源: SEC EDGAR company tickers (company_tickers_exchange.json，含上市交易所)
 """
 
 import json
-import os
-import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from heapq import nsmallest
+from itertools import chain
 from pathlib import Path
 
-import requests
-
-HEADERS = {
-    "User-Agent": os.environ.get("SEC_USER_AGENT", "MyApp contact@example.com"),
-}
+from sec_client import sec_get
 
 # 缓存文件路径
 CACHE_FILE = Path(__file__).parent / ".ticker_cache.json"
+# 缓存有效期（秒），过期后重新从 SEC 获取
+CACHE_TTL = 7 * 24 * 3600
+
+# 内存索引（进程内只构建一次）
+_index: "TickerIndex | None" = None
+_index_lock = threading.Lock()
 
 
 def fetch_company_tickers() -> dict:
-    """从 SEC 获取公司 ticker 列表"""
-    url = "https://www.sec.gov/files/company_tickers.json"
-    resp = requests.get(url, headers=HEADERS)
+    """从 SEC 获取公司 ticker 列表（含上市交易所）"""
+    url = "https://www.sec.gov/files/company_tickers_exchange.json"
+    resp = sec_get(url)
     resp.raise_for_status()
     return resp.json()
 
 
 def load_ticker_data() -> list[dict]:
     """加载 ticker 数据（优先使用缓存）"""
-    # 检查缓存
+    # 检查缓存（没有 exchange 字段的旧格式缓存视为过期）
+    cached = None
     if CACHE_FILE.exists():
         try:
-            data = json.loads(CACHE_FILE.read_text())
-            if data:  # 缓存有效
-                return data
+            cached = json.loads(CACHE_FILE.read_text())
         except (json.JSONDecodeError, KeyError):
-            pass
+            cached = None
+        if (cached and "exchange" in cached[0]
+                and time.time() - CACHE_FILE.stat().st_mtime < CACHE_TTL):
+            return cached
 
-    # 从 SEC 获取
-    raw_data = fetch_company_tickers()
+    # 从 SEC 获取（失败时退回过期缓存）
+    try:
+        raw_data = fetch_company_tickers()
+    except Exception:
+        if cached:
+            return cached
+        raise
 
-    # 转换格式: {0: {cik_str, ticker, title}, ...} -> [{cik, ticker, name}, ...]
+    # 转换格式: {fields: [cik, name, ticker, exchange], data: [[...], ...]} -> [{cik, ticker, name, exchange}, ...]
+    fields = raw_data["fields"]
     companies = []
-    for item in raw_data.values():
+    for values in raw_data["data"]:
+        item = dict(zip(fields, values))
         companies.append({
-            "cik": str(item["cik_str"]),
+            "cik": str(item["cik"]),
             "ticker": item["ticker"].upper(),
-            "name": item["title"],
+            "name": item["name"],
+            "exchange": item.get("exchange") or "",
         })
 
     # 保存缓存
@@ -56,6 +72,236 @@ def load_ticker_data() -> list[dict]:
     return companies
 
 
+def _normalize_ticker(ticker: str) -> str:
+    """统一 ticker 写法: SEC 用 BRK-B，用户常写 BRK.B"""
+    return ticker.strip().upper().replace(".", "-")
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _prefix_distance(query: str, name: str, max_dist: int) -> int:
+    """
+    query 与 name 的某个前缀之间的最小 Levenshtein 距离（容忍名称后缀 " inc" 等）
+    超过 max_dist 时提前返回 max_dist + 1
+    """
+    # 公共前缀不影响距离，跳过后只对剩下的部分做 DP（拼错的公司名通常只有后半段不同）
+    common = 0
+    for cq, cn in zip(query, name):
+        if cq != cn:
+            break
+        common += 1
+    query, name = query[common:], name[common:len(query) + max_dist]
+    inf = max_dist + 1
+    # 只算对角线两侧 max_dist 宽的带，带外的格子距离必然超过 max_dist
+    previous = [j if j <= max_dist else inf for j in range(len(name) + 1)]
+    for i, cq in enumerate(query, 1):
+        lo, hi = max(1, i - max_dist), min(len(name), i + max_dist)
+        current = [inf] * (len(name) + 1)
+        current[0] = i if i <= max_dist else inf
+        best = current[0]
+        for j in range(lo, hi + 1):
+            d = previous[j - 1] if cq == name[j - 1] else previous[j - 1] + 1
+            if previous[j] < d:
+                d = previous[j] + 1
+            if current[j - 1] < d:
+                d = current[j - 1] + 1
+            current[j] = d
+            if d < best:
+                best = d
+        if best > max_dist:
+            return inf
+        previous = current
+    return min(inf, min(previous[max(0, len(query) - max_dist):]))
+
+
+def _prefix_range(keys: list[tuple[str, int]], prefix: str) -> list[tuple[str, int]]:
+    """在排序数组中二分查找所有以 prefix 开头的条目"""
+    start = bisect_left(keys, (prefix,))
+    end = bisect_left(keys, (prefix + "\uffff",), lo=start)
+    return keys[start:end]
+
+
+class TickerIndex:
+    """
+    公司搜索索引
+    - ticker / 名称前缀: 排序数组 + 二分
+    - 名称子串: 3-gram 倒排表（按名称长度排序），取最短的倒排表逐个校验
+    - 拼写容错: 同一 3-gram 倒排表生成候选，再用有界编辑距离排序
+    """
+
+    # 模糊匹配: 最短查询长度、候选数上限、最低 3-gram 重合比例
+    FUZZY_MIN_LENGTH = 4
+    FUZZY_CANDIDATES = 50
+    FUZZY_MIN_OVERLAP = 0.5
+    # 出现在超过该比例公司名中的 3-gram（如 "inc"）不参与候选生成
+    COMMON_GRAM_RATIO = 0.1
+
+    def __init__(self, companies: list[dict]):
+        self.companies = companies
+        self.names_lower = [c["name"].lower() for c in companies]
+        self.by_ticker = {c["ticker"]: i for i, c in enumerate(companies)}
+        self.cik_by_ticker = {_normalize_ticker(c["ticker"]): c["cik"] for c in companies}
+        self.exchange_by_ticker = {_normalize_ticker(c["ticker"]): c.get("exchange", "") for c in companies}
+        self.tickers = sorted((c["ticker"], i) for i, c in enumerate(companies))
+        self.names = sorted((name, i) for i, name in enumerate(self.names_lower))
+
+        # 按 (名称长度, 原顺序) 排列，倒排表天然有序，子串匹配可以提前停止
+        self.by_length = sorted(range(len(companies)), key=lambda i: (len(self.names_lower[i]), i))
+        self.grams: dict[str, list[int]] = {}
+        for i in self.by_length:
+            for gram in _trigrams(self.names_lower[i]):
+                self.grams.setdefault(gram, []).append(i)
+
+    def _substring(self, query_lower: str, wanted: int, seen: set) -> list[int]:
+        """名称包含 query_lower 的公司（名称短的优先），最多 wanted 个"""
+        candidates = self.by_length
+        if len(query_lower) >= 3:
+            postings = []
+            for gram in _trigrams(query_lower):
+                ids = self.grams.get(gram)
+                if not ids:
+                    return []
+                postings.append(ids)
+            candidates = min(postings, key=len)
+
+        matches = []
+        for i in candidates:
+            if i not in seen and query_lower in self.names_lower[i]:
+                matches.append(i)
+                if len(matches) >= wanted:
+                    break
+        return matches
+
+    def _fuzzy(self, query_lower: str, wanted: int, seen: set) -> list[tuple[int, int]]:
+        """
+        拼写容错匹配，返回 [(分数, 公司序号)]，分数越小越好
+        成本上限: 只扫描非高频 3-gram 的倒排表，按 3-gram 重合度从高到低
+        对重合度最高的 FUZZY_CANDIDATES 个候选算编辑距离，按分数取前 wanted 个；
+        算编辑距离前先用 3-gram 下界剪枝: 每处编辑最多破坏 3 个 3-gram，
+        查询中有 m 个 3-gram 不在名称里时距离至少为 ceil(m / 3)，超过当前上限的不必再算
+        """
+        grams = _trigrams(query_lower)
+        if not grams:
+            return []
+
+        common = max(1, int(len(self.companies) * self.COMMON_GRAM_RATIO))
+        postings = [self.grams[g] for g in grams if g in self.grams]
+        rare = [ids for ids in postings if len(ids) <= common]
+        if rare:
+            postings = rare
+        elif postings:
+            postings = [min(postings, key=len)]
+
+        hits = Counter(chain.from_iterable(postings))
+
+        min_hits = max(1, int(len(grams) * self.FUZZY_MIN_OVERLAP))
+        candidates = [i for i, n in hits.items() if n >= min_hits and i not in seen]
+        candidates = nsmallest(self.FUZZY_CANDIDATES, candidates,
+                               key=lambda i: (-hits[i], len(self.names_lower[i]), i))
+
+        max_dist = max(1, len(query_lower) // 4)
+        overlap_floor = len(grams) * 0.6
+        matches = []  # [(分数, 名称长度, 公司序号)]，保持有序
+        for i in candidates:
+            name = self.names_lower[i]
+            # 已凑够 wanted 个时，编辑距离超过当前第 wanted 名的候选不可能进入结果，提前截断
+            bound = max_dist
+            if len(matches) >= wanted:
+                worst = matches[wanted - 1]
+                bound = min(max_dist, worst[0])
+            # 候选按重合度从高到低排列，下界只增不减: 超过上限且重合度也不够兜底时，后面的都不用看了
+            lower = (len(postings) - hits[i] + 2) // 3
+            if lower > bound:
+                if bound < max_dist or hits[i] < overlap_floor:
+                    break
+                dist = bound + 1
+            else:
+                # 距离相同时按 (名称长度, 序号) 排序，排在第 wanted 名之后的必须严格更近
+                if len(matches) >= wanted and bound == worst[0] and (len(name), i) > worst[1:]:
+                    bound -= 1
+                if lower > bound or len(name) < len(query_lower) - bound:
+                    dist = bound + 1
+                elif bound == 0:
+                    dist = 0 if name.startswith(query_lower) else 1
+                else:
+                    dist = _prefix_distance(query_lower, name, bound)
+            if dist <= bound:
+                insort(matches, (dist, len(name), i))
+            elif bound == max_dist and hits[i] >= overlap_floor:
+                # 名称中间的词拼错（如 "hathway"），按 3-gram 重合度排在后面
+                insort(matches, (max_dist + 1 + len(grams) - hits[i], len(name), i))
+        return [(score, i) for score, _, i in matches[:wanted]]
+
+    def search(self, query: str, limit: int = 10, fuzzy: bool = True) -> list[dict]:
+        """按优先级分层搜索，规则同 search_ticker；fuzzy=False 时不做拼写容错"""
+        query = query.strip().upper()
+        if not query:
+            return []
+
+        # 精确匹配 ticker
+        if query in self.by_ticker:
+            return [self.companies[self.by_ticker[query]]]
+
+        query_lower = query.lower()
+        results = []
+        seen = set()
+
+        def add(priority: int, i: int, length: int, score: int = 0):
+            if i not in seen:
+                seen.add(i)
+                results.append((priority, score, length, i))
+
+        # ticker 开头匹配（短 ticker 优先）
+        for ticker, i in _prefix_range(self.tickers, query):
+            add(0, i, len(ticker))
+
+        # 高优先级已经够数，后面的层级不会进入结果
+        if len(results) < limit:
+            # 公司名称精确开头匹配 / 开头匹配
+            for name, i in _prefix_range(self.names, query_lower):
+                exact = name == query_lower or name.startswith(query_lower + " ")
+                add(1 if exact else 2, i, len(name))
+
+        if len(results) < limit:
+            # 公司名称包含查询词
+            for i in self._substring(query_lower, limit - len(results), seen):
+                add(3, i, len(self.names_lower[i]))
+
+        if fuzzy and len(results) < limit and len(query_lower) >= self.FUZZY_MIN_LENGTH:
+            # 拼写容错（如 "nvida"、"berkshire hathway"）
+            for score, i in self._fuzzy(query_lower, limit - len(results), seen):
+                add(4, i, len(self.names_lower[i]), score)
+
+        results.sort()
+        return [self.companies[r[3]] for r in results[:limit]]
+
+
+def get_index() -> TickerIndex:
+    """获取进程内共享的搜索索引（首次调用时构建）"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = TickerIndex(load_ticker_data())
+    return _index
+
+
+def get_cik_index() -> dict[str, str]:
+    """获取 ticker → CIK 映射（基于 .ticker_cache.json，只加载一次）"""
+    return get_index().cik_by_ticker
+
+
+def lookup_cik(ticker: str) -> str | None:
+    """本地查找 ticker 的 CIK，找不到返回 None"""
+    return get_cik_index().get(_normalize_ticker(ticker))
+
+
+def lookup_exchange(ticker: str) -> str | None:
+    """本地查找 ticker 的上市交易所（SEC 写法，如 "Nasdaq"、"NYSE"），未知时返回 None"""
+    return get_index().exchange_by_ticker.get(_normalize_ticker(ticker)) or None
+
+
 def search_ticker(query: str, limit: int = 10) -> list[dict]:
     """
     模糊搜索公司
@@ -67,43 +313,7 @@ def search_ticker(query: str, limit: int = 10) -> list[dict]:
     Returns:
         匹配的公司列表 [{ticker, name, cik}, ...]
     """
-    query = query.strip().upper()
-    if not query:
-        return []
-
-    companies = load_ticker_data()
-
-    # 精确匹配 ticker
-    for company in companies:
-        if company["ticker"] == query:
-            return [company]
-
-    # 模糊匹配
-    results = []
-    query_lower = query.lower()
-
-    for company in companies:
-        ticker = company["ticker"]
-        name = company["name"]
-        name_lower = name.lower()
-
-        # ticker 开头匹配
-        if ticker.startswith(query):
-            results.append((0, len(ticker), company))  # 优先级最高，短 ticker 优先
-        # 公司名称精确开头匹配 (如 "Apple Inc." 匹配 "apple")
-        elif name_lower.startswith(query_lower + " ") or name_lower == query_lower:
-            results.append((1, len(name), company))
-        # 公司名称开头匹配
-        elif name_lower.startswith(query_lower):
-            results.append((2, len(name), company))
-        # 公司名称包含查询词
-        elif query_lower in name_lower:
-            results.append((3, len(name), company))
-
-    # 按优先级排序，同优先级按名称长度排序（短的优先）
-    results.sort(key=lambda x: (x[0], x[1]))
-
-    return [r[2] for r in results[:limit]]
+    return get_index().search(query, limit)
 
 
 def get_ticker(query: str) -> str | None:
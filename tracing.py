@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+轻量埋点 - 记录 HTTP 请求、HTML → Markdown 转换、transcript 解析、yfinance 调用等操作的耗时和计数
+- span(): 计时上下文，可附带 bytes、cache、status 等属性；按名称累计次数、总耗时、最大耗时、字节数、缓存命中
+- record(): 记录在别处测得的耗时（如转换进程池返回的结果）
+- 设置 TRACE_FILE（或调用 enable_trace）后，每个 span 追加一行 JSON 到该文件，便于跨次运行聚合
+
+用法: python tracing.py trace.jsonl [更多文件...]   # 汇总 JSON-lines trace
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+_lock = threading.Lock()
+_totals: dict[str, dict] = {}
+_trace_file = None
+
+
+def enable_trace(path: Path | str | None) -> None:
+    """开始（path 为 None 时停止）把 span 写入 JSON-lines 文件"""
+    global _trace_file
+    with _lock:
+        if _trace_file is not None:
+            _trace_file.close()
+        _trace_file = open(path, "a", encoding="utf-8", buffering=1) if path else None
+
+
+def _add(totals: dict[str, dict], name: str, seconds: float, attrs: dict) -> None:
+    total = totals.get(name)
+    if total is None:
+        total = totals[name] = {"count": 0, "seconds": 0.0, "max": 0.0, "bytes": 0, "cache_hits": 0, "errors": 0}
+    total["count"] += 1
+    total["seconds"] += seconds
+    total["max"] = max(total["max"], seconds)
+    total["bytes"] += attrs.get("bytes") or 0
+    total["cache_hits"] += attrs.get("cache") in ("hit", "revalidated")
+    total["errors"] += "error" in attrs
+
+
+def _rows(totals: dict[str, dict]) -> list[dict]:
+    rows = [{"name": name, **total} for name, total in totals.items()]
+    return sorted(rows, key=lambda r: r["seconds"], reverse=True)
+
+
+def record(name: str, seconds: float, **attrs) -> None:
+    """记录一个已完成的 span"""
+    with _lock:
+        _add(_totals, name, seconds, attrs)
+        if _trace_file is not None:
+            _trace_file.write(json.dumps({"ts": time.time(), "name": name, "seconds": round(seconds, 6),
+                                          "thread": threading.current_thread().name, **attrs},
+                                         ensure_ascii=False, default=str) + "\n")
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    计时一段操作；with 块内可往返回的 dict 里补充属性（bytes、cache、status 等）
+    块内抛出的异常记为 error 后继续抛出
+    """
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        record(name, time.perf_counter() - started, **attrs)
+
+
+def summary() -> list[dict]:
+    """各 span 的累计统计，按总耗时降序"""
+    with _lock:
+        return _rows(_totals)
+
+
+def reset() -> None:
+    with _lock:
+        _totals.clear()
+
+
+def format_summary(rows: list[dict] | None = None) -> str:
+    """格式化统计表，用于 CLI --profile 输出"""
+    rows = summary() if rows is None else rows
+    if not rows:
+        return "埋点: 没有记录"
+    lines = [f"{'操作':<22}{'次数':>6}{'总耗时 s':>10}{'平均 ms':>9}{'最大 ms':>9}{'MB':>8}{'缓存命中':>8}{'错误':>6}"]
+    for r in rows:
+        lines.append(f"{r['name']:<24}{r['count']:>6}{r['seconds']:>10.2f}"
+                     f"{r['seconds'] / r['count'] * 1000:>9.1f}{r['max'] * 1000:>9.1f}"
+                     f"{r['bytes'] / 1024 / 1024:>8.1f}{r['cache_hits']:>10}{r['errors']:>6}")
+    return "\n".join(lines)
+
+
+def aggregate(paths: list[Path]) -> list[dict]:
+    """汇总一个或多个 JSON-lines trace 文件，格式同 summary()"""
+    totals: dict[str, dict] = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                _add(totals, event["name"], event["seconds"], event)
+    return _rows(totals)
+
+
+if os.environ.get("TRACE_FILE"):
+    enable_trace(os.environ["TRACE_FILE"])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python tracing.py <trace.jsonl> [更多文件...]")
+        sys.exit(1)
+    print(format_summary(aggregate([Path(p) for p in sys.argv[1:]])))
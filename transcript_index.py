@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Motley Fool transcript 索引快照 - 索引页只解析一次，得到 ticker → 最新 transcript URL
+快照存在 .transcript_index.json，TTL 内跨运行复用；第一页没有的 ticker 再按需加载后续页
+数据源: https://www.fool.com/earnings-call-transcripts/
+"""
+
+import json
+import re
+import threading
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+SNAPSHOT_FILE = Path(__file__).parent / ".transcript_index.json"
+# 快照有效期（秒），与索引页的 HTTP 缓存 TTL 一致
+SNAPSHOT_TTL = 30 * 60
+# 查找一个 ticker 最多读取的索引页数
+MAX_PAGES = 5
+# 刷新失败后多久（秒）再重试，期间沿用旧快照（没有快照时直接抛出上次的错误）
+REFRESH_BACKOFF = 60
+
+INDEX_URL = "https://www.fool.com/earnings-call-transcripts/"
+PAGE_URL = "https://www.fool.com/earnings-call-transcripts/?page={page}"
+
+# 链接文字中的 "(NVDA)"
+TEXT_TICKER = re.compile(r"\(([a-z][a-z0-9.\-]{0,9})\)")
+
+
+def fetch_index_page(page: int) -> str:
+    """下载第 page 页索引（从 1 开始）"""
+    from earnings import fool_get
+
+    resp = fool_get(INDEX_URL if page == 1 else PAGE_URL.format(page=page))
+    resp.raise_for_status()
+    return resp.text
+
+
+def parse_index_page(html: str) -> tuple[dict[str, str], dict[str, str]]:
+    """
+    索引页 → (链接文字中的 ticker → URL, URL 中间段 → URL)，同一 key 取页面上第一个（最新）
+    URL 中间段对应原来按 "-nvda-" 匹配 href 的规则
+    """
+    by_text: dict[str, str] = {}
+    by_slug: dict[str, str] = {}
+    soup = BeautifulSoup(html, "html.parser")
+    for link in soup.find_all("a", href=True):
+        href = link["href"]
+        if "/earnings/call-transcripts/" not in href:
+            continue
+        url = f"https://www.fool.com{href}" if href.startswith("/") else href
+        for ticker in TEXT_TICKER.findall(link.get_text().lower()):
+            by_text.setdefault(ticker, url)
+        slug = href.rstrip("/").rsplit("/", 1)[-1].lower()
+        for token in slug.split("-")[1:-1]:
+            by_slug.setdefault(token, url)
+    return by_text, by_slug
+
+
+class TranscriptIndex:
+    """索引页快照，所有线程共用；查找为字典查询"""
+
+    def __init__(self, path: Path = SNAPSHOT_FILE, ttl: float = SNAPSHOT_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.fetched = 0.0
+        self.pages = 0
+        self.by_text: dict[str, str] = {}
+        self.by_slug: dict[str, str] = {}
+        self._retry_at = 0.0
+        self._error: Exception | None = None
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text())
+            self.fetched, self.pages = data["fetched"], data["pages"]
+            self.by_text, self.by_slug = data["by_text"], data["by_slug"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _save(self) -> None:
+        self.path.write_text(json.dumps({
+            "fetched": self.fetched,
+            "pages": self.pages,
+            "by_text": self.by_text,
+            "by_slug": self.by_slug,
+        }))
+
+    def _find(self, key: str) -> str | None:
+        return self.by_text.get(key) or self.by_slug.get(key)
+
+    def _add_page(self, page: int) -> None:
+        by_text, by_slug = parse_index_page(fetch_index_page(page))
+        for key, url in by_text.items():
+            self.by_text.setdefault(key, url)
+        for key, url in by_slug.items():
+            self.by_slug.setdefault(key, url)
+        self.pages = page
+
+    def _refresh(self) -> None:
+        """重新读取第一页；失败时若有旧快照则继续使用，REFRESH_BACKOFF 秒内不再重试"""
+        if time.time() < self._retry_at:
+            if self.pages:
+                return
+            raise self._error
+        try:
+            by_text, by_slug = parse_index_page(fetch_index_page(1))
+        except Exception as e:
+            self._retry_at, self._error = time.time() + REFRESH_BACKOFF, e
+            if self.pages:
+                return
+            raise
+        self.by_text, self.by_slug = by_text, by_slug
+        self.fetched, self.pages = time.time(), 1
+        self._retry_at, self._error = 0.0, None
+        self._save()
+
+    def lookup(self, ticker: str, max_pages: int = MAX_PAGES) -> str | None:
+        """ticker 最新 transcript 的 URL；快照中没有时继续加载后续页，最多 max_pages 页"""
+        key = ticker.lower()
+        with self._lock:
+            if not self.pages or time.time() - self.fetched > self.ttl:
+                self._refresh()
+            url = self._find(key)
+            loaded = False
+            while url is None and self.pages < max_pages:
+                try:
+                    self._add_page(self.pages + 1)
+                except Exception:
+                    # 没有更多页（或请求失败）: 到下次刷新前不再尝试
+                    self.pages = max_pages
+                loaded = True
+                url = self._find(key)
+            if loaded:
+                self._save()
+            return url
+
+
+_index: TranscriptIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_transcript_index() -> TranscriptIndex:
+    """获取进程内共享的索引快照"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = TranscriptIndex()
+    return _index
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+XBRL 财务数据 - 从 SEC companyfacts JSON 提取结构化数据，按列存为 NumPy 数组
+每个 ticker 一个 downloads/facts/<TICKER>.npz，列: 概念、单位、起止日期、数值、财年/期间、表单、提交日期、
+SEC 的日历 frame (CY2024Q3 / CY2024Q3I)。跨 ticker 的季度对比直接在数组上计算，不再解析 Markdown。
+数据源: https://data.sec.gov/api/xbrl/companyfacts/CIK##########.json（或本地 companyfacts.zip）
+"""
+
+import json
+import re
+import threading
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from sec_client import sec_get
+
+FACTS_DIRNAME = "facts"
+
+# 常用指标 → 候选概念（按优先级，公司用哪个就取哪个）
+CONCEPT_ALIASES = {
+    "revenue": ["us-gaap:Revenues", "us-gaap:RevenueFromContractWithCustomerExcludingAssessedTax",
+                "us-gaap:SalesRevenueNet", "us-gaap:RevenueFromContractWithCustomerIncludingAssessedTax"],
+    "net_income": ["us-gaap:NetIncomeLoss", "us-gaap:ProfitLoss"],
+    "eps": ["us-gaap:EarningsPerShareDiluted", "us-gaap:EarningsPerShareBasicAndDiluted"],
+    "eps_basic": ["us-gaap:EarningsPerShareBasic"],
+    "operating_income": ["us-gaap:OperatingIncomeLoss"],
+    "gross_profit": ["us-gaap:GrossProfit"],
+    "operating_cash_flow": ["us-gaap:NetCashProvidedByUsedInOperatingActivities"],
+    "cash": ["us-gaap:CashAndCashEquivalentsAtCarryingValue"],
+    "assets": ["us-gaap:Assets"],
+    "shares_outstanding": ["dei:EntityCommonStockSharesOutstanding"],
+}
+
+FRAME = re.compile(r"^CY(\d{4})(?:Q([1-4]))?(I?)$")
+
+
+class FactTable:
+    """
+    列式事实表: 每列一个等长数组，字符串列用整数编码 + 字典
+
+    数值列: concept / unit / form / fp (编码), start / end / filed (datetime64[D]),
+            value (float64), fy (int16), frame_year (int16), frame_q (int8, 0 表示全年),
+            instant (bool, 时点数据如资产负债表)
+    """
+
+    COLUMNS = ("concept", "unit", "form", "fp", "start", "end", "filed", "value", "fy",
+               "frame_year", "frame_q", "instant")
+    DICTIONARIES = ("concepts", "units", "forms", "fps")
+
+    def __init__(self, ticker: str, columns: dict[str, np.ndarray], dictionaries: dict[str, np.ndarray]):
+        self.ticker = ticker
+        self.columns = columns
+        self.dictionaries = dictionaries
+
+    def __len__(self) -> int:
+        return len(self.columns["value"])
+
+    @classmethod
+    def from_companyfacts(cls, ticker: str, data: dict) -> "FactTable":
+        """companyfacts JSON → 列式表（单次遍历）"""
+        rows = {name: [] for name in cls.COLUMNS}
+        codes = {name: {} for name in cls.DICTIONARIES}
+
+        def code(dictionary: str, value: str) -> int:
+            return codes[dictionary].setdefault(value, len(codes[dictionary]))
+
+        for taxonomy, concepts in data.get("facts", {}).items():
+            for concept, body in concepts.items():
+                concept_code = code("concepts", f"{taxonomy}:{concept}")
+                for unit, facts in body.get("units", {}).items():
+                    unit_code = code("units", unit)
+                    for fact in facts:
+                        frame = FRAME.match(fact.get("frame") or "")
+                        rows["concept"].append(concept_code)
+                        rows["unit"].append(unit_code)
+                        rows["form"].append(code("forms", fact.get("form") or ""))
+                        rows["fp"].append(code("fps", fact.get("fp") or ""))
+                        rows["start"].append(fact.get("start") or "NaT")
+                        rows["end"].append(fact["end"])
+                        rows["filed"].append(fact.get("filed") or "NaT")
+                        rows["value"].append(fact["val"])
+                        rows["fy"].append(fact.get("fy") or 0)
+                        rows["frame_year"].append(int(frame.group(1)) if frame else 0)
+                        rows["frame_q"].append(int(frame.group(2) or 0) if frame else 0)
+                        rows["instant"].append("start" not in fact)
+
+        columns = {
+            "concept": np.array(rows["concept"], dtype=np.int32),
+            "unit": np.array(rows["unit"], dtype=np.int16),
+            "form": np.array(rows["form"], dtype=np.int16),
+            "fp": np.array(rows["fp"], dtype=np.int8),
+            "start": np.array(rows["start"], dtype="datetime64[D]"),
+            "end": np.array(rows["end"], dtype="datetime64[D]"),
+            "filed": np.array(rows["filed"], dtype="datetime64[D]"),
+            "value": np.array(rows["value"], dtype=np.float64),
+            "fy": np.array(rows["fy"], dtype=np.int16),
+            "frame_year": np.array(rows["frame_year"], dtype=np.int16),
+            "frame_q": np.array(rows["frame_q"], dtype=np.int8),
+            "instant": np.array(rows["instant"], dtype=bool),
+        }
+        dictionaries = {name: np.array(list(values), dtype=str) for name, values in codes.items()}
+        return cls(ticker, columns, dictionaries)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez_compressed(tmp, **self.columns, **self.dictionaries)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, ticker: str, path: Path) -> "FactTable":
+        with np.load(path) as npz:
+            columns = {name: npz[name] for name in cls.COLUMNS}
+            dictionaries = {name: npz[name] for name in cls.DICTIONARIES}
+        return cls(ticker, columns, dictionaries)
+
+    def concept_code(self, concept: str) -> int | None:
+        """概念名（如 us-gaap:Revenues）的编码，不存在返回 None"""
+        hits = np.flatnonzero(self.dictionaries["concepts"] == concept)
+        return int(hits[0]) if len(hits) else None
+
+    def resolve(self, name: str) -> int | None:
+        """指标别名或概念名 → 本公司实际使用的概念编码（候选中最新数据的那个）"""
+        best, best_end = None, None
+        for concept in CONCEPT_ALIASES.get(name, [name]):
+            concept = concept if ":" in concept else f"us-gaap:{concept}"
+            code = self.concept_code(concept)
+            if code is None:
+                continue
+            latest = self.columns["end"][self.columns["concept"] == code].max()
+            if best is None or latest > best_end:
+                best, best_end = code, latest
+        return best
+
+    def quarterly(self, name: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        指标的日历季度序列: (季度序号 year*4+q-1 升序, 数值)
+        用 SEC 分配的 frame 去重（同一期间在多份 filing 中重复出现时只有一条带 frame）
+        """
+        code = self.resolve(name)
+        if code is None:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        c = self.columns
+        mask = (c["concept"] == code) & (c["frame_q"] > 0)
+        # 时点数据（资产等）和期间数据不会同时出现在一个概念里
+        periods = c["frame_year"][mask].astype(np.int32) * 4 + c["frame_q"][mask] - 1
+        values = c["value"][mask]
+        order = np.argsort(periods, kind="stable")
+        periods, values = periods[order], values[order]
+        # 单位不同（如 USD 和 EUR）时保留第一条
+        keep = np.concatenate(([True], periods[1:] != periods[:-1])) if len(periods) else periods.astype(bool)
+        return periods[keep], values[keep]
+
+
+class FactStore:
+    """downloads/facts/ 下所有 ticker 的事实表，按文件修改时间缓存在内存中"""
+
+    def __init__(self, download_dir: Path):
+        self.directory = Path(download_dir) / FACTS_DIRNAME
+        self._lock = threading.Lock()
+        self._tables: dict[str, tuple[float, FactTable]] = {}
+
+    def path(self, ticker: str) -> Path:
+        return self.directory / f"{ticker.upper()}.npz"
+
+    def tickers(self) -> list[str]:
+        return sorted(p.stem for p in self.directory.glob("*.npz"))
+
+    def save(self, table: FactTable) -> None:
+        table.save(self.path(table.ticker))
+        with self._lock:
+            self._tables.pop(table.ticker, None)
+
+    def get(self, ticker: str) -> FactTable | None:
+        """读取一个 ticker 的事实表，没有时返回 None"""
+        ticker = ticker.upper()
+        path = self.path(ticker)
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._tables.get(ticker)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        table = FactTable.load(ticker, path)
+        with self._lock:
+            self._tables[ticker] = (mtime, table)
+        return table
+
+    def matrix(self, name: str, tickers: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        多个 ticker 的季度矩阵: (季度序号数组, 数值矩阵 [ticker, 季度])，缺失为 NaN
+        """
+        series = []
+        for ticker in tickers:
+            table = self.get(ticker)
+            series.append(table.quarterly(name) if table else (np.empty(0, dtype=np.int32), np.empty(0)))
+        periods = np.unique(np.concatenate([p for p, _ in series])) if series else np.empty(0, dtype=np.int32)
+        matrix = np.full((len(tickers), len(periods)), np.nan)
+        for row, (p, v) in enumerate(series):
+            matrix[row, np.searchsorted(periods, p)] = v
+        return periods, matrix
+
+    def compare(self, name: str, tickers: list[str], quarters: int = 2) -> dict:
+        """
+        每个 ticker 最近一个季度相对上一季度 (QoQ) 和去年同期 (YoY) 的变化
+
+        Returns:
+            {"tickers", "periods" (最近 quarters 个季度标签), "values" (矩阵), "latest", "qoq", "yoy"}
+        """
+        periods, matrix = self.matrix(name, tickers)
+        # 每行最近一个非空季度的位置
+        present = ~np.isnan(matrix)
+        last = np.full(len(tickers), -1)
+        if matrix.size:
+            last = np.where(present.any(axis=1), matrix.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1), -1)
+        rows = np.arange(len(tickers))
+
+        def shifted(offset: int) -> np.ndarray:
+            # 按季度序号（而不是列位置）往前找 offset 个季度，该季度没有数据时为 NaN
+            out = np.full(len(tickers), np.nan)
+            if not len(periods):
+                return out
+            target = periods[np.maximum(last, 0)] - offset
+            index = np.minimum(np.searchsorted(periods, target), len(periods) - 1)
+            valid = (last >= 0) & (periods[index] == target)
+            out[valid] = matrix[rows[valid], index[valid]]
+            return out
+
+        latest, previous, year_ago = shifted(0), shifted(1), shifted(4)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            qoq = (latest - previous) / np.abs(previous)
+            yoy = (latest - year_ago) / np.abs(year_ago)
+        window = slice(max(0, len(periods) - quarters), len(periods))
+        return {
+            "tickers": list(tickers),
+            "periods": [period_label(p) for p in periods[window]],
+            "values": matrix[:, window],
+            "latest_period": [period_label(periods[i]) if i >= 0 else "" for i in last],
+            "latest": latest,
+            "qoq": qoq,
+            "yoy": yoy,
+        }
+
+
+def period_label(period: int) -> str:
+    """季度序号 → "2024Q3" """
+    return f"{period // 4}Q{period % 4 + 1}"
+
+
+def fetch_companyfacts(cik: str) -> dict:
+    """下载 companyfacts JSON"""
+    resp = sec_get(f"https://data.sec.gov/api/xbrl/companyfacts/CIK{str(cik).zfill(10)}.json")
+    resp.raise_for_status()
+    return resp.json()
+
+
+def read_companyfacts_archive(archive: Path, cik: str) -> dict | None:
+    """从本地 companyfacts.zip 读取一家公司（不解压整个归档），没有时返回 None"""
+    name = f"CIK{str(int(cik)).zfill(10)}.json"
+    with zipfile.ZipFile(archive) as zf:
+        try:
+            with zf.open(name) as member:
+                return json.load(member)
+        except KeyError:
+            return None
+
+
+def update_facts(ticker: str, cik: str, download_dir: Path, archive: Path | None = None) -> FactTable:
+    """拉取（或从 companyfacts.zip 读取）并保存一个 ticker 的事实表"""
+    data = read_companyfacts_archive(archive, cik) if archive else None
+    if data is None:
+        data = fetch_companyfacts(cik)
+    table = FactTable.from_companyfacts(ticker.upper(), data)
+    get_fact_store(download_dir).save(table)
+    return table
+
+
+_stores: dict[Path, FactStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_fact_store(download_dir: Path) -> FactStore:
+    """获取下载目录对应的事实库（进程内共享）"""
+    key = Path(download_dir).resolve()
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = FactStore(Path(download_dir))
+        return _stores[key]
+
+
+def format_compare(result: dict, name: str) -> str:
+    """格式化 compare() 结果，用于 CLI 输出"""
+    periods = result["periods"]
+    lines = [f"{name:<10}" + "".join(f"{p:>14}" for p in periods) + f"{'QoQ':>9}{'YoY':>9}"]
+    for i, ticker in enumerate(result["tickers"]):
+        cells = "".join(f"{_number(v):>14}" for v in result["values"][i])
+        lines.append(f"{ticker:<10}{cells}{_percent(result['qoq'][i]):>9}{_percent(result['yoy'][i]):>9}")
+    return "\n".join(lines)
+
+
+def _number(value: float) -> str:
+    if np.isnan(value):
+        return "-"
+    for scale, suffix in ((1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if abs(value) >= scale:
+            return f"{value / scale:,.2f}{suffix}"
+    return f"{value:,.2f}"
+
+
+def _percent(value: float) -> str:
+    return "-" if np.isnan(value) or np.isinf(value) else f"{value * 100:+.1f}%"